@@ -1,13 +1,31 @@
 import os
 import pickle
+import hashlib
 import random
+import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import LabelEncoder
+from backend.agents.classifier.inference_backend import select_backend
+from backend.agents.classifier.model_artifact import MANIFEST_FILENAME, MmapPipeline, is_mmap_artifact
 
 MODEL_FILENAME = "ai_model.pkl"
 
+def _from_legacy_artifact(data: dict) -> dict:
+    """
+    Adapt the old train_model.py output {"vectorizer", "model"} (a forest fitted on
+    string labels) to the {"pipeline", "label_encoder"} format.
+    """
+    model = data["model"]
+    label_encoder = LabelEncoder()
+    label_encoder.classes_ = np.asarray(model.classes_)
+    return {
+        "pipeline": Pipeline([("tfidf", data["vectorizer"]), ("rf", model)]),
+        "label_encoder": label_encoder,
+    }
+
+
 class AIModel:
     def __init__(self, model_path=None):
         """
@@ -20,13 +38,33 @@ class AIModel:
         self.label_encoder = LabelEncoder()
         self.labels = ["Finance", "Legal", "Resume", "Medical", "Technical", "General"]
 
-        if os.path.exists(self.model_path):
+        self.version = "untrained"
+
+        if is_mmap_artifact(self.model_path):
+            try:
+                self.pipeline = MmapPipeline(self.model_path)
+                self.label_encoder.classes_ = np.array(self.pipeline.classes_)
+                with open(os.path.join(self.model_path, MANIFEST_FILENAME), "rb") as f:
+                    manifest_digest = hashlib.sha256(f.read()).hexdigest()[:12]
+                self.version = self.pipeline.manifest.get("version") or manifest_digest
+                print(f"[AI MODEL] Mapped AI model artifact {self.model_path} (version {self.version}).")
+            except Exception as e:
+                self.pipeline = None
+                print(f"[AI MODEL] Failed to map model artifact: {e}. Using untrained AI.")
+        elif os.path.exists(self.model_path):
             try:
                 with open(self.model_path, "rb") as f:
-                    data = pickle.load(f)
-                    self.pipeline = data["pipeline"]
-                    self.label_encoder = data["label_encoder"]
-                print("[AI MODEL] Loaded trained AI model from file.")
+                    raw = f.read()
+                data = pickle.loads(raw)
+                if "pipeline" not in data and "model" in data:
+                    data = _from_legacy_artifact(data)
+                # Optionally compiled (e.g. ONNX Runtime); sklearn when unavailable or inexact
+                self.pipeline = select_backend(data["pipeline"])
+                self.label_encoder = data["label_encoder"]
+                self.labels = [str(label) for label in data.get("labels") or self.label_encoder.classes_]
+                # Artifacts may carry their own version; otherwise use a digest of the file
+                self.version = data.get("version") or hashlib.sha256(raw).hexdigest()[:12]
+                print(f"[AI MODEL] Loaded trained AI model from file (version {self.version}).")
             except Exception as e:
                 print(f"[AI MODEL] Failed to load model: {e}. Using untrained AI.")
         else:
@@ -69,49 +107,62 @@ class AIModel:
         Classify a single document text.
         If hints exist, bias the prediction towards them.
         """
+        return self.classify_batch([text], [hints])[0]
+
+    def classify_batch(self, texts: list, hints_list: list = None) -> list:
+        """
+        Classify many texts with one vectorizer pass and one predict_proba call.
+        hints_list holds the rule hints of each text (or None). Returns one dict per text.
+        """
         if self.pipeline is None:
             # Untrained fallback
-            chosen_label = random.choice(self.labels)
-            confidence = round(random.uniform(0.3, 0.7), 2)
-            return {
-                "category": chosen_label,
-                "confidence": confidence,
-                "details": "Random fallback (untrained AI model)"
-            }
+            return [self._random_fallback("Random fallback (untrained AI model)") for _ in texts]
 
         try:
-            # Predict probabilities
-            probs = self.pipeline.predict_proba([text])[0]
-            classes = self.label_encoder.inverse_transform(range(len(probs)))
-            class_probs = dict(zip(classes, probs))
-
-            # Apply rule hints if provided
-            if hints and "forced_category" in hints:
-                forced = hints["forced_category"]
-                if forced in class_probs:
-                    class_probs[forced] += 0.3  # boost probability
-                    # Normalize
-                    total = sum(class_probs.values())
-                    for k in class_probs:
-                        class_probs[k] /= total
-
-            # Select top category
-            chosen_label = max(class_probs, key=class_probs.get)
-            confidence = round(class_probs[chosen_label], 2)
-
-            return {
-                "category": chosen_label,
-                "confidence": confidence,
-                "details": f"AI classification with rule hint applied: {bool(hints)}"
-            }
-
+            return self.predict_batch(texts, hints_list)
         except Exception as e:
             print(f"[AI MODEL] Classification failed: {e}")
             # Random fallback
-            chosen_label = random.choice(self.labels)
-            confidence = round(random.uniform(0.3, 0.7), 2)
-            return {
-                "category": chosen_label,
-                "confidence": confidence,
-                "details": f"Fallback due to error: {str(e)}"
-            }
+            return [self._random_fallback(f"Fallback due to error: {str(e)}") for _ in texts]
+
+    def predict_batch(self, texts: list, hints_list: list = None) -> list:
+        """Like classify_batch, but raises instead of falling back to random labels."""
+        if self.pipeline is None:
+            raise RuntimeError("AI model is not trained")
+        hints_list = hints_list or [None] * len(texts)
+        # Predict probabilities for the whole batch (sparse TF-IDF matrix)
+        probs_matrix = self.pipeline.predict_proba(texts)
+        classes = self.label_encoder.inverse_transform(range(probs_matrix.shape[1]))
+        return [self._select(classes, probs, hints) for probs, hints in zip(probs_matrix, hints_list)]
+
+    def _select(self, classes, probs, hints: dict = None) -> dict:
+        class_probs = dict(zip(classes, probs))
+
+        # Apply rule hints if provided
+        if hints and "forced_category" in hints:
+            forced = hints["forced_category"]
+            if forced in class_probs:
+                class_probs[forced] += 0.3  # boost probability
+                # Normalize
+                total = sum(class_probs.values())
+                for k in class_probs:
+                    class_probs[k] /= total
+
+        # Select top category
+        chosen_label = max(class_probs, key=class_probs.get)
+        confidence = round(float(class_probs[chosen_label]), 2)
+
+        return {
+            "category": chosen_label,
+            "confidence": confidence,
+            "details": f"AI classification with rule hint applied: {bool(hints)}"
+        }
+
+    def _random_fallback(self, details: str) -> dict:
+        chosen_label = random.choice(self.labels)
+        confidence = round(random.uniform(0.3, 0.7), 2)
+        return {
+            "category": chosen_label,
+            "confidence": confidence,
+            "details": details
+        }
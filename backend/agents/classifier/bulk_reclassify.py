@@ -0,0 +1,241 @@
+import time
+import logging
+import argparse
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from backend.common.config import Settings
+from backend.common.feature_store import FeatureStore, STORE_ANALYZER, get_feature_store
+from backend.database.models import SessionLocal, Document, Classification, Logs
+from backend.agents.classifier.ai_model import AIModel
+from backend.agents.classifier.model_artifact import MmapPipeline
+from backend.agents.classifier.inference_backend import OnnxForestPipeline
+from backend.agents.classifier.rule import RuleBasedClassifier
+
+logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+CLASSIFIER_TYPE = "Bulk-Reclassify"
+
+
+class FeatureProjector:
+    """
+    Turns feature-store rows (hashed uni/bigram counts) into a model's own inputs.
+    TF-IDF models: every vocabulary term is looked up in its hash bucket, then the
+    model's tf/idf/norm weighting is applied. Hashing models: buckets are folded
+    onto the model's (smaller, power-of-two) hash space. Models must analyze text
+    the way the store does (see STORE_ANALYZER) with n-grams of at most two words.
+    Hash collisions make the result approximate, not exact.
+    """
+
+    def __init__(self, pipeline, store: FeatureStore):
+        self.pipeline = pipeline
+        self.store = store
+        if isinstance(pipeline, MmapPipeline):
+            params = pipeline.manifest["vectorizer"]
+            terms = [term.decode("utf-8") for term in np.asarray(pipeline.vocab_terms)]
+            columns = np.asarray(pipeline.vocab_columns)
+            idf = None if pipeline.idf is None else np.asarray(pipeline.idf)
+            self._predict = lambda X: pipeline.predict_proba_features(X.toarray().astype(np.float32))
+        else:
+            vectorizer = pipeline.vectorizer if isinstance(pipeline, OnnxForestPipeline) else pipeline.steps[0][1]
+            params = vectorizer.get_params()
+            if params.get("tokenizer") is not None or params.get("preprocessor") is not None:
+                raise ValueError("custom tokenizer/preprocessor cannot be scored from the feature store")
+            if isinstance(vectorizer, HashingVectorizer):
+                terms = columns = None
+                idf = None
+            else:
+                terms = list(vectorizer.vocabulary_)
+                columns = np.array([vectorizer.vocabulary_[term] for term in terms])
+                idf = vectorizer.idf_ if params.get("use_idf") else None
+            if isinstance(pipeline, OnnxForestPipeline):
+                self._predict = pipeline.predict_proba_features
+            else:
+                self._predict = pipeline.steps[-1][1].predict_proba
+
+        for key, expected in STORE_ANALYZER.items():
+            if params.get(key) != expected:
+                raise ValueError(f"model {key}={params.get(key)!r} differs from the feature store's {expected!r}")
+        low, high = params["ngram_range"]
+        if not 1 <= low <= high <= 2:
+            raise ValueError(f"ngram_range {params['ngram_range']} not in the feature store")
+
+        self.binary = params.get("binary", False)
+        self.sublinear_tf = params.get("sublinear_tf", False)
+        self.norm = params.get("norm")
+        self.idf = idf
+
+        n = store.n_features
+        if terms is None:
+            n_model = params["n_features"]
+            if params.get("alternate_sign") or n % n_model:
+                raise ValueError("hashing model needs alternate_sign=False and n_features dividing the store's")
+            # Fold the wanted n-gram blocks onto the model's hash space
+            blocks = [np.arange(n) + offset for offset, order in ((0, 1), (n, 2)) if low <= order <= high]
+            rows = np.concatenate(blocks)
+            self.projection = sp.csr_matrix((np.ones(len(rows)), (rows, rows % n_model)), shape=(2 * n, n_model))
+        else:
+            store_columns = store.columns(terms)
+            found = store_columns >= 0
+            self.projection = sp.csr_matrix(
+                (np.ones(int(found.sum())), (store_columns[found], columns[found])),
+                shape=(2 * n, len(terms)),
+            )
+
+    def features(self, counts: sp.csr_matrix) -> sp.csr_matrix:
+        X = (counts.astype(np.float64) @ self.projection).tocsr()
+        if self.binary:
+            X.data[:] = 1.0
+        if self.sublinear_tf:
+            X.data = np.log(X.data) + 1
+        if self.idf is not None:
+            X = (X @ sp.diags(self.idf)).tocsr()
+        if self.norm in ("l1", "l2"):
+            weights = np.asarray(abs(X).sum(axis=1) if self.norm == "l1" else np.sqrt(X.multiply(X).sum(axis=1))).ravel()
+            X = (sp.diags(1.0 / np.maximum(weights, 1e-12)) @ X).tocsr()
+        return X
+
+    def predict_proba(self, counts: sp.csr_matrix) -> np.ndarray:
+        return self._predict(self.features(counts))
+
+
+class RuleHints:
+    """Keyword rules evaluated on stored counts: a keyword hits when its uni/bigram bucket is non-zero."""
+
+    def __init__(self, rules: dict, store: FeatureStore):
+        keywords, terms = [], []
+        for keyword in rules:
+            tokens = store.analyze(keyword)
+            if 1 <= len(tokens) <= 2:
+                keywords.append(keyword)
+                terms.append(" ".join(tokens))
+            else:
+                logger.warning(f"[BULK] Rule '{keyword}' cannot be checked on stored features; ignored")
+        self.rules = rules
+        self.keywords = keywords
+        self.columns = store.columns(terms) if terms else np.empty(0, dtype=np.int64)
+
+    def hints(self, counts: sp.csr_matrix) -> list:
+        if not len(self.columns):
+            return [None] * counts.shape[0]
+        present = (counts[:, self.columns] > 0).toarray()
+        hints = []
+        for row in present:
+            hits = np.flatnonzero(row)
+            if not hits.size:
+                hints.append(None)
+                continue
+            categories = list(dict.fromkeys(self.rules[self.keywords[i]] for i in hits))
+            hints.append({
+                "forced_category": categories[0],
+                "matched_keyword": self.keywords[hits[0]],
+                "matched_categories": categories,
+            })
+        return hints
+
+
+def _current_categories(db: Session, document_ids: list) -> dict:
+    """{document_id: latest category or None} for the documents that still exist."""
+    latest = (
+        db.query(Classification.document_id, func.max(Classification.id).label("id"))
+        .filter(Classification.document_id.in_(document_ids))
+        .group_by(Classification.document_id)
+        .subquery()
+    )
+    rows = (
+        db.query(Document.id, Classification.category)
+        .outerjoin(latest, latest.c.document_id == Document.id)
+        .outerjoin(Classification, Classification.id == latest.c.id)
+        .filter(Document.id.in_(document_ids))
+        .all()
+    )
+    return {doc_id: category for doc_id, category in rows}
+
+
+def reclassify(model: AIModel, store: FeatureStore = None, batch_size: int = None, use_rules: bool = True,
+               dry_run: bool = False) -> dict:
+    """
+    Score every stored document with `model` and insert a Classification row only
+    where the category differs from the document's latest one.
+    """
+    store = store or get_feature_store()
+    batch_size = batch_size or Settings.BULK_RECLASSIFY_BATCH_SIZE
+    projector = FeatureProjector(model.pipeline, store)
+    rule_hints = RuleHints(RuleBasedClassifier()._load_rules_from_db(), store) if use_rules else None
+
+    stats = {"scored": 0, "changed": 0, "missing": 0}
+    start = time.perf_counter()
+    db: Session = SessionLocal()
+    try:
+        for ids, counts in store.iter_batches(batch_size):
+            probs = projector.predict_proba(counts)
+            classes = model.label_encoder.inverse_transform(range(probs.shape[1]))
+            hints = rule_hints.hints(counts) if rule_hints else [None] * len(ids)
+            current = _current_categories(db, [int(i) for i in ids])
+
+            changes = []
+            for doc_id, row_probs, row_hints in zip(ids, probs, hints):
+                doc_id = int(doc_id)
+                if doc_id not in current:
+                    stats["missing"] += 1
+                    continue
+                result = model._select(classes, row_probs, row_hints)
+                if result["confidence"] < 0.5:
+                    result["category"] = "Unknown"
+                if str(result["category"]) != current[doc_id]:
+                    changes.append((doc_id, result, row_hints, current[doc_id]))
+            stats["scored"] += len(ids)
+            stats["changed"] += len(changes)
+
+            if changes and not dry_run:
+                db.bulk_insert_mappings(Classification, [
+                    {
+                        "document_id": doc_id,
+                        "classifier_type": CLASSIFIER_TYPE,
+                        "category": str(result["category"]),
+                        "confidence": result["confidence"],
+                        "details": {"ai_details": result["details"], "stage": "bulk", "rule_hints": row_hints, "previous_category": previous},
+                        "model_version": model.version,
+                    }
+                    for doc_id, result, row_hints, previous in changes
+                ])
+                db.bulk_insert_mappings(Logs, [
+                    {
+                        "document_id": doc_id,
+                        "action": "reclassified",
+                        "message": f"Document reclassified from {previous} to {result['category']}",
+                    }
+                    for doc_id, result, _, previous in changes
+                ])
+                db.commit()
+            logger.info(f"[BULK] {stats['scored']} scored, {stats['changed']} changed ({time.perf_counter() - start:.1f}s)")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-classify stored documents from the feature store.")
+    parser.add_argument("model", help="Model artifact (.pkl or memory-mapped directory)")
+    parser.add_argument("--batch-size", type=int, default=Settings.BULK_RECLASSIFY_BATCH_SIZE)
+    parser.add_argument("--no-rules", action="store_true", help="Ignore keyword rules")
+    parser.add_argument("--dry-run", action="store_true", help="Count changes without writing them")
+    args = parser.parse_args()
+
+    model = AIModel(args.model)
+    if model.pipeline is None:
+        raise SystemExit(f"[ERROR] Could not load model {args.model}")
+    stats = reclassify(model, batch_size=args.batch_size, use_rules=not args.no_rules, dry_run=args.dry_run)
+    logger.info(f"[BULK] Done: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import os
+import hashlib
+import logging
+from backend.common.config import Settings
+from backend.agents.classifier.ai_model import AIModel
+from backend.agents.classifier.genai_utils import classify_many
+
+logger = logging.getLogger(__name__)
+
+LINEAR_MODEL_FILENAME = "linear_model.pkl"
+
+
+class CascadeStage:
+    """
+    One classifier in the cascade.
+    classify() returns one {category, confidence, details} dict per text, or None
+    where the stage abstains (no opinion, not loaded, or failed).
+    """
+    name = None
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+
+    @property
+    def version(self) -> str | None:
+        return None
+
+    def available(self) -> bool:
+        return True
+
+    def classify(self, texts: list, hints_list: list) -> list:
+        raise NotImplementedError
+
+
+class RuleStage(CascadeStage):
+    """Decides from the compiled keyword rules alone; confident only when they agree on one category."""
+    name = "rules"
+
+    def classify(self, texts: list, hints_list: list) -> list:
+        outputs = []
+        for hints in hints_list:
+            if not hints or "forced_category" not in hints:
+                outputs.append(None)
+                continue
+            categories = hints.get("matched_categories") or [hints["forced_category"]]
+            outputs.append({
+                "category": hints["forced_category"],
+                # Conflicting keywords split the confidence between their categories
+                "confidence": round(Settings.CASCADE_RULE_CONFIDENCE / len(categories), 2),
+                "details": f"Rule match on '{hints['matched_keyword']}'",
+            })
+        return outputs
+
+
+class ModelStage(CascadeStage):
+    """An AIModel-format pipeline (the lightweight linear model or the RandomForest)."""
+
+    def __init__(self, name: str, threshold: float, model: AIModel):
+        super().__init__(threshold)
+        self.name = name
+        self.model = model
+
+    @property
+    def version(self) -> str:
+        return self.model.version
+
+    def available(self) -> bool:
+        return self.model.pipeline is not None
+
+    def classify(self, texts: list, hints_list: list) -> list:
+        try:
+            return self.model.predict_batch(texts, hints_list)
+        except Exception as e:
+            logger.error(f"[CASCADE] Stage {self.name} failed: {e}")
+            return [None] * len(texts)
+
+
+class KnnStage(CascadeStage):
+    """Votes of the nearest already-classified documents in the vector index."""
+    name = "knn"
+
+    def __init__(self, threshold: float, embedder_path: str = None, index_path: str = None):
+        super().__init__(threshold)
+        self.embedder = None
+        self.index = None
+        try:
+            from backend.agents.classifier.embeddings import LSAEmbedder
+            from backend.agents.classifier.vector_index import IVFIndex
+
+            self.embedder = LSAEmbedder.load(embedder_path)
+            self.index = IVFIndex.load(index_path)
+            if self.index.manifest["model"] != self.embedder.name:
+                raise ValueError(f"index built from {self.index.manifest['model']}, embedder is {self.embedder.name}")
+        except Exception as e:
+            logger.info(f"[CASCADE] kNN stage unavailable: {e}")
+            self.embedder = self.index = None
+
+    @property
+    def version(self) -> str | None:
+        return self.embedder.name if self.embedder else None
+
+    def available(self) -> bool:
+        return self.index is not None
+
+    def classify(self, texts: list, hints_list: list) -> list:
+        return self.index.knn_classify(self.embedder.embed(texts))
+
+
+class GenAIStage(CascadeStage):
+    name = "genai"
+
+    def classify(self, texts: list, hints_list: list) -> list:
+        # Concurrent requests on the pooled async client, batched when the API allows it
+        return classify_many(texts)
+
+
+class ClassificationCascade:
+    """
+    Ordered stages, each with a confidence exit threshold. A text leaves the cascade at
+    the first stage confident enough about it; texts no stage is confident about get the
+    most confident answer seen. Every result records the stage that decided it.
+    """
+
+    def __init__(self, stages: list, fallback: CascadeStage = None):
+        self.configured = stages
+        # Asked only for texts every stage abstained on (models failed or unavailable)
+        self.fallback = fallback if fallback is not None and fallback.available() else None
+        self.stages = [stage for stage in stages if stage.available()]
+        skipped = [stage.name for stage in stages if not stage.available()]
+        if skipped:
+            logger.info(f"[CASCADE] Skipping unavailable stages: {skipped}")
+
+    @property
+    def version(self) -> str:
+        spec = ",".join(f"{stage.name}:{stage.threshold}:{stage.version}" for stage in self.stages)
+        if self.fallback is not None:
+            spec += f",fallback:{self.fallback.name}"
+        return hashlib.md5(spec.encode("utf-8")).hexdigest()[:12]
+
+    def with_model(self, stage_name: str, model: AIModel) -> "ClassificationCascade":
+        """A new cascade with the named model stage serving `model`; the other stages are shared."""
+        stages = [
+            ModelStage(stage.name, stage.threshold, model) if stage.name == stage_name else stage
+            for stage in self.configured
+        ]
+        return ClassificationCascade(stages, self.fallback)
+
+    def classify_batch(self, texts: list, hints_list: list = None) -> list:
+        hints_list = hints_list or [None] * len(texts)
+        best = [None] * len(texts)
+        remaining = list(range(len(texts)))
+
+        for stage in self.stages:
+            if not remaining:
+                break
+            outputs = stage.classify([texts[i] for i in remaining], [hints_list[i] for i in remaining])
+            undecided = []
+            for i, output in zip(remaining, outputs):
+                if output is None:
+                    undecided.append(i)
+                    continue
+                output["stage"] = stage.name
+                output["model_version"] = stage.version
+                if best[i] is None or output.get("confidence", 0) > best[i].get("confidence", 0):
+                    best[i] = output
+                if output.get("confidence", 0) < stage.threshold:
+                    undecided.append(i)
+                else:
+                    best[i] = output
+            remaining = undecided
+
+        failed = [i for i, output in enumerate(best) if output is None]
+        if failed and self.fallback is not None:
+            outputs = self.fallback.classify([texts[i] for i in failed], [hints_list[i] for i in failed])
+            for i, output in zip(failed, outputs):
+                if output is not None:
+                    output["stage"] = self.fallback.name
+                    output["model_version"] = self.fallback.version
+                    best[i] = output
+
+        return [
+            output or {"category": "Unknown", "confidence": 0, "details": "No cascade stage produced a result", "stage": None, "model_version": None}
+            for output in best
+        ]
+
+
+def build_cascade(forest_model: AIModel, spec: str = None) -> ClassificationCascade:
+    """
+    Build the cascade from CLASSIFIER_CASCADE, e.g. "linear:0.85,forest:0.6" (the default)
+    or "rules:0.9,linear:0.85,forest:0.6,genai:0.5". A "knn" stage votes with the nearest
+    classified documents once an embedder and index exist. Unless "genai" is a stage,
+    CASCADE_GENAI_ON_FAILURE keeps the API as a fallback for documents no model could score.
+    """
+    spec = spec or Settings.CLASSIFIER_CASCADE
+    stages = []
+    for entry in spec.split(","):
+        name, _, threshold = entry.strip().partition(":")
+        threshold = float(threshold or 0)
+        if name == "rules":
+            stages.append(RuleStage(threshold))
+        elif name == "linear":
+            path = Settings.CASCADE_LINEAR_MODEL_PATH or os.path.join(os.path.dirname(__file__), LINEAR_MODEL_FILENAME)
+            stages.append(ModelStage("linear", threshold, AIModel(path)))
+        elif name == "forest":
+            stages.append(ModelStage("forest", threshold, forest_model))
+        elif name == "knn":
+            stages.append(KnnStage(threshold))
+        elif name == "genai":
+            stages.append(GenAIStage(threshold))
+        else:
+            raise ValueError(f"Unknown cascade stage: {name}")
+    has_genai = any(stage.name == GenAIStage.name for stage in stages)
+    fallback = GenAIStage(0) if Settings.CASCADE_GENAI_ON_FAILURE and not has_genai else None
+    return ClassificationCascade(stages, fallback)
@@ -0,0 +1,116 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import redis
+from backend.common.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(content_hash: str, model_version: str, ruleset_version: str) -> str:
+    """Content + model + ruleset: a model rollout or rule edit makes old entries unreachable."""
+    return f"classification:{content_hash}:{model_version}:{ruleset_version}"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+
+
+class SingleFlight:
+    """Collapse concurrent computations of the same key: one leader computes, the others wait."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def begin(self, key: str) -> tuple:
+        """Return (is_leader, call). The leader must call end() for the key."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return False, call
+            call = _Call()
+            self._calls[key] = call
+            return True, call
+
+    def end(self, key: str, value):
+        with self._lock:
+            call = self._calls.pop(key, None)
+        if call is not None:
+            call.value = value
+            call.done.set()
+
+    @staticmethod
+    def wait(call: _Call, timeout: float = None):
+        """Leader's value, or None if it failed or did not finish in time."""
+        call.done.wait(timeout)
+        return call.value
+
+
+class ClassificationCache:
+    """
+    Two-tier classification cache: an in-process LRU in front of Redis.
+    Values are JSON-serializable dicts; both tiers expire entries after ttl seconds.
+    """
+
+    def __init__(self, client: redis.Redis = None, max_entries: int = None, ttl: int = None):
+        self.r = client or redis.Redis(host=Settings.REDIS_HOST, port=Settings.REDIS_PORT, decode_responses=True)
+        self.max_entries = max_entries or Settings.CLASSIFICATION_CACHE_LOCAL_SIZE
+        self.ttl = ttl or Settings.CLASSIFICATION_CACHE_TTL
+        self._local = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.flight = SingleFlight()
+
+    def _get_local(self, key: str):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value: dict, ttl: float = None):
+        with self._lock:
+            self._local[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def get(self, key: str) -> dict | None:
+        value = self._get_local(key)
+        if value is not None:
+            return value
+        try:
+            pipe = self.r.pipeline()
+            pipe.get(key)
+            pipe.ttl(key)
+            cached, remaining = pipe.execute()
+        except Exception as e:
+            logger.warning(f"[CACHE] Redis lookup failed for {key}: {e}")
+            return None
+        if not cached:
+            return None
+        value = json.loads(cached)
+        # Keep the local copy no longer than Redis would
+        self._set_local(key, value, remaining if remaining and remaining > 0 else None)
+        return value
+
+    def set(self, key: str, value: dict):
+        self._set_local(key, value)
+        try:
+            self.r.setex(key, self.ttl, json.dumps(value))
+        except Exception as e:
+            logger.warning(f"[CACHE] Redis write failed for {key}: {e}")
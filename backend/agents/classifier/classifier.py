@@ -1,5 +1,4 @@
 import os
-import json
 import logging
 import time
 import random
@@ -11,19 +10,57 @@ from backend.common.config import Settings
 from backend.database.models import SessionLocal, Document, Classification, Logs
 from backend.common.kafka_consumer import KafkaConsumerClient
 from backend.common.kafka_producer import KafkaProducerClient
+from backend.common.text_store import resolve_text
 
 from backend.agents.classifier.rule import RuleBasedClassifier
-from backend.agents.classifier.ai_model import AIModel
-from backend.agents.classifier.genai_utils import classify_with_api  # fallback API
+from backend.agents.classifier.model_registry import ModelRegistry
+from backend.agents.classifier.cascade import build_cascade
+from backend.agents.classifier.text_budget import sample_text, budget_version
+from backend.agents.classifier.shadow import ShadowEvaluator
+from backend.agents.classifier.classification_cache import ClassificationCache, SingleFlight, cache_key, text_hash
 
 # ---------------- CONFIGURATION ----------------
-r = redis.Redis(host=Settings.REDIS_HOST, port=Settings.REDIS_PORT, decode_responses=True)
 logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
 logger = logging.getLogger(__name__)
 
+# Seconds a document waits for another thread already classifying identical content
+SINGLEFLIGHT_TIMEOUT = 30
+
 # ---------------- LOAD AI MODEL ----------------
-ai_model = AIModel()  # automatically loads trained ai_model.pkl
-rule_classifier = RuleBasedClassifier()
+# Set up by init_agent(), not at import: spawned shadow-evaluation workers re-import
+# this (main) module and must not load the live models or open connections
+r = None
+model_registry = None
+rule_classifier = None
+cascade = None
+classification_cache = None
+shadow = None
+
+
+def init_agent():
+    global r, model_registry, rule_classifier, cascade, classification_cache, shadow
+    if cascade is not None:
+        return
+    r = redis.Redis(host=Settings.REDIS_HOST, port=Settings.REDIS_PORT, decode_responses=True)
+    # The artifact promoted in MODEL_REGISTRY_DIR, else the bundled ai_model.pkl
+    model_registry = ModelRegistry()
+    rule_classifier = RuleBasedClassifier()
+    # CLASSIFIER_CASCADE stages (linear -> forest by default); each only sees what the previous ones were unsure about
+    cascade = build_cascade(model_registry.active)
+    classification_cache = ClassificationCache(r)
+    # Candidate models (SHADOW_MODELS) scoring the same batches in background processes
+    shadow = ShadowEvaluator()
+
+
+def current_cascade():
+    """The cascade serving the registry's active model; swapped in whole, between batches."""
+    global cascade
+    model = model_registry.active
+    forest = next((stage for stage in cascade.configured if stage.name == "forest"), None)
+    if forest is not None and forest.model is not model:
+        cascade = cascade.with_model("forest", model)
+    return cascade
+
 
 # ---------------- HELPER: Retry wrapper ----------------
 def retry_with_backoff(func, max_retries=5, base_delay=1, max_delay=30, *args, **kwargs):
@@ -40,65 +77,184 @@ def retry_with_backoff(func, max_retries=5, base_delay=1, max_delay=30, *args, *
 
 # ---------------- CLASSIFICATION ----------------
 def classify_document(document: dict, uploaded_by: int = None):
-    doc_name = document.get("document_name")
-    text = document.get("extracted_text", "")
+    return classify_documents([document])[0]
+
+
+def classify_documents(documents: list) -> list:
+    """
+    Classify a batch of extractor messages.
+    Results are cached by full-text hash + model, ruleset and text budget versions; identical
+    content is classified once even when several documents or threads ask for it at
+    the same time. The cascade classifies all misses at once.
+    Returns one result (or None) per document.
+    """
+    init_agent()
+    results = [None] * len(documents)
+    # One snapshot per batch: a model swapped in meanwhile applies from the next batch
+    batch_cascade = current_cascade()
+    model_version = f"{batch_cascade.version}.{budget_version()}"
+    ruleset_version = rule_classifier.ruleset_version()
+
+    assignments = []  # (index, doc_name, classification value)
+    leaders = {}      # key -> (text, [(index, doc_name)]) computed by this call
+    followers = {}    # key -> (in-flight call, [(index, doc_name, document)]) computed elsewhere
 
-    if not text:
-        logger.error(f"[CLASSIFIER] No text found in {doc_name}")
-        return None
+    for i, document in enumerate(documents):
+        doc_name = document.get("document_name")
 
-    # ---- Step 1: Redis cache ----
-    cached = r.get(f"classification:{doc_name}")
-    if cached:
-        logger.info(f"[CLASSIFIER] Using cached classification for {doc_name}")
-        return json.loads(cached)
+        # Filesystem text refs are content-addressed, so their key already is the text hash
+        text = None
+        text_ref = document.get("text_ref") or {}
+        if text_ref.get("store") == "fs" and not document.get("extracted_text"):
+            content_hash = text_ref["key"]
+        else:
+            # Inline text, or fetched lazily from the text store for claim-check messages
+            text = resolve_text(document)
+            if not text:
+                logger.error(f"[CLASSIFIER] No text found in {doc_name}")
+                continue
+            content_hash = text_hash(text)
+        key = cache_key(content_hash, model_version, ruleset_version)
+
+        # ---- Step 1: Cache (in-process LRU, then Redis) ----
+        cached = classification_cache.get(key)
+        if cached:
+            logger.info(f"[CLASSIFIER] Using cached classification for {doc_name}")
+            assignments.append((i, doc_name, cached))
+            continue
+
+        # Identical content earlier in this batch, or being classified by another thread
+        if key in leaders:
+            leaders[key][1].append((i, doc_name))
+            continue
+        if key in followers:
+            followers[key][1].append((i, doc_name, document))
+            continue
+        is_leader, call = classification_cache.flight.begin(key)
+        if not is_leader:
+            followers[key] = (call, [(i, doc_name, document)])
+            continue
 
-    # ---- Step 2: Apply rule-based hints ----
-    rule_hints = rule_classifier.get_applicable_rules(text)
-    if rule_hints:
-        logger.info(f"[CLASSIFIER] Rule matched for {doc_name}: {rule_hints}")
+        if text is None:
+            text = resolve_text(document)
+        if not text:
+            logger.error(f"[CLASSIFIER] No text found in {doc_name}")
+            classification_cache.flight.end(key, None)
+            continue
+        leaders[key] = (text, [(i, doc_name)])
 
-    # ---- Step 3: AI Model classification ----
+    computed = {}
     try:
-        classification = ai_model.classify(text, hints=rule_hints)
-    except Exception as e:
-        logger.error(f"[CLASSIFIER] AI model failed for {doc_name}: {e}")
-        # Fallback to GenAI API
-        classification = classify_with_api(text)
-        classification["details"] = f"Fallback to GenAI API due to AI failure: {str(e)}"
-
-    # ---- Step 4: Handle unknown/low-confidence ----
-    if classification.get("confidence", 0) < 0.5:
-        logger.info(f"[CLASSIFIER] Low confidence ({classification['confidence']}) for {doc_name}. Marking as Unknown")
-        classification["category"] = "Unknown"
-
-    result = {
-        "document_name": doc_name,
-        "classification": classification["category"],
-        "confidence": classification.get("confidence", 0),
-        "details": classification.get("details", ""),
-        "rule_hints": rule_hints,
-        "timestamp": datetime.utcnow().isoformat(),
-    }
-
-    # ---- Step 5: Save to DB ----
+        computed = _classify_texts({key: text for key, (text, _) in leaders.items()}, batch_cascade)
+        for key, value in computed.items():
+            classification_cache.set(key, value)
+    finally:
+        for key in leaders:
+            classification_cache.flight.end(key, computed.get(key))
+
+    for key, (_, docs) in leaders.items():
+        if key in computed:
+            assignments.extend((i, doc_name, computed[key]) for i, doc_name in docs)
+
+    # Candidates see what the live models scored in this batch; never waits, drops when behind
+    shadow.submit([
+        (docs[0][1], text, computed[key])
+        for key, (text, docs) in leaders.items() if key in computed
+    ])
+
+    for key, (call, docs) in followers.items():
+        value = SingleFlight.wait(call, SINGLEFLIGHT_TIMEOUT)
+        if value is None:
+            # The other computation failed or is too slow; classify it here and cache it as a
+            # leader would (leading a new flight unless the slow one is still running)
+            is_leader, _ = classification_cache.flight.begin(key)
+            try:
+                text = resolve_text(docs[0][2])
+                value = _classify_texts({key: text}, batch_cascade).get(key) if text else None
+                if value is not None:
+                    classification_cache.set(key, value)
+            finally:
+                if is_leader:
+                    classification_cache.flight.end(key, value)
+        if value is not None:
+            assignments.extend((i, doc_name, value) for i, doc_name, _ in docs)
+
+    db: Session = SessionLocal()
+    try:
+        for i, doc_name, value in assignments:
+            result = {
+                "document_name": doc_name,
+                **value,
+                "timestamp": datetime.utcnow().isoformat(),
+            }
+
+            # ---- Step 6: Save to DB ----
+            _save_classification(db, doc_name, result)
+            results[i] = result
+    finally:
+        db.close()
+
+    return results
+
+
+def _classify_texts(texts_by_key: dict, batch_cascade) -> dict:
+    """Rule hints + the classification cascade over the batch. Returns {key: classification value}."""
+    if not texts_by_key:
+        return {}
+    keys = list(texts_by_key)
+
+    # ---- Step 2: Text budget (long documents are classified on a representative sample) ----
+    samples = [sample_text(texts_by_key[key]) for key in keys]
+    texts = [text for text, _ in samples]
+
+    # ---- Step 3: Apply rule-based hints ----
+    hints_list = [rule_classifier.get_applicable_rules(text) for text in texts]
+
+    # ---- Step 4: Cascade (cheap stages first, GenAI API only for what stays uncertain) ----
+    classifications = batch_cascade.classify_batch(texts, hints_list)
+
+    values = {}
+    for key, rule_hints, classification, (_, text_budget) in zip(keys, hints_list, classifications, samples):
+        # ---- Step 5: Handle unknown/low-confidence ----
+        if classification.get("confidence", 0) < 0.5:
+            logger.info(f"[CLASSIFIER] Low confidence ({classification['confidence']}). Marking as Unknown")
+            classification["category"] = "Unknown"
+
+        values[key] = {
+            "classification": classification["category"],
+            "confidence": classification.get("confidence", 0),
+            "details": classification.get("details", ""),
+            "stage": classification.get("stage"),
+            "model_version": classification.get("model_version"),
+            "rule_hints": rule_hints,
+            "text_budget": text_budget,
+        }
+    return values
+
+
+def _save_classification(db: Session, doc_name: str, result: dict):
     try:
-        db: Session = SessionLocal()
         doc_obj = db.query(Document).filter_by(filename=doc_name).first()
         if doc_obj:
             record = Classification(
                 document_id=doc_obj.id,
                 classifier_type="Hybrid-AI-Rule",
-                category=classification["category"],
-                confidence=classification.get("confidence", 0),
-                details={"ai_details": classification.get("details", ""), "rule_hints": rule_hints},
+                category=result["classification"],
+                confidence=result.get("confidence", 0),
+                details={
+                    "ai_details": result.get("details", ""),
+                    "stage": result.get("stage"),
+                    "rule_hints": result.get("rule_hints"),
+                    "text_budget": result.get("text_budget"),
+                },
+                model_version=result.get("model_version"),
             )
             db.add(record)
 
             log = Logs(
                 document_id=doc_obj.id,
                 action="classified",
-                message=f"Document classified as {classification['category']}"
+                message=f"Document classified as {result['classification']}"
             )
             db.add(log)
             db.commit()
@@ -108,17 +264,13 @@ def classify_document(document: dict, uploaded_by: int = None):
     except Exception as e:
         logger.error(f"[DB ERROR] Could not save classification for {doc_name}: {str(e)}")
         db.rollback()
-    finally:
-        db.close()
-
-    # ---- Step 6: Cache in Redis ----
-    r.setex(f"classification:{doc_name}", 3600, json.dumps(result))
-
-    return result
 
 # ---------------- MAIN LOOP ----------------
 def main():
     logger.info("[CLASSIFIER] Agent starting...")
+    init_agent()
+    model_registry.start()
+    shadow.start()
 
     try:
         consumer = retry_with_backoff(
@@ -133,10 +285,12 @@ def main():
         logger.critical(f"[FATAL] Could not connect to Kafka: {e}")
         return
 
-    def handle_message(data: dict):
-        logger.info(f"[CLASSIFIER] Processing document: {data.get('document_name')}")
-        result = classify_document(data, uploaded_by=data.get("uploaded_by"))
-        if result:
+    def handle_batch(messages: list):
+        logger.info(f"[CLASSIFIER] Processing batch of {len(messages)} documents")
+        results = classify_documents(messages)
+        for data, result in zip(messages, results):
+            if not result:
+                continue
             try:
                 retry_with_backoff(
                     producer.send_message,
@@ -149,7 +303,11 @@ def main():
                 logger.error(f"[KAFKA ERROR] Could not send classification for {data.get('document_name')}: {str(e)}")
 
     try:
-        consumer.consume_messages(handle_message)
+        consumer.consume_batches(
+            handle_batch,
+            max_records=Settings.CLASSIFIER_BATCH_SIZE,
+            timeout_ms=Settings.CLASSIFIER_BATCH_TIMEOUT_MS,
+        )
     except KeyboardInterrupt:
         logger.info("[CLASSIFIER] Shutting down...")
     finally:
@@ -157,6 +315,7 @@ def main():
         except: pass
         try: producer.close()
         except: pass
+        shadow.close()
 
 if __name__ == "__main__":
     main()
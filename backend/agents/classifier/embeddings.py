@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import pickle
+import shutil
+import logging
+import argparse
+import numpy as np
+from sqlalchemy import and_, exists, func
+from sqlalchemy.orm import Session, aliased
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import TruncatedSVD
+
+from backend.common.config import Settings
+from backend.common.text_store import get_text_store
+from backend.database.models import SessionLocal, Extraction, DocumentEmbedding
+
+logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+class LSAEmbedder:
+    """
+    Latent semantic analysis: TF-IDF followed by a TruncatedSVD projection, giving
+    L2-normalized float32 vectors whose dot product is cosine similarity.
+    Saved as a directory; the projection matrix is memory-mapped on load.
+    """
+
+    def __init__(self, vectorizer: TfidfVectorizer, components: np.ndarray, version: str):
+        self.vectorizer = vectorizer
+        self.components = components  # (dim, n_terms)
+        self.version = version
+
+    @property
+    def name(self) -> str:
+        return f"lsa-{self.version}"
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, texts: list, dim: int = None) -> "LSAEmbedder":
+        dim = dim or Settings.EMBEDDING_DIM
+        vectorizer = TfidfVectorizer(stop_words="english", max_features=50000, sublinear_tf=True, dtype=np.float32)
+        X = vectorizer.fit_transform(texts)
+        svd = TruncatedSVD(n_components=min(dim, X.shape[1] - 1, len(texts) - 1), algorithm="randomized", random_state=42)
+        svd.fit(X)
+        version = time.strftime("%Y%m%d%H%M%S", time.gmtime())
+        logger.info(f"[EMBED] Fitted LSA on {len(texts)} docs: {svd.n_components} dims, "
+                    f"{svd.explained_variance_ratio_.sum():.1%} variance explained")
+        return cls(vectorizer, svd.components_.astype(np.float32), version)
+
+    def embed(self, texts: list) -> np.ndarray:
+        X = self.vectorizer.transform(texts)
+        vectors = np.asarray(X @ self.components.T, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def save(self, path: str) -> str:
+        tmp_dir = os.path.join(os.path.dirname(os.path.abspath(path)), "." + os.path.basename(path) + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "components.npy"), self.components)
+        with open(os.path.join(tmp_dir, "vectorizer.pkl"), "wb") as f:
+            pickle.dump(self.vectorizer, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(tmp_dir, MANIFEST_FILENAME), "w") as f:
+            json.dump({"version": self.version, "dim": self.dim}, f, indent=2)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_dir, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str = None) -> "LSAEmbedder":
+        path = path or Settings.EMBEDDING_MODEL_PATH
+        with open(os.path.join(path, MANIFEST_FILENAME)) as f:
+            manifest = json.load(f)
+        with open(os.path.join(path, "vectorizer.pkl"), "rb") as f:
+            vectorizer = pickle.load(f)
+        components = np.load(os.path.join(path, "components.npy"), mmap_mode="r")
+        return cls(vectorizer, components, manifest["version"])
+
+
+# ---------------- EMBEDDING STAGE ----------------
+def _extraction_text(extraction: Extraction, text_store) -> str:
+    if extraction.extracted_text is not None:
+        return extraction.extracted_text
+    # Streamed extractions keep their text in the text store
+    return text_store.get(extraction.id)
+
+
+def _pending_extractions(db: Session, model_name: str, after_id: int, batch_size: int):
+    """
+    The next batch_size extractions with id > after_id that are their document's
+    latest and have no embedding from this model yet. Keyset paging on the primary
+    key: each call reads one index range, never the whole table.
+    """
+    newer = aliased(Extraction)
+    return (
+        db.query(Extraction)
+        .outerjoin(DocumentEmbedding, and_(
+            DocumentEmbedding.extraction_id == Extraction.id,
+            DocumentEmbedding.model == model_name,
+        ))
+        .filter(
+            Extraction.id > after_id,
+            DocumentEmbedding.id.is_(None),
+            # Superseded by a re-extraction: the newer one gets embedded instead
+            ~exists().where(and_(newer.document_id == Extraction.document_id, newer.id > Extraction.id)),
+        )
+        .order_by(Extraction.id)
+        .limit(batch_size)
+        .all()
+    )
+
+
+def embed_pending(embedder: LSAEmbedder, batch_size: int = None) -> int:
+    """
+    Embed, batch_size at a time, every document whose latest extraction has no
+    vector from this embedder, including documents re-extracted since they were embedded.
+    """
+    batch_size = batch_size or Settings.EMBEDDING_BATCH_SIZE
+    text_store = get_text_store("db")
+    total = 0
+    cursor = 0
+    db: Session = SessionLocal()
+    try:
+        while True:
+            extractions = _pending_extractions(db, embedder.name, cursor, batch_size)
+            if not extractions:
+                break
+            cursor = extractions[-1].id
+            vectors = embedder.embed([_extraction_text(e, text_store) or "" for e in extractions])
+            db.bulk_insert_mappings(DocumentEmbedding, [
+                {
+                    "document_id": extraction.document_id,
+                    "extraction_id": extraction.id,
+                    "vector": vector.tobytes(),
+                    "dimensions": embedder.dim,
+                    "model": embedder.name,
+                }
+                for extraction, vector in zip(extractions, vectors)
+            ])
+            db.commit()
+            total += len(extractions)
+            logger.info(f"[EMBED] {total} documents embedded with {embedder.name}")
+    finally:
+        db.close()
+    return total
+
+
+def fit_corpus(limit: int = None) -> list:
+    """A sample of extracted texts from the database (latest extraction per document)."""
+    limit = limit or Settings.EMBEDDING_FIT_DOCS
+    text_store = get_text_store("db")
+    db: Session = SessionLocal()
+    try:
+        latest = db.query(func.max(Extraction.id)).group_by(Extraction.document_id)
+        extractions = db.query(Extraction).filter(Extraction.id.in_(latest)).order_by(func.random()).limit(limit).all()
+        return [text for text in (_extraction_text(e, text_store) for e in extractions) if text]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the LSA embedder and embed documents.")
+    parser.add_argument("command", choices=["fit", "embed"])
+    parser.add_argument("--data", help="Fit on a training_data-style folder instead of stored extractions")
+    parser.add_argument("--path", default=Settings.EMBEDDING_MODEL_PATH)
+    args = parser.parse_args()
+
+    if args.command == "fit":
+        if args.data:
+            from backend.agents.classifier.train_model import load_training_data
+            texts, _ = load_training_data(args.data)
+        else:
+            texts = fit_corpus()
+        LSAEmbedder.fit(texts).save(args.path)
+        logger.info(f"[EMBED] Embedder saved to {args.path}")
+    else:
+        embed_pending(LSAEmbedder.load(args.path))
+
+
+if __name__ == "__main__":
+    main()
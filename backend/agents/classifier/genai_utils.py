@@ -1,56 +1,239 @@
+import time
+import asyncio
+import concurrent.futures
 import logging
-import requests
-from typing import Dict
+import threading
+from collections import deque
+from typing import Dict, List
+import httpx
 from backend.common.config import Settings
 
 logger = logging.getLogger(__name__)
 
 # Load Gemini API key from Settings
 GEMINI_API_KEY = Settings.GEMINI_API_KEY
-GEMINI_API_URL = "https://api.gemini.ai/v1/classify"  # replace with actual endpoint
+GEMINI_API_URL = Settings.GEMINI_API_URL  # replace with actual endpoint
 
-def classify_with_api(text: str) -> Dict:
+
+def _unknown(details: str) -> Dict:
+    return {
+        "category": "Unknown",
+        "confidence": 0,
+        "details": details
+    }
+
+
+# ---------------- CIRCUIT BREAKER ----------------
+class CircuitBreaker:
     """
-    Fallback document classification using Gemini API.
-    Returns a dictionary: {category, confidence, details}
+    Stops calls to a failing dependency.
+    Closed: calls pass, outcomes go into a rolling window. Once the window's error rate
+    reaches error_rate the breaker opens and rejects calls for cooldown seconds, then
+    lets a single trial call through (half-open): success closes it, failure reopens it.
     """
-    if not GEMINI_API_KEY:
-        logger.error("Gemini API key not set in environment variables.")
-        return {
-            "category": "Unknown",
-            "confidence": 0,
-            "details": "No API key available for Gemini API"
-        }
-
-    try:
-        headers = {
-            "Authorization": f"Bearer {GEMINI_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        payload = {"text": text}
-
-        response = requests.post(GEMINI_API_URL, json=payload, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
 
+    def __init__(self, window: int = None, error_rate: float = None, cooldown: float = None):
+        self.window = window or Settings.GEMINI_BREAKER_WINDOW
+        self.error_rate = error_rate or Settings.GEMINI_BREAKER_ERROR_RATE
+        self.cooldown = cooldown if cooldown is not None else Settings.GEMINI_BREAKER_COOLDOWN
+        self._outcomes = deque(maxlen=self.window)
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return "open"
+            return "half-open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record(self, success: bool):
+        with self._lock:
+            if self._opened_at is not None:
+                if not self._trial_in_flight:
+                    return  # a call that was already in flight when the breaker opened
+                # Outcome of the half-open trial call
+                self._trial_in_flight = False
+                if success:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                    logger.info("[GENAI] Circuit breaker closed")
+                else:
+                    self._opened_at = time.monotonic()
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) == self.window and failures / self.window >= self.error_rate:
+                self._opened_at = time.monotonic()
+                logger.warning(f"[GENAI] Circuit breaker opened ({failures}/{self.window} calls failed)")
+
+
+# ---------------- ASYNC CLIENT ----------------
+class GenAIClient:
+    """
+    Async Gemini client on a background event loop, so callers on the Kafka thread
+    wait only for their own batch. One pooled keep-alive connection pool is shared by
+    all requests and at most max_concurrency requests are in flight at once.
+    With a batch URL, texts are sent batch_size at a time as {"texts": [...]} and the
+    response is expected as {"results": [{category, confidence}, ...]} in the same order.
+    """
+
+    def __init__(self, api_url: str = None, batch_url: str = None, api_key: str = None,
+                 max_concurrency: int = None, max_connections: int = None, timeout: float = None,
+                 batch_size: int = None, breaker: CircuitBreaker = None):
+        self.api_url = api_url or GEMINI_API_URL
+        self.batch_url = batch_url if batch_url is not None else Settings.GEMINI_API_BATCH_URL
+        self.api_key = api_key if api_key is not None else GEMINI_API_KEY
+        self.max_concurrency = max_concurrency or Settings.GEMINI_MAX_CONCURRENCY
+        self.max_connections = max_connections or Settings.GEMINI_MAX_CONNECTIONS
+        self.timeout = timeout or Settings.GEMINI_TIMEOUT
+        self.batch_size = batch_size or Settings.GEMINI_BATCH_SIZE
+        self.breaker = breaker or CircuitBreaker()
+        self._loop = None
+        self._http = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="genai-client", daemon=True).start()
+            self._loop = loop
+            asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+
+    async def _open(self):
+        self._http = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _post(self, url: str, payload: dict) -> dict:
+        async with self._semaphore:
+            response = await self._http.post(url, json=payload)
+            response.raise_for_status()
+            return response.json()
+
+    async def _call(self, url: str, payload: dict, size: int, parse) -> List[Dict]:
+        if not self.breaker.allow():
+            return [_unknown("Gemini API circuit open; request not sent") for _ in range(size)]
+        try:
+            results = parse(await self._post(url, payload))
+        except asyncio.CancelledError:
+            # Batch deadline passed: count it as a failure (it also ends a half-open trial)
+            self.breaker.record(False)
+            raise
+        except httpx.HTTPError as e:
+            logger.error(f"Gemini API request failed: {e}")
+            self.breaker.record(False)
+            return [_unknown(f"API request error: {str(e)}") for _ in range(size)]
+        except Exception as e:
+            logger.error(f"Unexpected error in Gemini API classification: {e}")
+            self.breaker.record(False)
+            return [_unknown(f"Unexpected API error: {str(e)}") for _ in range(size)]
+        self.breaker.record(True)
+        return results
+
+    @staticmethod
+    def _parse_one(data: dict) -> List[Dict]:
         # Adjust the keys according to the Gemini API response
-        return {
+        return [{
             "category": data.get("category", "Unknown"),
             "confidence": data.get("confidence", 0),
             "details": "Classified using Gemini API"
-        }
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Gemini API request failed: {e}")
-        return {
-            "category": "Unknown",
-            "confidence": 0,
-            "details": f"API request error: {str(e)}"
-        }
-    except Exception as e:
-        logger.error(f"Unexpected error in Gemini API classification: {e}")
-        return {
-            "category": "Unknown",
-            "confidence": 0,
-            "details": f"Unexpected API error: {str(e)}"
-        }
+        }]
+
+    @classmethod
+    def _parse_batch(cls, size: int):
+        def parse(data: dict) -> List[Dict]:
+            results = data.get("results") or []
+            if len(results) != size:
+                raise ValueError(f"expected {size} results, got {len(results)}")
+            return [cls._parse_one(item)[0] for item in results]
+        return parse
+
+    async def classify_many_async(self, texts: List[str]) -> List[Dict]:
+        if self.batch_url:
+            chunks = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+            calls = [self._call(self.batch_url, {"texts": chunk}, len(chunk), self._parse_batch(len(chunk))) for chunk in chunks]
+        else:
+            calls = [self._call(self.api_url, {"text": text}, 1, self._parse_one) for text in texts]
+        results = []
+        for chunk_results in await asyncio.gather(*calls):
+            results.extend(chunk_results)
+        return results
+
+    def classify_many(self, texts: List[str], deadline: float = None) -> List[Dict]:
+        """
+        Blocking entry point: classify texts concurrently on the client's event loop.
+        Waits at most `deadline` seconds (GEMINI_BATCH_DEADLINE) for the whole batch;
+        after that the requests are cancelled and every text gets an Unknown result,
+        so the cascade keeps the models' answers.
+        """
+        if not texts:
+            return []
+        if not self.api_key:
+            logger.error("Gemini API key not set in environment variables.")
+            return [_unknown("No API key available for Gemini API") for _ in range(len(texts))]
+        deadline = Settings.GEMINI_BATCH_DEADLINE if deadline is None else deadline
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self.classify_many_async(texts), self._loop)
+        try:
+            return future.result(timeout=deadline)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            logger.warning(f"[GENAI] {len(texts)} texts not classified within {deadline}s; keeping model results")
+            return [_unknown(f"Gemini API deadline of {deadline}s exceeded") for _ in range(len(texts))]
+
+    def close(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._http.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> GenAIClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GenAIClient()
+        return _client
+
+
+def classify_many(texts: List[str]) -> List[Dict]:
+    """
+    Fallback classification of several texts using Gemini API.
+    Returns one dictionary per text: {category, confidence, details}
+    """
+    return get_client().classify_many(texts)
+
+
+def classify_with_api(text: str) -> Dict:
+    """
+    Fallback document classification using Gemini API.
+    Returns a dictionary: {category, confidence, details}
+    """
+    return classify_many([text])[0]
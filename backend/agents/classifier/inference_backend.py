@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import pickle
+from itertools import zip_longest
+import logging
+import numpy as np
+from backend.common.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Fallback sample when the training corpus is not available on this host
+SAMPLE_TEXTS = [
+    "invoice total amount due payment within thirty days",
+    "this agreement is entered into by and between the parties",
+    "curriculum vitae work experience education skills",
+    "patient diagnosis prescribed medication dosage",
+    "",
+]
+
+
+def load_corpus(folder: str = None, limit: int = None) -> list:
+    """
+    Texts from a training_data-style folder (one subfolder per category).
+    With a limit, files are taken round-robin across categories, so a sample
+    covers every category rather than the first ones in sorted order.
+    """
+    folder = folder or Settings.TRAINING_DATA_DIR
+    if not os.path.isdir(folder):
+        return []
+    per_category = []
+    for category in sorted(os.listdir(folder)):
+        category_folder = os.path.join(folder, category)
+        if os.path.isdir(category_folder):
+            per_category.append([os.path.join(category_folder, file) for file in sorted(os.listdir(category_folder))])
+    files = [path for round_files in zip_longest(*per_category) for path in round_files if path is not None]
+
+    texts = []
+    for path in files[:limit] if limit else files:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            texts.append(f.read())
+    return texts
+
+
+class OnnxForestPipeline:
+    """
+    The sklearn TF-IDF step followed by the forest compiled to an ONNX Runtime
+    TreeEnsemble. Sessions run single-threaded: per-call overhead, not parallelism,
+    dominates the small batches of interactive uploads.
+    """
+    name = "onnx"
+
+    def __init__(self, pipeline):
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+        import onnxruntime as ort
+
+        self.vectorizer = pipeline.steps[0][1]
+        forest = pipeline.steps[-1][1]
+        n_features = len(self.vectorizer.vocabulary_)
+        onnx_model = convert_sklearn(
+            forest,
+            initial_types=[("input", FloatTensorType([None, n_features]))],
+            options={id(forest): {"zipmap": False}},
+            target_opset={"": 17, "ai.onnx.ml": 3},
+        )
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(onnx_model.SerializeToString(), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = next(o.name for o in self.session.get_outputs() if o.name == "probabilities")
+
+    def predict_proba(self, texts: list) -> np.ndarray:
+        return self.predict_proba_features(self.vectorizer.transform(texts))
+
+    def predict_proba_features(self, X) -> np.ndarray:
+        """Forest probabilities for (sparse or dense) TF-IDF rows."""
+        X = X.toarray() if hasattr(X, "toarray") else X
+        return self.session.run([self.output_name], {self.input_name: X.astype(np.float32)})[0]
+
+
+INFERENCE_BACKENDS = {
+    OnnxForestPipeline.name: OnnxForestPipeline,
+}
+
+
+def check_backend(reference, candidate, texts: list, atol: float = None) -> tuple:
+    """
+    Compare candidate probabilities with the reference (sklearn) pipeline.
+    Returns (ok, max_abs_diff, label_agreement). Compiled forests compare float32
+    thresholds, so tiny differences are expected; predicted labels must all agree.
+    """
+    atol = atol if atol is not None else Settings.CLASSIFIER_INFERENCE_ATOL
+    expected = reference.predict_proba(texts)
+    actual = candidate.predict_proba(texts)
+    max_diff = float(np.abs(expected - actual).max()) if len(texts) else 0.0
+    agreement = float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1))) if len(texts) else 1.0
+    return max_diff <= atol and agreement == 1.0, max_diff, agreement
+
+
+def select_backend(pipeline, backend: str = None):
+    """
+    Wrap a fitted sklearn pipeline in the configured compiled backend after it passes
+    the correctness check on the training corpus; otherwise return the sklearn pipeline.
+    """
+    backend = backend or Settings.CLASSIFIER_INFERENCE_BACKEND
+    if backend == "sklearn":
+        return pipeline
+    if backend not in INFERENCE_BACKENDS:
+        logger.error(f"[INFERENCE] Unknown backend {backend}; using sklearn")
+        return pipeline
+    try:
+        compiled = INFERENCE_BACKENDS[backend](pipeline)
+        texts = load_corpus(limit=Settings.CLASSIFIER_INFERENCE_CHECK_DOCS) or SAMPLE_TEXTS
+        ok, max_diff, agreement = check_backend(pipeline, compiled, texts)
+    except Exception as e:
+        logger.error(f"[INFERENCE] {backend} backend unavailable ({e}); using sklearn")
+        return pipeline
+    if not ok:
+        logger.error(
+            f"[INFERENCE] {backend} backend disagrees with sklearn on {len(texts)} docs "
+            f"(max diff {max_diff:.2e}, label agreement {agreement:.2%}); using sklearn"
+        )
+        return pipeline
+    logger.info(f"[INFERENCE] Using {backend} backend (checked on {len(texts)} docs, max diff {max_diff:.2e})")
+    return compiled
+
+
+def latency_percentiles(pipeline, texts: list, runs: int = 1) -> dict:
+    """Single-document predict_proba latency in milliseconds."""
+    timings = []
+    for _ in range(runs):
+        for text in texts:
+            start = time.perf_counter()
+            pipeline.predict_proba([text])
+            timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "p99_ms": round(float(np.percentile(timings, 99)), 3),
+    }
+
+
+if __name__ == "__main__":
+    # python -m backend.agents.classifier.inference_backend [model.pkl] [backend]
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+    model_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "ai_model.pkl")
+    backend = sys.argv[2] if len(sys.argv) > 2 else "onnx"
+    with open(model_path, "rb") as f:
+        sklearn_pipeline = pickle.load(f)["pipeline"]
+    corpus = load_corpus() or SAMPLE_TEXTS
+    compiled = INFERENCE_BACKENDS[backend](sklearn_pipeline)
+    ok, max_diff, agreement = check_backend(sklearn_pipeline, compiled, corpus)
+    print(f"[INFERENCE] {backend} vs sklearn on {len(corpus)} docs: ok={ok} max diff={max_diff:.2e} label agreement={agreement:.2%}")
+    print(f"[INFERENCE] sklearn latency: {latency_percentiles(sklearn_pipeline, corpus)}")
+    print(f"[INFERENCE] {backend} latency: {latency_percentiles(compiled, corpus)}")
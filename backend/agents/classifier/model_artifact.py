@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import shutil
+import pickle
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+MANIFEST_FILENAME = "manifest.json"
+FORMAT_VERSION = 1
+
+# TfidfVectorizer parameters that shape inference; anything else is fit-time only
+ANALYZER_PARAMS = [
+    "analyzer", "lowercase", "strip_accents", "token_pattern", "ngram_range",
+    "stop_words", "binary", "norm", "use_idf", "sublinear_tf",
+]
+
+
+def is_mmap_artifact(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILENAME))
+
+
+# ---------------- EXPORT ----------------
+def export_artifact(pipeline, label_encoder, out_dir: str, version: str = None) -> str:
+    """
+    Write a fitted Pipeline([("tfidf", TfidfVectorizer), ("rf", RandomForestClassifier)])
+    as a directory of .npy arrays plus manifest.json. The manifest is written last, so a
+    directory without one is incomplete.
+    """
+    vectorizer = pipeline.steps[0][1]
+    forest = pipeline.steps[-1][1]
+    if vectorizer.tokenizer is not None or vectorizer.preprocessor is not None or callable(vectorizer.analyzer):
+        raise ValueError("custom tokenizer/preprocessor/analyzer callables cannot be exported")
+
+    out_dir = os.path.abspath(out_dir)
+    tmp_dir = os.path.join(os.path.dirname(out_dir), "." + os.path.basename(out_dir) + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    # Vocabulary: fixed-width byte strings sorted for binary search, plus their column numbers
+    terms = sorted((term.encode("utf-8"), column) for term, column in vectorizer.vocabulary_.items())
+    np.save(os.path.join(tmp_dir, "vocab_terms.npy"), np.array([t for t, _ in terms], dtype=bytes))
+    np.save(os.path.join(tmp_dir, "vocab_columns.npy"), np.array([c for _, c in terms], dtype=np.int32))
+    if vectorizer.use_idf:
+        np.save(os.path.join(tmp_dir, "idf.npy"), vectorizer.idf_.astype(np.float64))
+
+    # Trees: concatenated node arrays with global child indices; leaves point at themselves
+    left, right, feature, threshold, value = [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        nodes = np.arange(tree.node_count)
+        left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+        right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        leaf_value = tree.value[:, 0, :]
+        value.append(leaf_value / np.maximum(leaf_value.sum(axis=1, keepdims=True), 1e-12))
+        offset += tree.node_count
+    np.save(os.path.join(tmp_dir, "tree_left.npy"), np.concatenate(left).astype(np.int32))
+    np.save(os.path.join(tmp_dir, "tree_right.npy"), np.concatenate(right).astype(np.int32))
+    np.save(os.path.join(tmp_dir, "tree_feature.npy"), np.concatenate(feature).astype(np.int32))
+    np.save(os.path.join(tmp_dir, "tree_threshold.npy"), np.concatenate(threshold).astype(np.float64))
+    np.save(os.path.join(tmp_dir, "tree_value.npy"), np.concatenate(value).astype(np.float32))
+    roots = np.cumsum([0] + [e.tree_.node_count for e in forest.estimators_[:-1]])
+    np.save(os.path.join(tmp_dir, "tree_roots.npy"), roots.astype(np.int32))
+
+    params = vectorizer.get_params()
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "labels": [str(label) for label in label_encoder.inverse_transform(forest.classes_)],
+        "n_features": len(vectorizer.vocabulary_),
+        "max_depth": int(max(e.tree_.max_depth for e in forest.estimators_)),
+        "vectorizer": {
+            key: list(params[key]) if isinstance(params[key], tuple) else params[key]
+            for key in ANALYZER_PARAMS
+        },
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILENAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return out_dir
+
+
+# ---------------- INFERENCE ----------------
+class MmapPipeline:
+    """
+    predict_proba() over an exported artifact. Arrays are opened with mmap_mode="r",
+    so every worker process on a host shares one page-cache copy and loading reads
+    only the manifest. The TF-IDF transform and the forest traversal are done in numpy,
+    all trees and texts at once.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILENAME)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"unsupported artifact format {self.manifest.get('format')}")
+
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.vocab_terms = load("vocab_terms.npy")
+        self.vocab_columns = load("vocab_columns.npy")
+        self.idf = load("idf.npy") if os.path.exists(os.path.join(path, "idf.npy")) else None
+        self.left = load("tree_left.npy")
+        self.right = load("tree_right.npy")
+        self.feature = load("tree_feature.npy")
+        self.threshold = load("tree_threshold.npy")
+        self.value = load("tree_value.npy")
+        self.roots = load("tree_roots.npy")
+
+        params = dict(self.manifest["vectorizer"])
+        params["ngram_range"] = tuple(params["ngram_range"])
+        self.binary = params["binary"]
+        self.norm = params["norm"]
+        self.sublinear_tf = params["sublinear_tf"]
+        # Only the analyzer is used; it needs no fitted state
+        self.analyze = TfidfVectorizer(**params).build_analyzer()
+
+    @property
+    def classes_(self) -> list:
+        return self.manifest["labels"]
+
+    def transform(self, texts: list) -> np.ndarray:
+        """Dense TF-IDF rows (float32, like the forest sees them)."""
+        X = np.zeros((len(texts), self.manifest["n_features"]), dtype=np.float64)
+        width = self.vocab_terms.dtype.itemsize
+        for row, text in enumerate(texts):
+            tokens = [t for t in (tok.encode("utf-8") for tok in self.analyze(text)) if len(t) <= width]
+            if not tokens:
+                continue
+            queries = np.array(tokens, dtype=self.vocab_terms.dtype)
+            positions = np.searchsorted(self.vocab_terms, queries)
+            positions = np.minimum(positions, len(self.vocab_terms) - 1)
+            known = positions[self.vocab_terms[positions] == queries]
+            np.add.at(X[row], self.vocab_columns[known], 1.0)
+
+        if self.binary:
+            np.minimum(X, 1.0, out=X)
+        if self.sublinear_tf:
+            counted = X > 0
+            X[counted] = np.log(X[counted]) + 1
+        if self.idf is not None:
+            X *= self.idf
+        if self.norm == "l2":
+            X /= np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+        elif self.norm == "l1":
+            X /= np.maximum(np.abs(X).sum(axis=1, keepdims=True), 1e-12)
+        return X.astype(np.float32)
+
+    def predict_proba(self, texts: list) -> np.ndarray:
+        return self.predict_proba_features(self.transform(texts))
+
+    def predict_proba_features(self, X: np.ndarray) -> np.ndarray:
+        """Forest probabilities for dense float32 TF-IDF rows."""
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        # Leaves are self-loops, so max_depth steps lands every (text, tree) on its leaf
+        for _ in range(self.manifest["max_depth"]):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].mean(axis=1, dtype=np.float64)
+
+
+if __name__ == "__main__":
+    # python -m backend.agents.classifier.model_artifact <ai_model.pkl> <out_dir>
+    if len(sys.argv) != 3:
+        print("usage: model_artifact.py <model.pkl> <out_dir>")
+        sys.exit(1)
+    with open(sys.argv[1], "rb") as f:
+        data = pickle.load(f)
+    out = export_artifact(data["pipeline"], data["label_encoder"], sys.argv[2], data.get("version"))
+    print(f"[AI MODEL] Exported memory-mapped artifact to {out}")
@@ -0,0 +1,178 @@
+import os
+import shutil
+import logging
+import argparse
+import threading
+import numpy as np
+from backend.common.config import Settings
+from backend.agents.classifier.ai_model import AIModel
+from backend.agents.classifier.model_artifact import MANIFEST_FILENAME, is_mmap_artifact
+
+logger = logging.getLogger(__name__)
+
+# Pointer file naming the artifact to serve; written only by promote(), so nothing is served unpromoted
+CURRENT_POINTER = "CURRENT"
+
+# Smoke inputs every candidate model must score before it is activated
+VALIDATION_TEXTS = [
+    "invoice total amount due payment",
+    "agreement between the parties hereby",
+    "curriculum vitae work experience education",
+    "",
+]
+
+
+def _artifact_mtime(path: str) -> float:
+    # A memory-mapped artifact is a directory; its manifest is written last
+    if is_mmap_artifact(path):
+        return os.path.getmtime(os.path.join(path, MANIFEST_FILENAME))
+    return os.path.getmtime(path)
+
+
+def validate_model(model: AIModel) -> None:
+    """Raise ValueError unless the model loaded and produces sane probabilities."""
+    if model.pipeline is None:
+        raise ValueError(f"artifact {model.model_path} did not load")
+    probs = model.pipeline.predict_proba(VALIDATION_TEXTS)
+    n_classes = len(model.label_encoder.classes_)
+    if probs.shape != (len(VALIDATION_TEXTS), n_classes):
+        raise ValueError(f"expected probabilities of shape {(len(VALIDATION_TEXTS), n_classes)}, got {probs.shape}")
+    if not np.allclose(probs.sum(axis=1), 1.0, atol=1e-3):
+        raise ValueError("probabilities do not sum to 1")
+
+
+def evaluate(model: AIModel, texts: list, labels: list) -> float:
+    """Accuracy of a model's top category on labelled texts."""
+    results = model.predict_batch(texts)
+    return float(np.mean([str(result["category"]) == str(label) for result, label in zip(results, labels)]))
+
+
+def promote(artifact: str, registry_dir: str = None) -> str:
+    """
+    Make the registry serve `artifact` (a *.pkl or memory-mapped directory). An
+    artifact from elsewhere, e.g. an online-trainer checkpoint, is first copied into
+    the registry. The model is validated, then CURRENT is replaced atomically;
+    watching classifiers switch on their next poll. Returns the artifact's name.
+    """
+    registry_dir = registry_dir or Settings.MODEL_REGISTRY_DIR
+    os.makedirs(registry_dir, exist_ok=True)
+    name = os.path.basename(os.path.normpath(artifact))
+    path = os.path.join(registry_dir, name)
+    validate_model(AIModel(artifact))
+    if not os.path.exists(path) or not os.path.samefile(artifact, path):
+        # Dot-prefixed while being copied, like every other partial artifact
+        tmp_path = os.path.join(registry_dir, f".{name}.tmp")
+        if os.path.isdir(artifact):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            shutil.copytree(artifact, tmp_path)
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            shutil.copyfile(artifact, tmp_path)
+        os.replace(tmp_path, path)
+    pointer_tmp = os.path.join(registry_dir, f".{CURRENT_POINTER}.tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(name + "\n")
+    os.replace(pointer_tmp, os.path.join(registry_dir, CURRENT_POINTER))
+    logger.info(f"[REGISTRY] Promoted {name}")
+    return name
+
+
+class ModelRegistry:
+    """
+    Serves the model artifact promoted in a registry directory, hot-swapping it when
+    the promotion changes. Only the artifact named in the CURRENT pointer file (see
+    promote()) is ever served: writing an artifact into the directory does not deploy
+    it. Without a promotion the bundled model is served. Candidates are loaded and
+    validated on a background thread; `active` is swapped in one reference
+    assignment, so a batch that read it keeps using the same model to the end.
+    """
+
+    def __init__(self, registry_dir: str = None, poll_interval: float = None, fallback_path: str = None):
+        self.registry_dir = registry_dir or Settings.MODEL_REGISTRY_DIR
+        self.poll_interval = poll_interval or Settings.MODEL_REGISTRY_POLL_SECONDS
+        self._source = None   # (path, mtime) of the active artifact
+        self._rejected = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.active = None
+        self.refresh()
+        if self.active is None:
+            # Nothing promoted: serve the model shipped next to the classifier
+            self.active = AIModel(fallback_path)
+
+    def _candidate(self) -> tuple | None:
+        if not os.path.isdir(self.registry_dir):
+            return None
+        pointer = os.path.join(self.registry_dir, CURRENT_POINTER)
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer) as f:
+            path = os.path.join(self.registry_dir, f.read().strip())
+        try:
+            return path, _artifact_mtime(path)
+        except OSError:
+            return None
+
+    def refresh(self) -> bool:
+        """Load the registry's current artifact if it changed. Returns True when a new model was activated."""
+        candidate = self._candidate()
+        if candidate is None or candidate == self._source or candidate in self._rejected:
+            return False
+        path = candidate[0]
+        try:
+            model = AIModel(path)
+            validate_model(model)
+        except Exception as e:
+            logger.error(f"[REGISTRY] Rejected model artifact {path}: {e}")
+            self._rejected.add(candidate)
+            return False
+
+        previous = self.active.version if self.active else None
+        self.active = model
+        self._source = candidate
+        logger.info(f"[REGISTRY] Activated model {model.version} from {path} (was {previous})")
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"[REGISTRY] Refresh failed: {e}")
+
+    def start(self):
+        """Start polling the registry in a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self._thread.start()
+            logger.info(f"[REGISTRY] Watching {self.registry_dir} every {self.poll_interval}s")
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Promote a model artifact in the registry.")
+    parser.add_argument("artifact", help="Artifact to serve (.pkl or memory-mapped directory); copied into the registry if elsewhere")
+    parser.add_argument("--registry", default=Settings.MODEL_REGISTRY_DIR)
+    parser.add_argument("--data", help="Labelled folder (one subfolder per category) for an accuracy gate")
+    parser.add_argument("--min-accuracy", type=float, default=0.0, help="Refuse promotion below this accuracy on --data")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+
+    if args.data:
+        from backend.agents.classifier.train_model import load_training_data
+        texts, labels = load_training_data(args.data)
+        accuracy = evaluate(AIModel(args.artifact), texts, labels)
+        current = ModelRegistry(args.registry)._candidate()
+        if current is not None:
+            logger.info(f"[REGISTRY] Currently promoted {current[0]}: accuracy {evaluate(AIModel(current[0]), texts, labels):.4f}")
+        logger.info(f"[REGISTRY] {args.artifact}: accuracy {accuracy:.4f} on {len(texts)} documents")
+        if accuracy < args.min_accuracy:
+            raise SystemExit(f"[ERROR] Accuracy {accuracy:.4f} below --min-accuracy {args.min_accuracy}; not promoted")
+    promote(args.artifact, args.registry)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import os
+import glob
+import time
+import random
+import pickle
+import logging
+import argparse
+from datetime import datetime, timezone
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
+
+from backend.common.config import Settings
+from backend.common.kafka_consumer import KafkaConsumerClient
+from backend.common.text_store import resolve_text, get_text_store
+from backend.database.models import SessionLocal, Document, Extraction
+
+logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PREFIX = "online-"
+
+
+class OnlineModel:
+    """
+    A HashingVectorizer + SGDClassifier(log_loss) updated with partial_fit.
+    The vectorizer is stateless, so nothing is refit as the corpus grows; a label
+    never seen before is added as a new class without losing what was learned.
+    SGD needs two classes for its first fit, so examples are held back until a
+    second category has been seen.
+    """
+
+    def __init__(self, labels: list = None, n_features: int = None):
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features or Settings.ONLINE_HASH_FEATURES,
+            stop_words="english",
+            alternate_sign=False,
+            norm="l2",
+        )
+        self.clf = SGDClassifier(loss="log_loss", alpha=1e-5, random_state=42)
+        self.labels = list(labels or [])
+        self.updates = 0  # examples learned so far
+        self._held = ([], [])  # (texts, labels) waiting for a second category
+
+    @classmethod
+    def from_artifact(cls, data: dict) -> "OnlineModel":
+        model = cls.__new__(cls)
+        model.vectorizer = data["pipeline"].named_steps["hash"]
+        model.clf = data["pipeline"].named_steps["clf"]
+        model.labels = list(data["labels"])
+        model.updates = data.get("updates", 0)
+        model._held = ([], [])
+        return model
+
+    @property
+    def fitted(self) -> bool:
+        return hasattr(self.clf, "coef_")
+
+    def _add_label(self, label: str):
+        self.labels.append(label)
+        if not self.fitted or len(self.labels) <= 2:
+            return
+        coef, intercept = self.clf.coef_, self.clf.intercept_
+        if coef.shape[0] == 1:
+            # Binary SGD keeps one row scoring classes_[1]; split it into one-vs-rest rows
+            coef = np.vstack([-coef, coef])
+            intercept = np.concatenate([-intercept, intercept])
+        self.clf.coef_ = np.vstack([coef, np.zeros((1, coef.shape[1]))])
+        self.clf.intercept_ = np.append(intercept, 0.0)
+        self.clf.classes_ = np.arange(len(self.labels))
+
+    def partial_fit(self, texts: list, labels: list):
+        if not self.fitted:
+            held_texts, held_labels = self._held
+            held_texts.extend(texts)
+            held_labels.extend(labels)
+            if len(set(held_labels)) < 2:
+                logger.info(f"[ONLINE] Holding {len(held_texts)} example(s) until a second category is seen")
+                return
+            texts, labels = held_texts, held_labels
+            self._held = ([], [])
+        for label in labels:
+            if label not in self.labels:
+                logger.info(f"[ONLINE] New category: {label}")
+                self._add_label(label)
+        y = np.array([self.labels.index(label) for label in labels])
+        X = self.vectorizer.transform(texts)
+        if self.fitted:
+            self.clf.partial_fit(X, y)
+        else:
+            self.clf.partial_fit(X, y, classes=np.arange(len(self.labels)))
+        self.updates += len(texts)
+
+    def predict_proba(self, texts: list) -> np.ndarray:
+        return self.clf.predict_proba(self.vectorizer.transform(texts))
+
+    def artifact(self, version: str) -> dict:
+        """The {pipeline, label_encoder, ...} dict AIModel loads."""
+        label_encoder = LabelEncoder()
+        # Column order, not sorted order: AIModel only inverse-transforms column indexes
+        label_encoder.classes_ = np.array(self.labels)
+        return {
+            "pipeline": Pipeline([("hash", self.vectorizer), ("clf", self.clf)]),
+            "label_encoder": label_encoder,
+            "version": version,
+            "labels": list(self.labels),
+            "updates": self.updates,
+        }
+
+
+# ---------------- CHECKPOINTS ----------------
+def latest_checkpoint(directory: str) -> str | None:
+    paths = glob.glob(os.path.join(directory, f"{CHECKPOINT_PREFIX}*.pkl"))
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def save_checkpoint(model: OnlineModel, directory: str, keep: int = None) -> str:
+    """
+    Write a versioned checkpoint and prune old ones. Checkpoints live outside the
+    model registry: one is only served after being promoted there (model_registry).
+    """
+    keep = keep or Settings.ONLINE_KEEP_CHECKPOINTS
+    os.makedirs(directory, exist_ok=True)
+    version = f"{CHECKPOINT_PREFIX}{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}-{model.updates}"
+    path = os.path.join(directory, f"{version}.pkl")
+    # Dot-prefixed while being written, so a reader never loads a partial file
+    tmp_path = os.path.join(directory, f".{version}.pkl.tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(model.artifact(version), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+    checkpoints = sorted(glob.glob(os.path.join(directory, f"{CHECKPOINT_PREFIX}*.pkl")), key=os.path.getmtime)
+    for old in checkpoints[:-keep]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    logger.info(f"[ONLINE] Checkpoint {version} saved ({model.updates} examples learned)")
+    return path
+
+
+def load_model(directory: str) -> OnlineModel:
+    path = latest_checkpoint(directory)
+    if not path:
+        logger.info("[ONLINE] No checkpoint found; starting a new model")
+        return OnlineModel()
+    with open(path, "rb") as f:
+        model = OnlineModel.from_artifact(pickle.load(f))
+    logger.info(f"[ONLINE] Resumed from {path} ({model.updates} examples, labels {model.labels})")
+    return model
+
+
+# ---------------- FEEDBACK ----------------
+def feedback_text(message: dict) -> str:
+    """Text of a feedback message: inline / claim-check text, else the document's latest extraction."""
+    text = resolve_text(message)
+    if text:
+        return text
+    db = SessionLocal()
+    try:
+        query = db.query(Extraction.id).join(Document, Extraction.document_id == Document.id)
+        if message.get("document_id"):
+            query = query.filter(Document.id == message["document_id"])
+        elif message.get("document_name"):
+            query = query.filter(Document.filename == message["document_name"])
+        else:
+            return ""
+        row = query.order_by(Extraction.id.desc()).first()
+    finally:
+        db.close()
+    return get_text_store("db").get(row[0]) if row else ""
+
+
+class OnlineTrainer:
+    """
+    Learns from corrected labels in mini-batches and checkpoints every
+    checkpoint_every examples or checkpoint_seconds, whichever comes first.
+    Feedback messages look like
+    {"document_id" | "document_name", "category", ["extracted_text" | "text_ref"]}.
+    """
+
+    def __init__(self, directory: str = None, checkpoint_every: int = None, checkpoint_seconds: float = None):
+        self.directory = directory or Settings.ONLINE_CHECKPOINT_DIR
+        self.checkpoint_every = checkpoint_every or Settings.ONLINE_CHECKPOINT_EVERY
+        self.checkpoint_seconds = checkpoint_seconds or Settings.ONLINE_CHECKPOINT_SECONDS
+        self.model = load_model(self.directory)
+        self._pending = 0
+        self._last_checkpoint = time.monotonic()
+
+    def learn(self, texts: list, labels: list):
+        if not texts:
+            return
+        self.model.partial_fit(texts, labels)
+        self._pending += len(texts)
+        if self._pending >= self.checkpoint_every or time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds:
+            self.checkpoint()
+
+    def checkpoint(self):
+        if not self._pending or not self.model.fitted:
+            return
+        save_checkpoint(self.model, self.directory)
+        self._pending = 0
+        self._last_checkpoint = time.monotonic()
+
+    def handle_batch(self, messages: list):
+        texts, labels = [], []
+        for message in messages:
+            category = message.get("category")
+            text = feedback_text(message) if category else ""
+            if not text:
+                logger.warning(f"[ONLINE] Skipping feedback without category or text: {message}")
+                continue
+            texts.append(text)
+            labels.append(category)
+        self.learn(texts, labels)
+        logger.info(f"[ONLINE] Learned {len(texts)} corrections ({self.model.updates} total)")
+
+
+def bootstrap(trainer: OnlineTrainer, folder: str, batch_size: int):
+    """Warm-start from a training_data-style corpus, streamed in shuffled mini-batches."""
+    from backend.agents.classifier.train_model import load_training_data
+
+    texts, labels = load_training_data(folder)
+    order = np.random.default_rng(42).permutation(len(texts))
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        trainer.learn([texts[i] for i in batch], [labels[i] for i in batch])
+    trainer.checkpoint()
+    logger.info(f"[ONLINE] Bootstrapped from {len(texts)} documents in {folder}")
+
+
+# ---------------- HELPER: Retry wrapper ----------------
+def retry_with_backoff(func, max_retries=5, base_delay=1, max_delay=30, *args, **kwargs):
+    """Retry function with exponential backoff."""
+    attempt = 0
+    while attempt < max_retries:
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            wait_time = min(max_delay, base_delay * (2 ** attempt)) + random.uniform(0, 0.5)
+            logger.warning(
+                f"[RETRY] {func.__name__} failed (attempt {attempt+1}/{max_retries}): {e}. "
+                f"Retrying in {wait_time:.1f}s..."
+            )
+            time.sleep(wait_time)
+            attempt += 1
+    raise Exception(f"[FATAL] {func.__name__} failed after {max_retries} retries.")
+
+
+# ---------------- MAIN LOOP ----------------
+def main():
+    parser = argparse.ArgumentParser(description="Online classifier training from classification feedback.")
+    parser.add_argument("--checkpoints", default=Settings.ONLINE_CHECKPOINT_DIR, help="Where checkpoints are written")
+    parser.add_argument("--bootstrap", metavar="FOLDER", help="Learn a training_data-style corpus first")
+    args = parser.parse_args()
+
+    trainer = OnlineTrainer(args.checkpoints)
+    if args.bootstrap:
+        bootstrap(trainer, args.bootstrap, Settings.ONLINE_BATCH_SIZE)
+
+    # Initialize Kafka consumer with retry
+    try:
+        consumer = retry_with_backoff(
+            KafkaConsumerClient,
+            max_retries=5,
+            topic=Settings.KAFKA_TOPIC_FEEDBACK,
+            group_id="online_trainer_group",
+        )
+    except Exception as e:
+        logger.critical(f"[FATAL] Could not connect to Kafka: {e}")
+        trainer.checkpoint()
+        return
+
+    try:
+        consumer.consume_batches(
+            trainer.handle_batch,
+            max_records=Settings.ONLINE_BATCH_SIZE,
+            timeout_ms=Settings.ONLINE_BATCH_TIMEOUT_MS,
+        )
+    except KeyboardInterrupt:
+        logger.info("[ONLINE] Shutting down...")
+    finally:
+        trainer.checkpoint()
+        consumer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,30 @@
-import re
+import time
 import redis
 import json
+import logging
+import threading
 from typing import Dict, List
 from sqlalchemy.orm import Session
 from datetime import datetime
 from backend.database.models import SessionLocal, ClassificationRule
 from backend.common.config import Settings
+from backend.agents.classifier.rule_matcher import CompiledRuleSet
 
 # Redis client for caching rules
 r = redis.Redis(host=Settings.REDIS_HOST, port=Settings.REDIS_PORT, decode_responses=True)
+logger = logging.getLogger(__name__)
+
+RULES_CACHE_KEY = "classification_rules"
+RULES_VERSION_KEY = "classification_rules:version"
+RULES_CHANNEL = "classification_rules:changed"
+
+
+def publish_rules_changed():
+    """Bump the ruleset version and notify every classifier replica."""
+    version = r.incr(RULES_VERSION_KEY)
+    r.publish(RULES_CHANNEL, version)
+    return version
+
 
 class RuleBasedClassifier:
     def __init__(self):
@@ -23,16 +39,28 @@ class RuleBasedClassifier:
             "prescription": "Medical",
             "report": "Technical",
         }
+        # In-process cache: compiled ruleset of the last version seen, dropped on change notifications
+        self._compiled = None
+        self._checked_at = 0.0
+        self._stale = threading.Event()
+        self._lock = threading.Lock()
+        self._subscriber = None
 
     def _load_rules_from_db(self) -> Dict[str, str]:
         """
         Load all rules from DB or Redis cache.
         Returns: {keyword: category}
         """
-        cache_key = "classification_rules"
+        return json.loads(self._load_rules_json())
+
+    def _load_rules_json(self, version: str = None) -> str:
+        """Serialized ruleset, from the Redis cache or rebuilt from the DB."""
+        # Payloads are cached per version, so a rebuild racing with an edit cannot be served as current
+        version = version if version is not None else (r.get(RULES_VERSION_KEY) or "0")
+        cache_key = f"{RULES_CACHE_KEY}:{version}"
         cached = r.get(cache_key)
         if cached:
-            return json.loads(cached)
+            return cached
 
         db: Session = SessionLocal()
         try:
@@ -40,34 +68,84 @@ class RuleBasedClassifier:
             rules_dict = {r.keyword.lower(): r.category for r in rules}
             # Merge default rules
             rules_dict = {**self.default_rules, **rules_dict}
+            payload = json.dumps(rules_dict)
             # Cache in Redis for 1 hour
-            r.setex(cache_key, 3600, json.dumps(rules_dict))
-            return rules_dict
+            r.setex(cache_key, 3600, payload)
+            return payload
         finally:
             db.close()
 
-    def get_applicable_rules(self, text: str) -> Dict:
+    def _start_subscriber(self):
+        """Background thread that marks the local ruleset stale on every change notification."""
+        def listen():
+            while True:
+                try:
+                    pubsub = r.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(RULES_CHANNEL)
+                    # Notifications may have been missed while (re)connecting
+                    self._stale.set()
+                    for message in pubsub.listen():
+                        if message.get("type") == "message":
+                            self._stale.set()
+                except Exception as e:
+                    logger.warning(f"[RULES] Subscription to {RULES_CHANNEL} lost: {e}. Reconnecting...")
+                    self._stale.set()
+                    time.sleep(1)
+
+        self._subscriber = threading.Thread(target=listen, name="rules-subscriber", daemon=True)
+        self._subscriber.start()
+
+    def _compiled_rules(self) -> CompiledRuleSet:
         """
-        Scan text for rule matches.
-        Returns a dict with forced_category if any keyword is found.
+        The ruleset compiled into one matcher, served from process memory.
+        Redis is only consulted after a change notification, or every
+        RULES_CACHE_MAX_AGE seconds as a safety net for lost notifications.
         """
-        rules = self._load_rules_from_db()
-        text_lower = text.lower()
+        if self._subscriber is None:
+            with self._lock:
+                if self._subscriber is None:
+                    self._start_subscriber()
+
+        compiled = self._compiled
+        fresh = time.monotonic() - self._checked_at < Settings.RULES_CACHE_MAX_AGE
+        if compiled is not None and fresh and not self._stale.is_set():
+            return compiled
 
-        for keyword, category in rules.items():
-            if re.search(rf"\b{keyword}\b", text_lower):
-                return {"forced_category": category, "matched_keyword": keyword}
+        with self._lock:
+            self._stale.clear()
+            version = r.get(RULES_VERSION_KEY) or "0"
+            if self._compiled is None or self._compiled.version != version:
+                payload = self._load_rules_json(version)
+                self._compiled = CompiledRuleSet(json.loads(payload), version)
+                logger.info(f"[RULES] Loaded ruleset version {version} ({len(self._compiled.rules)} rules)")
+            self._checked_at = time.monotonic()
+            return self._compiled
 
-        return {}
+    def ruleset_version(self) -> str:
+        return self._compiled_rules().version
+
+    def get_applicable_rules(self, text: str) -> Dict:
+        """
+        Scan text for rule matches in a single pass.
+        Returns a dict with forced_category (highest-priority keyword) and all
+        matched categories if any keyword is found.
+        """
+        compiled = self._compiled_rules()
+        keyword, categories = compiled.match(text.lower())
+        if keyword is None:
+            return {}
+        return {
+            "forced_category": compiled.rules[keyword],
+            "matched_keyword": keyword,
+            "matched_categories": categories,
+        }
 
     def suggest_categories(self, text: str) -> List[str]:
         """
         Suggest possible categories by scanning all matches.
         """
-        rules = self._load_rules_from_db()
-        text_lower = text.lower()
-        matches = [category for k, category in rules.items() if k in text_lower]
-        return list(set(matches))  # unique categories
+        _, categories = self._compiled_rules().match(text.lower())
+        return categories
 
     # -------- Methods to manage rules --------
     def add_rule(self, keyword: str, category: str, created_by: str = None):
@@ -81,8 +159,8 @@ class RuleBasedClassifier:
                 new_rule = ClassificationRule(keyword=keyword.lower(), category=category, created_by=created_by)
                 db.add(new_rule)
             db.commit()
-            # Invalidate Redis cache
-            r.delete("classification_rules")
+            # New version invalidates the Redis and in-process caches of every replica
+            publish_rules_changed()
         finally:
             db.close()
 
@@ -93,6 +171,6 @@ class RuleBasedClassifier:
             if rule:
                 db.delete(rule)
                 db.commit()
-                r.delete("classification_rules")  # Invalidate cache
+                publish_rules_changed()  # Invalidate caches fleet-wide
         finally:
             db.close()
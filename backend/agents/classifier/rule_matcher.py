@@ -0,0 +1,68 @@
+import re
+from typing import Dict, List, Tuple
+
+
+def _trie_pattern(keywords: List[str]) -> str:
+    """
+    Build one regex from a keyword trie (shared prefixes are factored out), so the
+    engine walks each text position once instead of trying every keyword in turn.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = {}  # end-of-keyword marker
+
+    def build(node: dict) -> str:
+        is_end = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch != ""]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if is_end:
+            # Optional and greedy: the longest keyword is tried first
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return build(trie)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class CompiledRuleSet:
+    """
+    A {keyword: category} ruleset compiled into a single regex.
+    Rule priority is the dict order; match() scans the text once and reports the
+    highest-priority keyword found plus every matched category.
+    """
+
+    def __init__(self, rules: Dict[str, str], version: str = None):
+        self.rules = rules
+        self.version = version
+        self.priority = {keyword: i for i, keyword in enumerate(rules)}
+        keywords = [keyword for keyword in rules if keyword]
+        # Zero-width lookahead so keywords starting at every position are found, even overlapping ones
+        self.pattern = re.compile(r"(?=\b(" + _trie_pattern(keywords) + r")\b)") if keywords else None
+
+    def _matched_keywords(self, text_lower: str):
+        for match in self.pattern.finditer(text_lower):
+            found = match.group(1)
+            yield found
+            # The greedy match hides shorter keywords starting at the same position
+            for end in range(1, len(found)):
+                if _is_word_char(found[end - 1]) != _is_word_char(found[end]) and found[:end] in self.priority:
+                    yield found[:end]
+
+    def match(self, text_lower: str) -> Tuple[str | None, List[str]]:
+        """Return (first-priority keyword or None, matched categories in priority order)."""
+        if self.pattern is None:
+            return None, []
+        matched = set(self._matched_keywords(text_lower))
+        if not matched:
+            return None, []
+        ordered = sorted(matched, key=self.priority.__getitem__)
+        categories = list(dict.fromkeys(self.rules[keyword] for keyword in ordered))
+        return ordered[0], categories
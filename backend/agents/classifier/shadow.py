@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+from backend.common.config import Settings
+from backend.agents.classifier.text_budget import sample_text
+
+logger = logging.getLogger(__name__)
+
+# ---------------- WORKER PROCESS ----------------
+_candidates = []  # [(name, AIModel)] loaded once per worker
+
+
+def _init_worker(model_paths: list, niceness: int):
+    """Lower the worker's CPU priority and keep native libraries single-threaded before loading the models."""
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = "1"
+    try:
+        os.nice(niceness)
+    except OSError:
+        pass
+    from backend.agents.classifier.ai_model import AIModel
+    for path in model_paths:
+        model = AIModel(path)
+        if model.pipeline is None:
+            logger.error(f"[SHADOW] Could not load candidate {path}; skipped")
+            continue
+        # Forests fitted with n_jobs=-1 would otherwise fan out over every core
+        estimator = getattr(model.pipeline, "steps", [[None, None]])[-1][1]
+        if hasattr(estimator, "n_jobs"):
+            estimator.n_jobs = 1
+        _candidates.append((f"{os.path.basename(os.path.normpath(path))}@{model.version}", model))
+
+
+def _score(texts: list, hints_list: list) -> list:
+    """Every candidate's predictions for one batch: [{model, results, ms} | {model, error}]."""
+    scored = []
+    for name, model in _candidates:
+        start = time.perf_counter()
+        try:
+            results = model.predict_batch(texts, hints_list)
+        except Exception as e:
+            scored.append({"model": name, "error": str(e)})
+            continue
+        scored.append({"model": name, "results": results, "ms": (time.perf_counter() - start) * 1000})
+    return scored
+
+
+# ---------------- SHADOW EVALUATOR ----------------
+class ShadowEvaluator:
+    """
+    Scores live batches with candidate models in a separate, niced process pool.
+    submit() only samples the texts and hands them over: when SHADOW_MAX_PENDING
+    batches are already waiting, the batch is dropped rather than queued, so the
+    live classifier never waits on a candidate. Each prediction is appended to
+    SHADOW_OUTPUT as one JSON line next to the live result for offline comparison.
+    """
+
+    def __init__(self, model_paths: list = None, output: str = None, workers: int = None,
+                 max_pending: int = None, niceness: int = None):
+        self.model_paths = model_paths if model_paths is not None else [p.strip() for p in Settings.SHADOW_MODELS.split(",") if p.strip()]
+        self.output = output or Settings.SHADOW_OUTPUT
+        self.workers = workers or Settings.SHADOW_WORKERS
+        self.niceness = Settings.SHADOW_NICE if niceness is None else niceness
+        self._slots = threading.BoundedSemaphore(max_pending or Settings.SHADOW_MAX_PENDING)
+        self._write_lock = threading.Lock()
+        self._executor = None
+        self.submitted = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.model_paths)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: the live process runs Kafka/Redis threads, which must not be forked
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_paths, self.niceness),
+            )
+            logger.info(f"[SHADOW] Evaluating {len(self.model_paths)} candidate(s) in {self.workers} worker(s)")
+        return self._executor
+
+    def start(self):
+        """Spawn the workers up front, so the first live batch does not pay for it."""
+        if self.enabled:
+            self._pool()
+
+    def submit(self, documents: list) -> bool:
+        """
+        Queue a batch of (document_name, text, live value) for the candidates.
+        Returns False if the batch was dropped because the workers are behind.
+        """
+        if not self.enabled or not documents:
+            return False
+        if not self._slots.acquire(blocking=False):
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning(f"[SHADOW] Workers behind; {self.dropped} batch(es) dropped so far")
+            return False
+        try:
+            texts = [sample_text(text)[0] for _, text, _ in documents]
+            hints_list = [live.get("rule_hints") for _, _, live in documents]
+            future = self._pool().submit(_score, texts, hints_list)
+        except Exception as e:
+            self._slots.release()
+            logger.error(f"[SHADOW] Could not submit batch: {e}")
+            return False
+        self.submitted += 1
+        # The callback keeps only names and live results; full texts are not held until the batch ends
+        records = [(doc_name, live) for doc_name, _, live in documents]
+        future.add_done_callback(lambda f: self._done(f, records))
+        return True
+
+    def _done(self, future, records: list):
+        """records: (document_name, live value) per document, in batch order."""
+        self._slots.release()
+        try:
+            scored = future.result()
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory); start a fresh pool on the next batch
+            logger.error(f"[SHADOW] Worker pool broken: {e}")
+            self._executor = None
+            return
+        except Exception as e:
+            logger.error(f"[SHADOW] Batch failed: {e}")
+            return
+        timestamp = datetime.utcnow().isoformat()
+        lines = []
+        for candidate in scored:
+            if "error" in candidate:
+                logger.error(f"[SHADOW] {candidate['model']} failed: {candidate['error']}")
+                continue
+            per_doc_ms = round(candidate["ms"] / len(records), 3)
+            for (doc_name, live), result in zip(records, candidate["results"]):
+                lines.append(json.dumps({
+                    "timestamp": timestamp,
+                    "document_name": doc_name,
+                    "model": candidate["model"],
+                    "category": str(result["category"]),
+                    "confidence": result["confidence"],
+                    "ms": per_doc_ms,
+                    "batch_size": len(records),
+                    "live_category": live.get("classification"),
+                    "live_confidence": live.get("confidence"),
+                    "live_stage": live.get("stage"),
+                    "live_model_version": live.get("model_version"),
+                }))
+        if lines:
+            with self._write_lock, open(self.output, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+    def close(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+        logger.info(f"[SHADOW] {self.submitted} batch(es) evaluated, {self.dropped} dropped")
+
+
+# ---------------- OFFLINE COMPARISON ----------------
+def compare(path: str = None, threshold: float = 0.5) -> dict:
+    """
+    Per-candidate agreement with the live classification and latency percentiles.
+    Candidate predictions under `threshold` count as Unknown, as they would live.
+    The live category is the one recorded with the prediction; pass --db to use
+    each document's latest Classification row instead (e.g. after manual review).
+    """
+    path = path or Settings.SHADOW_OUTPUT
+    stats = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            model = stats.setdefault(record["model"], {"docs": 0, "agree": 0, "ms": []})
+            category = record["category"] if record["confidence"] >= threshold else "Unknown"
+            model["docs"] += 1
+            model["agree"] += category == record["live_category"]
+            model["ms"].append(record["ms"])
+    return {
+        name: {
+            "docs": model["docs"],
+            "agreement": round(model["agree"] / model["docs"], 4),
+            "p50_ms": round(float(np.percentile(model["ms"], 50)), 3),
+            "p99_ms": round(float(np.percentile(model["ms"], 99)), 3),
+        }
+        for name, model in stats.items()
+    }
+
+
+def compare_with_db(path: str = None, threshold: float = 0.5) -> dict:
+    """Like compare(), against each document's latest stored Classification."""
+    from sqlalchemy import func
+    from backend.database.models import SessionLocal, Document, Classification
+
+    path = path or Settings.SHADOW_OUTPUT
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    names = list({record["document_name"] for record in records})
+    db = SessionLocal()
+    try:
+        latest = db.query(func.max(Classification.id)).group_by(Classification.document_id)
+        stored = {}
+        for start in range(0, len(names), 1000):
+            stored.update(
+                db.query(Document.filename, Classification.category)
+                .join(Classification, Classification.document_id == Document.id)
+                .filter(Classification.id.in_(latest), Document.filename.in_(names[start:start + 1000]))
+                .all()
+            )
+    finally:
+        db.close()
+
+    agreement = {}
+    for record in records:
+        if record["document_name"] not in stored:
+            continue
+        model = agreement.setdefault(record["model"], [0, 0])
+        category = record["category"] if record["confidence"] >= threshold else "Unknown"
+        model[0] += 1
+        model[1] += category == stored[record["document_name"]]
+    return {name: {"docs": docs, "agreement": round(agree / docs, 4)} for name, (docs, agree) in agreement.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare shadow candidates with the live classifier.")
+    parser.add_argument("--path", default=Settings.SHADOW_OUTPUT)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--db", action="store_true", help="Compare with the latest Classification rows")
+    args = parser.parse_args()
+    report = compare_with_db(args.path, args.threshold) if args.db else compare(args.path, args.threshold)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import hashlib
+from backend.common.config import Settings
+
+# Rough characters per token for prose and OCR output (word + separator)
+CHARS_PER_TOKEN = 6
+# How far a window boundary may move to land on whitespace
+SNAP_CHARS = 64
+SEPARATOR = "\n...\n"
+
+
+def budget_version() -> str:
+    """Short hash of the budget settings; part of the cache key, since samples depend on them."""
+    spec = f"{Settings.TEXT_BUDGET_TOKENS}:{Settings.TEXT_BUDGET_WINDOWS}:{Settings.TEXT_BUDGET_HEAD_SHARE}:{Settings.TEXT_BUDGET_TAIL_SHARE}"
+    return hashlib.md5(spec.encode()).hexdigest()[:8]
+
+
+def _snap(text: str, pos: int, forward: bool) -> int:
+    """Move pos to the nearest whitespace within SNAP_CHARS (in the given direction), so words are not cut."""
+    if pos <= 0 or pos >= len(text) or text[pos - 1].isspace() or text[pos].isspace():
+        return pos
+    if forward:
+        found = -1
+        for ch in (" ", "\n"):
+            i = text.find(ch, pos, pos + SNAP_CHARS)
+            if i != -1 and (found == -1 or i < found):
+                found = i
+        return found + 1 if found != -1 else pos
+    found = max(text.rfind(" ", pos - SNAP_CHARS, pos), text.rfind("\n", pos - SNAP_CHARS, pos))
+    return found + 1 if found != -1 else pos
+
+
+def sample_text(text: str, max_tokens: int = None, windows: int = None) -> tuple:
+    """
+    A representative sample of a long text within max_tokens: the head, the tail and
+    `windows` evenly spaced windows from the middle, joined by SEPARATOR. Work is
+    proportional to the budget, not to the document, so classification cost is bounded.
+    Returns (sample, strategy dict); texts within budget are returned unchanged.
+    """
+    max_tokens = Settings.TEXT_BUDGET_TOKENS if max_tokens is None else max_tokens
+    windows = Settings.TEXT_BUDGET_WINDOWS if windows is None else windows
+    budget = max_tokens * CHARS_PER_TOKEN
+    if max_tokens <= 0 or len(text) <= budget:
+        return text, {"strategy": "full", "chars": len(text)}
+
+    head_chars = int(budget * Settings.TEXT_BUDGET_HEAD_SHARE)
+    tail_chars = int(budget * Settings.TEXT_BUDGET_TAIL_SHARE)
+    middle_start, middle_end = head_chars, len(text) - tail_chars
+    window_chars = (budget - head_chars - tail_chars) // windows if windows > 0 else 0
+
+    spans = [(0, _snap(text, head_chars, forward=False))]
+    if window_chars > 0:
+        # Window i is centred in the i-th of `windows` equal slices of the middle
+        stride = (middle_end - middle_start) / windows
+        for i in range(windows):
+            centre = middle_start + int(stride * (i + 0.5))
+            start = _snap(text, max(middle_start, centre - window_chars // 2), forward=True)
+            end = _snap(text, min(middle_end, start + window_chars), forward=False)
+            if end > start:
+                spans.append((start, end))
+    spans.append((_snap(text, middle_end, forward=True), len(text)))
+
+    sample = SEPARATOR.join(text[start:end].strip() for start, end in spans)
+    return sample, {
+        "strategy": "head_tail_windows",
+        "chars": len(text),
+        "sampled_chars": sum(end - start for start, end in spans),
+        "max_tokens": max_tokens,
+        "windows": len(spans) - 2,
+        "spans": spans,
+    }
@@ -1,54 +1,232 @@
 import os
+import json
+import time
 import pickle
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
+from sklearn.linear_model import LogisticRegression
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.metrics import accuracy_score, classification_report
+
+from backend.common.config import Settings
+from backend.agents.classifier.ai_model import AIModel
+from backend.agents.classifier.cascade import LINEAR_MODEL_FILENAME
+from backend.agents.classifier.model_artifact import export_artifact
+from backend.agents.classifier.model_registry import promote
+from backend.agents.classifier.inference_backend import latency_percentiles
 
 # ---------------- CONFIG ----------------
-TRAINING_FOLDER = "D:/Langs/Final_year_project/AI-Powered-Document-Automation-System/training_data" # Folder with subfolders as categories
-MODEL_OUTPUT_FILE = "ai_model.pkl"
-CONFIDENCE_THRESHOLD = 0.5  # Probability threshold for unknown docs
+# Estimators and the hyper-parameter grids searched for them
+ESTIMATORS = {
+    "forest": (
+        lambda: RandomForestClassifier(random_state=42, n_jobs=1),
+        {
+            "tfidf__max_features": [5000, 20000],
+            "tfidf__ngram_range": [(1, 1), (1, 2)],
+            "clf__n_estimators": [100, 200],
+            "clf__min_samples_leaf": [1, 2],
+        },
+    ),
+    # The lightweight first model stage of the classification cascade
+    "linear": (
+        lambda: LogisticRegression(max_iter=1000),
+        {
+            "tfidf__max_features": [5000, 20000],
+            "tfidf__ngram_range": [(1, 1), (1, 2)],
+            "clf__C": [1.0, 10.0],
+        },
+    ),
+}
+
 
 # ---------------- LOAD DATA ----------------
-texts = []
-labels = []
-
-for category in os.listdir(TRAINING_FOLDER):
-    category_folder = os.path.join(TRAINING_FOLDER, category)
-    if not os.path.isdir(category_folder):
-        continue
-    for file in os.listdir(category_folder):
-        file_path = os.path.join(category_folder, file)
-        with open(file_path, "r", encoding="utf-8") as f:
-            texts.append(f.read())
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+def load_training_data(folder: str, workers: int = 16) -> tuple:
+    """Read <folder>/<Category>/* concurrently. Returns (texts, labels)."""
+    files, labels = [], []
+    for category in sorted(os.listdir(folder)):
+        category_folder = os.path.join(folder, category)
+        if not os.path.isdir(category_folder):
+            continue
+        for file in sorted(os.listdir(category_folder)):
+            files.append(os.path.join(category_folder, file))
             labels.append(category)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        texts = list(pool.map(_read, files))
+    return texts, labels
+
 
-print(f"[INFO] Loaded {len(texts)} documents from {len(set(labels))} categories.")
+# ---------------- TRAIN ----------------
+def train(texts: list, labels: list, estimator: str = "forest", cv: int = 3, n_jobs: int = -1,
+          test_size: float = 0.2, grid: bool = True) -> dict:
+    """
+    Grid-search a TF-IDF + estimator pipeline and evaluate it on a held-out split,
+    then refit the chosen parameters on every sample for the exported pipeline.
+    """
+    label_encoder = LabelEncoder()
+    y = label_encoder.fit_transform(labels)
+    X_train, X_test, y_train, y_test = train_test_split(texts, y, test_size=test_size, random_state=42, stratify=y)
 
-# ---------------- SPLIT DATA ----------------
-X_train, X_test, y_train, y_test = train_test_split(texts, labels, test_size=0.2, random_state=42)
+    make_estimator, param_grid = ESTIMATORS[estimator]
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer(stop_words="english", max_features=5000)),
+        ("clf", make_estimator()),
+    ])
+    if not grid:
+        # Defaults only: the first value of every grid entry
+        param_grid = {key: values[:1] for key, values in param_grid.items()}
 
-# ---------------- VECTORIZE TEXT ----------------
-vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
-X_train_tfidf = vectorizer.fit_transform(X_train)
-X_test_tfidf = vectorizer.transform(X_test)
+    # Candidates x folds are spread over n_jobs processes; each fit is single-threaded
+    search = GridSearchCV(
+        pipeline,
+        param_grid,
+        cv=StratifiedKFold(n_splits=cv, shuffle=True, random_state=42),
+        scoring="accuracy",
+        n_jobs=n_jobs,
+    )
+    start = time.perf_counter()
+    search.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
 
-# ---------------- TRAIN MODEL ----------------
-clf = RandomForestClassifier(n_estimators=100, random_state=42)
-clf.fit(X_train_tfidf, y_train)
+    best = search.best_estimator_
+    y_pred = best.predict(X_test)
+
+    # The held-out split was only for measuring; the shipped model learns from all of it
+    start = time.perf_counter()
+    final = clone(best).fit(texts, y)
+    refit_seconds = time.perf_counter() - start
+    return {
+        "pipeline": final,
+        "label_encoder": label_encoder,
+        "X_test": X_test,
+        "metrics": {
+            "estimator": estimator,
+            "best_params": {key: list(v) if isinstance(v, tuple) else v for key, v in search.best_params_.items()},
+            "cv_accuracy": round(float(search.best_score_), 4),
+            "test_accuracy": round(float(accuracy_score(y_test, y_pred)), 4),
+            "fit_seconds": round(fit_seconds, 2),
+            "refit_seconds": round(refit_seconds, 2),
+            "refit_docs": len(texts),
+            "train_docs": len(X_train),
+            "test_docs": len(X_test),
+            "report": classification_report(
+                y_test, y_pred, labels=range(len(label_encoder.classes_)),
+                target_names=[str(c) for c in label_encoder.classes_], output_dict=True, zero_division=0,
+            ),
+        },
+    }
 
-# ---------------- EVALUATE MODEL ----------------
-y_pred = clf.predict(X_test_tfidf)
-print("[INFO] Classification Report:\n")
-print(classification_report(y_test, y_pred))
 
 # ---------------- SAVE MODEL ----------------
-with open(MODEL_OUTPUT_FILE, "wb") as f:
-    pickle.dump({
-        "vectorizer": vectorizer,
-        "model": clf,
-        "confidence_threshold": CONFIDENCE_THRESHOLD
-    }, f)
-
-print(f"[INFO] Model saved to {MODEL_OUTPUT_FILE}")
+def save_artifact(result: dict, output: str, version: str, mmap: bool = False) -> str:
+    """
+    Write the artifact AIModel loads. Written under a dot-prefixed temporary name and
+    renamed, so a registry watcher never sees a partial file.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    if mmap:
+        return export_artifact(result["pipeline"], result["label_encoder"], output, version)
+
+    tmp_path = os.path.join(os.path.dirname(os.path.abspath(output)), "." + os.path.basename(output) + ".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump({
+            "pipeline": result["pipeline"],
+            "label_encoder": result["label_encoder"],
+            "version": version,
+            "labels": [str(c) for c in result["label_encoder"].classes_],
+            "metrics": {k: v for k, v in result["metrics"].items() if k != "report"},
+        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, output)
+    return output
+
+
+def artifact_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the document classifier and write a versioned artifact.")
+    parser.add_argument("--data", default=Settings.TRAINING_DATA_DIR, help="Folder with one subfolder of .txt files per category")
+    parser.add_argument("--estimator", choices=sorted(ESTIMATORS), default="forest")
+    parser.add_argument("--registry", default=Settings.MODEL_REGISTRY_DIR, help="Model registry directory")
+    parser.add_argument("--output", help="Explicit artifact path (default: <registry>/<version>.pkl; the cascade's linear model path for --estimator linear)")
+    parser.add_argument("--mmap", action="store_true", help="Write the memory-mapped artifact format")
+    parser.add_argument("--cv", type=int, default=3, help="Cross-validation folds")
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel grid-search workers (-1: all cores)")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--no-grid", action="store_true", help="Skip the hyper-parameter search")
+    parser.add_argument("--promote", action="store_true", help="Serve the new forest artifact if it passes --min-accuracy")
+    parser.add_argument("--min-accuracy", type=float, default=0.0, help="Held-out accuracy required by --promote")
+    args = parser.parse_args()
+    if args.mmap and args.estimator != "forest":
+        parser.error("--mmap supports the forest estimator only")
+    if args.promote and (args.estimator != "forest" or args.output):
+        parser.error("--promote applies to forest artifacts written to the registry")
+
+    start = time.perf_counter()
+    texts, labels = load_training_data(args.data)
+    print(f"[INFO] Loaded {len(texts)} documents from {len(set(labels))} categories in {time.perf_counter() - start:.2f}s.")
+
+    result = train(texts, labels, args.estimator, cv=args.cv, n_jobs=args.jobs, test_size=args.test_size, grid=not args.no_grid)
+
+    corpus_digest = hashlib.sha256("\0".join(texts).encode("utf-8")).hexdigest()[:8]
+    version = f"{args.estimator}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}-{corpus_digest}"
+    if args.output:
+        output = args.output
+    elif args.estimator == "linear":
+        # Not a registry candidate: the registry serves the forest stage
+        output = Settings.CASCADE_LINEAR_MODEL_PATH or os.path.join(os.path.dirname(__file__), LINEAR_MODEL_FILENAME)
+    else:
+        output = os.path.join(args.registry, version if args.mmap else f"{version}.pkl")
+    save_artifact(result, output, version, mmap=args.mmap)
+
+    # Load it back the way the classifier does
+    start = time.perf_counter()
+    model = AIModel(output)
+    load_seconds = time.perf_counter() - start
+    if model.pipeline is None:
+        raise SystemExit(f"[ERROR] Artifact {output} does not load in AIModel")
+
+    report = {
+        "version": version,
+        "artifact": output,
+        "size_bytes": artifact_size(output),
+        "load_seconds": round(load_seconds, 3),
+        "latency": latency_percentiles(model.pipeline, result["X_test"]),
+        **result["metrics"],
+    }
+    report_path = os.path.splitext(output)[0] + ".report.json" if not args.mmap else os.path.join(output, "report.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"[INFO] Best params: {report['best_params']}")
+    print(f"[INFO] CV accuracy {report['cv_accuracy']}, test accuracy {report['test_accuracy']} (fit {report['fit_seconds']}s)")
+    print(f"[INFO] Artifact {output}: {report['size_bytes'] / 1e6:.1f} MB, loads in {report['load_seconds']}s, "
+          f"latency p50 {report['latency']['p50_ms']} ms / p99 {report['latency']['p99_ms']} ms")
+    print(f"[INFO] Report saved to {report_path}")
+
+    if args.promote:
+        # Accuracy gate: the registry only serves what was promoted
+        if report["test_accuracy"] < args.min_accuracy:
+            raise SystemExit(f"[ERROR] Test accuracy {report['test_accuracy']} below --min-accuracy {args.min_accuracy}; not promoted")
+        promote(output, args.registry)
+        print(f"[INFO] Promoted {version} in {args.registry}")
+    elif args.estimator == "forest" and not args.output:
+        print(f"[INFO] Not served until promoted: python -m backend.agents.classifier.model_registry {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import os
+import json
+import shutil
+import logging
+import argparse
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sklearn.cluster import MiniBatchKMeans
+
+from backend.common.config import Settings
+from backend.database.models import SessionLocal, Classification, DocumentEmbedding
+
+logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+NO_CATEGORY = -1
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index over normalized vectors.
+    Vectors are clustered with k-means and stored grouped by cluster, so a query
+    scores the centroids, then only the n_probe closest clusters. All arrays are
+    .npy files opened with mmap_mode="r": loading is instant and the OS pages in
+    only the clusters queries touch. Each vector carries its document's category
+    code for kNN classification.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILENAME)) as f:
+            self.manifest = json.load(f)
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.centroids = np.asarray(load("centroids.npy"))  # small: kept in memory
+        self.offsets = np.asarray(load("offsets.npy"))
+        self.vectors = load("vectors.npy")
+        self.ids = load("ids.npy")
+        self.category_codes = load("categories.npy")
+        self.categories = self.manifest["categories"]
+
+    @classmethod
+    def load(cls, path: str = None) -> "IVFIndex":
+        return cls(path or Settings.VECTOR_INDEX_PATH)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---------------- BUILD ----------------
+    @staticmethod
+    def build(path: str, ids: np.ndarray, vectors: np.ndarray, category_codes: np.ndarray, categories: list,
+              model: str, n_lists: int = None, train_size: int = 100000, chunk_size: int = 65536) -> str:
+        """
+        Cluster and write the index. `vectors` may itself be a memmap; it is read in
+        chunks so building over millions of vectors needs memory for one chunk only.
+        """
+        n, dim = vectors.shape
+        n_lists = n_lists or max(1, min(int(4 * np.sqrt(n)), n))
+        rng = np.random.default_rng(42)
+        sample = np.sort(rng.choice(n, size=min(train_size, n), replace=False))
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, batch_size=4096, n_init=1, random_state=42)
+        kmeans.fit(np.asarray(vectors[sample], dtype=np.float32))
+        centroids = kmeans.cluster_centers_.astype(np.float32)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+        assignment = np.empty(n, dtype=np.int32)
+        for start in range(0, n, chunk_size):
+            chunk = np.asarray(vectors[start:start + chunk_size], dtype=np.float32)
+            assignment[start:start + chunk_size] = (chunk @ centroids.T).argmax(axis=1)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))]).astype(np.int64)
+
+        tmp_dir = os.path.join(os.path.dirname(os.path.abspath(path)), "." + os.path.basename(path) + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        out = np.lib.format.open_memmap(os.path.join(tmp_dir, "vectors.npy"), mode="w+", dtype=np.float32, shape=(n, dim))
+        for start in range(0, n, chunk_size):
+            rows = order[start:start + chunk_size]
+            out[start:start + len(rows)] = vectors[np.sort(rows)][np.argsort(np.argsort(rows))]
+        out.flush()
+        del out
+        np.save(os.path.join(tmp_dir, "ids.npy"), np.asarray(ids, dtype=np.int64)[order])
+        np.save(os.path.join(tmp_dir, "categories.npy"), np.asarray(category_codes, dtype=np.int16)[order])
+        np.save(os.path.join(tmp_dir, "centroids.npy"), centroids)
+        np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+        with open(os.path.join(tmp_dir, MANIFEST_FILENAME), "w") as f:
+            json.dump({"model": model, "dim": dim, "size": n, "n_lists": n_lists, "categories": categories}, f, indent=2)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_dir, path)
+        logger.info(f"[INDEX] Built {n} vectors in {n_lists} lists at {path}")
+        return path
+
+    # ---------------- QUERY ----------------
+    def _search(self, queries: np.ndarray, k: int, n_probe: int = None) -> list:
+        """[(rows, scores)] per query: positions in the index of the k best matches, best first."""
+        n_probe = min(n_probe or Settings.VECTOR_INDEX_NPROBE, len(self.centroids))
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :n_probe]
+
+        matches = []
+        for query, lists in zip(queries, probes):
+            rows = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+            if not rows.size:
+                matches.append((rows, np.empty(0, dtype=np.float32)))
+                continue
+            # Clusters are contiguous, so this reads n_probe slices of the mapped file
+            scores = np.concatenate([self.vectors[self.offsets[l]:self.offsets[l + 1]] @ query for l in lists])
+            top = np.argpartition(-scores, k - 1)[:k] if scores.size > k else np.arange(scores.size)
+            top = top[np.argsort(-scores[top])]
+            matches.append((rows[top], scores[top]))
+        return matches
+
+    def search(self, queries: np.ndarray, k: int = 10, n_probe: int = None) -> tuple:
+        """Return (ids, scores), each (n_queries, k), best first; missing neighbours have id -1."""
+        matches = self._search(queries, k, n_probe)
+        ids = np.full((len(matches), k), -1, dtype=np.int64)
+        scores = np.full((len(matches), k), -np.inf, dtype=np.float32)
+        for q, (rows, row_scores) in enumerate(matches):
+            ids[q, :rows.size] = self.ids[rows]
+            scores[q, :rows.size] = row_scores
+        return ids, scores
+
+    def knn_classify(self, queries: np.ndarray, k: int = None, n_probe: int = None) -> list:
+        """
+        Similarity-weighted vote of the k nearest classified documents.
+        One {category, confidence, details} per query, or None without classified neighbours.
+        """
+        k = k or Settings.KNN_NEIGHBOURS
+        results = []
+        for rows, scores in self._search(queries, k, n_probe):
+            votes = {}
+            for code, score in zip(self.category_codes[rows], scores):
+                if code != NO_CATEGORY and score > 0:
+                    votes[int(code)] = votes.get(int(code), 0.0) + float(score)
+            if not votes:
+                results.append(None)
+                continue
+            best = max(votes, key=votes.get)
+            results.append({
+                "category": self.categories[best],
+                "confidence": round(votes[best] / sum(votes.values()), 2),
+                "details": f"kNN vote of {len(rows)} similar documents",
+            })
+        return results
+
+
+# ---------------- DATABASE ----------------
+def similar_documents(document_id: int, k: int = 10, index: IVFIndex = None) -> list:
+    """[(document_id, similarity)] of the documents most similar to a stored one."""
+    index = index or IVFIndex.load()
+    db: Session = SessionLocal()
+    try:
+        row = (
+            db.query(DocumentEmbedding.vector)
+            .filter_by(document_id=document_id, model=index.manifest["model"])
+            .order_by(DocumentEmbedding.id.desc())
+            .first()
+        )
+    finally:
+        db.close()
+    if row is None:
+        return []
+    ids, scores = index.search(np.frombuffer(row[0], dtype=np.float32), k + 1)
+    return [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i not in (-1, document_id)][:k]
+
+
+def build_from_db(model_name: str, path: str = None, n_lists: int = None) -> str:
+    """
+    Stream each document's latest vector from an embedding model into a memmap,
+    attach categories, build the index. Re-extracted documents are indexed once.
+    """
+    path = path or Settings.VECTOR_INDEX_PATH
+    db: Session = SessionLocal()
+    try:
+        latest_embedding = db.query(func.max(DocumentEmbedding.id)).filter_by(model=model_name).group_by(DocumentEmbedding.document_id)
+        n, dim = db.query(func.count(DocumentEmbedding.id), func.max(DocumentEmbedding.dimensions)).filter(DocumentEmbedding.id.in_(latest_embedding)).one()
+        if not n:
+            raise ValueError(f"no embeddings stored for model {model_name}")
+        staging = os.path.join(os.path.dirname(os.path.abspath(path)), "." + os.path.basename(path) + ".staging.npy")
+        vectors = np.lib.format.open_memmap(staging, mode="w+", dtype=np.float32, shape=(n, dim))
+        ids = np.empty(n, dtype=np.int64)
+        query = db.query(DocumentEmbedding.document_id, DocumentEmbedding.vector).filter(DocumentEmbedding.id.in_(latest_embedding)).order_by(DocumentEmbedding.id)
+        for i, (document_id, vector) in enumerate(query.yield_per(10000)):
+            ids[i] = document_id
+            vectors[i] = np.frombuffer(vector, dtype=np.float32)
+
+        # Latest classification of each document, as category codes
+        latest = db.query(func.max(Classification.id)).group_by(Classification.document_id)
+        category_of = dict(db.query(Classification.document_id, Classification.category).filter(Classification.id.in_(latest)).yield_per(10000))
+    finally:
+        db.close()
+
+    categories = sorted({c for c in category_of.values() if c and c != "Unknown"})
+    code_of = {c: i for i, c in enumerate(categories)}
+    codes = np.array([code_of.get(category_of.get(int(doc_id)), NO_CATEGORY) for doc_id in ids], dtype=np.int16)
+    try:
+        return IVFIndex.build(path, ids, vectors, codes, categories, model_name, n_lists=n_lists)
+    finally:
+        del vectors
+        os.remove(staging)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the document vector index from stored embeddings.")
+    parser.add_argument("--path", default=Settings.VECTOR_INDEX_PATH)
+    parser.add_argument("--lists", type=int, help="Number of k-means lists (default 4*sqrt(N))")
+    args = parser.parse_args()
+
+    from backend.agents.classifier.embeddings import LSAEmbedder
+    build_from_db(LSAEmbedder.load().name, args.path, args.lists)
+
+
+if __name__ == "__main__":
+    main()
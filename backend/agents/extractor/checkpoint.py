@@ -0,0 +1,75 @@
+import logging
+import threading
+import redis
+from backend.common.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class PageCheckpointStore:
+    """
+    Completed page texts of in-flight extractions, kept in a Redis hash per file hash
+    (field = page index). A restarted job loads them and only extracts the rest.
+    """
+
+    def __init__(self, client: redis.Redis = None, ttl: int = None):
+        self.r = client or redis.Redis(host=Settings.REDIS_HOST, port=Settings.REDIS_PORT, decode_responses=True)
+        self.ttl = ttl or Settings.EXTRACTOR_CHECKPOINT_TTL
+
+    @staticmethod
+    def _key(file_hash: str) -> str:
+        return f"extract_checkpoint:{file_hash}"
+
+    def load(self, file_hash: str) -> dict:
+        """Return {page_index: text} for every page already completed."""
+        return {int(index): text for index, text in self.r.hgetall(self._key(file_hash)).items()}
+
+    def save(self, file_hash: str, page_index: int, text: str):
+        self.save_many(file_hash, {page_index: text})
+
+    def save_many(self, file_hash: str, pages: dict):
+        key = self._key(file_hash)
+        pipe = self.r.pipeline()
+        pipe.hset(key, mapping=pages)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def clear(self, file_hash: str):
+        self.r.delete(self._key(file_hash))
+
+    def iter_pages(self, file_hash: str, pages_factory, min_pages: int = None):
+        """
+        Wrap a page generator with checkpointing.
+        pages_factory(done_pages, on_page) must yield every page in order, reusing
+        done_pages, and call on_page(index, text) as each new page is extracted, so
+        pages finished out of order by parallel workers are saved right away.
+        Nothing is written until min_pages pages are done: short documents never
+        touch Redis. Checkpoints are not cleared here: the caller clears them once
+        the extraction has been saved and handed on, so a crash before then resumes.
+        """
+        min_pages = Settings.EXTRACTOR_CHECKPOINT_MIN_PAGES if min_pages is None else min_pages
+        done_pages = self.load(file_hash)
+        if done_pages:
+            logger.info(f"[CHECKPOINT] Resuming {file_hash} with {len(done_pages)} pages already done")
+
+        lock = threading.Lock()
+        held = {}  # pages done before the document proved long enough to checkpoint
+        state = {"saving": bool(done_pages)}
+
+        def on_page(index: int, text: str):
+            with lock:
+                if state["saving"]:
+                    pages = {index: text}
+                else:
+                    held[index] = text
+                    if len(held) < min_pages:
+                        return
+                    state["saving"] = True
+                    pages = dict(held)
+                    held.clear()
+            try:
+                self.save_many(file_hash, pages)
+            except Exception as e:
+                logger.warning(f"[CHECKPOINT] Could not save {len(pages)} page(s) of {file_hash}: {e}")
+
+        yield from pages_factory(done_pages, on_page)
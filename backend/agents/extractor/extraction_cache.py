@@ -0,0 +1,100 @@
+import os
+import gzip
+import json
+import logging
+import tempfile
+import threading
+from backend.common.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class DiskExtractionCache:
+    """
+    Durable, content-addressed cache of extract_any() results.
+    Entries are gzipped JSON files named after the file hash. A hit refreshes the
+    entry's mtime, and when the cache grows past max_bytes the least recently
+    used entries are evicted.
+    """
+
+    def __init__(self, root: str = None, max_bytes: int = None):
+        self.root = root or Settings.EXTRACTION_CACHE_PATH
+        self.max_bytes = max_bytes or Settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024
+        self._size = None  # bytes on disk, computed lazily on first write
+        self._lock = threading.Lock()
+
+    def _path(self, file_hash: str) -> str:
+        return os.path.join(self.root, file_hash[:2], f"{file_hash}.json.gz")
+
+    def get(self, file_hash: str) -> dict | None:
+        path = self._path(file_hash)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                content = json.load(f)
+            os.utime(path)  # mark as recently used
+            return content
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"[CACHE] Dropping unreadable entry {file_hash}: {e}")
+            self._remove(path)
+            return None
+
+    def put(self, file_hash: str, content: dict):
+        path = self._path(file_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+                f.write(json.dumps(content).encode("utf-8"))
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += os.path.getsize(path)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> list:
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json.gz"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Remove least recently used entries until the cache is back under 90% of its budget."""
+        entries = sorted(self._entries())
+        # Re-sync with the disk: other extractor processes share the directory
+        self._size = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for _, size, path in entries:
+            if self._size <= target:
+                break
+            if self._remove(path):
+                self._size -= size
+                evicted += 1
+        logger.info(f"[CACHE] Evicted {evicted} extraction entries, {self._size} bytes in use")
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
@@ -1,24 +1,47 @@
 import os
 import json
 import logging
-import hashlib
 import time
 import random
 from datetime import datetime, timezone
 import redis
 from sqlalchemy.orm import Session
-from backend.agents.extractor.extractor_utils import extract_any
+from backend.agents.extractor.extractor_utils import extract_any, iter_pdf_pages
+from backend.agents.extractor.extraction_cache import DiskExtractionCache
+from backend.agents.extractor.checkpoint import PageCheckpointStore
+from backend.agents.extractor.near_duplicate import NearDuplicateIndex
 from backend.common.config import Settings
 from backend.database.models import SessionLocal, Document, Extraction, Logs
 from backend.common.kafka_consumer import KafkaConsumerClient
 from backend.common.kafka_producer import KafkaProducerClient
+from backend.common.text_store import get_text_store
+from backend.common.file_scan import hash_file
+from backend.common.feature_store import get_feature_store
 
 # ---------------- CONFIGURATION ----------------
-r = redis.Redis(host=Settings.REDIS_HOST, port=Settings.REDIS_PORT, decode_responses=True)
-
 logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
 logger = logging.getLogger(__name__)
 
+# Set up by init_agent(), not at import: spawned PDF workers re-import this (main)
+# module and must not open connections, caches or feature store shards
+r = None
+extraction_cache = None
+page_checkpoints = None
+near_duplicates = None
+feature_store = None
+
+
+def init_agent():
+    global r, extraction_cache, page_checkpoints, near_duplicates, feature_store
+    if r is not None:
+        return
+    r = redis.Redis(host=Settings.REDIS_HOST, port=Settings.REDIS_PORT, decode_responses=True)
+    extraction_cache = DiskExtractionCache() if Settings.EXTRACTION_CACHE_ENABLED else None
+    page_checkpoints = PageCheckpointStore(r) if Settings.EXTRACTOR_CHECKPOINTS else None
+    near_duplicates = NearDuplicateIndex() if Settings.NEAR_DUP_ENABLED else None
+    feature_store = get_feature_store() if Settings.FEATURE_STORE_ENABLED else None
+
+
 # ---------------- HELPER: Retry wrapper ----------------
 def retry_with_backoff(func, max_retries=5, base_delay=1, max_delay=30, *args, **kwargs):
     """Retry function with exponential backoff."""
@@ -39,49 +62,146 @@ def retry_with_backoff(func, max_retries=5, base_delay=1, max_delay=30, *args, *
 
 # ---------------- UTILITY FUNCTIONS ----------------
 def compute_file_hash(file_path: str) -> str:
-    """Compute MD5 hash of a file for deduplication."""
-    hash_md5 = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+    """Compute the content hash (FILE_HASH_ALGO, MD5 by default) of a file for deduplication."""
+    return hash_file(file_path)
 
-# ---------------- EXTRACTOR FUNCTIONS ----------------
-def process_document(file_path: str, uploaded_by: int = None, source: str = "unknown"):
-    filename = os.path.basename(file_path)
+def pdf_pages(file_path: str, file_hash: str):
+    """PDF page generator, resumable from page checkpoints when they are enabled."""
+    if not page_checkpoints:
+        return iter_pdf_pages(file_path)
+    return page_checkpoints.iter_pages(
+        file_hash, lambda done_pages, on_page: iter_pdf_pages(file_path, done_pages=done_pages, on_page=on_page)
+    )
+
+
+def stream_pages_to_store(pages) -> tuple:
+    """
+    Write pages straight into the configured text store as they are produced.
+    Only the current page is held in memory; word count and preview are built as pages pass.
+    Returns (text_ref, stats).
+    """
+    stats = {"word_count": 0, "page_count": 0, "preview": ""}
+
+    def counted_pages():
+        for page_text in pages:
+            stats["page_count"] += 1
+            stats["word_count"] += len(page_text.split())
+            if len(stats["preview"]) < Settings.TEXT_PREVIEW_CHARS:
+                separator = "\n" if stats["page_count"] > 1 else ""
+                stats["preview"] = (stats["preview"] + separator + page_text)[:Settings.TEXT_PREVIEW_CHARS]
+            yield page_text
 
-    # Compute file hash
+    text_ref = get_text_store().put_pages(counted_pages())
+    return text_ref, stats
+
+
+def clear_page_checkpoints(file_hash: str, filename: str):
+    """Drop a document's page checkpoints once its extraction is saved and handed on."""
     try:
-        file_hash = compute_file_hash(file_path)
+        page_checkpoints.clear(file_hash)
     except Exception as e:
-        logger.error(f"[EXTRACTOR] Failed to compute hash for {filename}: {str(e)}")
-        return None
+        logger.warning(f"[CHECKPOINT] Could not clear checkpoints of {filename}: {str(e)}")
+
+# ---------------- EXTRACTOR FUNCTIONS ----------------
+def process_document(file_path: str, uploaded_by: int = None, source: str = "unknown", file_scan: dict = None):
+    """
+    file_scan: hash/type/features computed by the ingestor's single-pass scan.
+    When present the file is not re-read just to hash or sniff it.
+    """
+    init_agent()
+    filename = os.path.basename(file_path)
+    file_scan = file_scan or {}
+
+    # Compute file hash (reuse the ingest scan when it used the same algorithm)
+    if file_scan.get("file_hash") and file_scan.get("hash_algo") == Settings.FILE_HASH_ALGO:
+        file_hash = file_scan["file_hash"]
+    else:
+        try:
+            file_hash = compute_file_hash(file_path)
+        except Exception as e:
+            logger.error(f"[EXTRACTOR] Failed to compute hash for {filename}: {str(e)}")
+            return None
+    file_type = file_scan.get("detected_type") or os.path.splitext(filename)[1].lower()
 
     # Skip if duplicate (based on hash in Redis)
     if r.exists(file_hash):
         logger.info(f"[EXTRACTOR] Skipping duplicate document (hash match): {filename}")
         return None
 
+    # Reuse a previous extraction of the same content (no parsing or OCR on a hit)
+    extracted_content = None
+    if extraction_cache:
+        try:
+            extracted_content = extraction_cache.get(file_hash)
+        except Exception as e:
+            logger.warning(f"[CACHE] Lookup failed for {filename}: {str(e)}")
+    cache_hit = extracted_content is not None
+    if cache_hit:
+        logger.info(f"[CACHE] Extraction cache hit for {filename}")
+
+    # Very large PDFs can be streamed page by page into the text store
+    is_pdf = file_type == ".pdf"
+    # Page checkpoints are kept until the extraction is committed and sent (also on a cache
+    # hit: a run that crashed after caching its extraction leaves them behind)
+    checkpointed = page_checkpoints is not None and is_pdf
+    text_ref = None
+    streamed = not cache_hit and is_pdf and Settings.EXTRACTOR_PDF_STREAMING
+    if streamed:
+        try:
+            text_ref, stream_stats = stream_pages_to_store(pdf_pages(file_path, file_hash))
+        except Exception as e:
+            logger.error(f"[EXTRACTOR] Failed to extract {filename}: {str(e)}")
+            return None
+        extracted_content = {"metadata": {"page_count": stream_stats["page_count"], "text_ref": text_ref}}
+        extracted_text = None
+        text_preview = stream_stats["preview"]
+        word_count = stream_stats["word_count"]
+
     # Extract plain text only
-    try:
-        extracted_content = extract_any(file_path)  # {"pages": [...], "full_text": "..."}
+    elif not cache_hit:
+        try:
+            if is_pdf:
+                pages = list(pdf_pages(file_path, file_hash))
+                extracted_content = {"pages": pages, "full_text": "\n".join(pages)}
+            else:
+                extracted_content = extract_any(file_path, file_type)  # {"pages": [...], "full_text": "..."}
+        except Exception as e:
+            logger.error(f"[EXTRACTOR] Failed to extract {filename}: {str(e)}")
+            return None
+        if extraction_cache:
+            try:
+                extraction_cache.put(file_hash, extracted_content)
+            except Exception as e:
+                logger.warning(f"[CACHE] Failed to cache extraction of {filename}: {str(e)}")
+
+    if not streamed:
         extracted_text = extracted_content["full_text"]
-    except Exception as e:
-        logger.error(f"[EXTRACTOR] Failed to extract {filename}: {str(e)}")
-        return None
+        text_preview = extracted_text[:Settings.TEXT_PREVIEW_CHARS]
+        word_count = len(extracted_text.split())
 
     metadata = {
-        "word_count": len(extracted_text.split()),
+        "word_count": word_count,
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "source": source,
+        "extraction_cache_hit": cache_hit,
+        **extracted_content.get("metadata", {}),
     }
 
     result = {
         "document_name": filename,
-        "document_type": os.path.splitext(filename)[1].lower(),
-        "extracted_text": extracted_text,
+        "document_type": file_type,
         "metadata": metadata,
     }
+    extraction_id = None
+    document_id = None
+
+    # MinHash signature for near-duplicate lookup (streamed texts are not held in memory)
+    signature = None
+    if near_duplicates and extracted_text:
+        try:
+            signature = near_duplicates.signature(extracted_text)
+        except Exception as e:
+            logger.warning(f"[NEAR-DUP] Could not compute signature for {filename}: {str(e)}")
 
     # ---------------- DB Operations ----------------
     try:
@@ -103,6 +223,17 @@ def process_document(file_path: str, uploaded_by: int = None, source: str = "unk
             db.commit()
             db.refresh(document)
 
+        if signature is not None:
+            match = near_duplicates.find_duplicate(db, signature, exclude_document_id=document.id)
+            if match:
+                original_id, similarity = match
+                document.duplicate_of = original_id
+                document.status = "duplicate"
+                metadata["near_duplicate_of"] = original_id
+                metadata["near_duplicate_similarity"] = round(similarity, 3)
+                logger.info(f"[NEAR-DUP] {filename} is a near-duplicate of document {original_id} ({similarity:.2f})")
+            near_duplicates.add(db, document.id, signature)
+
         extraction = Extraction(
             document_id=document.id,
             extracted_text=extracted_text,
@@ -118,15 +249,44 @@ def process_document(file_path: str, uploaded_by: int = None, source: str = "unk
         db.add(log)
 
         db.commit()
+        extraction_id = extraction.id
+        document_id = document.id
         logger.info(f"[DB] Saved document and extraction: {filename}")
     except Exception as e:
         logger.error(f"[DB ERROR] Failed to save {filename}: {str(e)}")
     finally:
         db.close()
 
+    # Hashed term counts for bulk re-classification (streamed texts are covered by the backfill job)
+    if feature_store and extracted_text and document_id is not None:
+        try:
+            feature_store.add(document_id, extracted_text)
+        except Exception as e:
+            logger.warning(f"[FEATURES] Could not store features for {filename}: {str(e)}")
+
+    # ---------------- Kafka payload ----------------
+    if text_ref is None and Settings.EXTRACTOR_CLAIM_CHECK:
+        try:
+            text_ref = get_text_store().put(extracted_text, key=extraction_id)
+        except Exception as e:
+            logger.error(f"[TEXT STORE] Failed to store text for {filename}: {str(e)}")
+
+    if text_ref:
+        # Claim check: send a reference and a short preview, the classifier fetches the rest
+        result["text_ref"] = text_ref
+        result["text_preview"] = text_preview
+    else:
+        result["extracted_text"] = extracted_text
+
     # Store hash in Redis (TTL = 1 hour)
     r.setex(file_hash, 3600, json.dumps(metadata))
 
+    if metadata.get("near_duplicate_of") and Settings.NEAR_DUP_SKIP_DOWNSTREAM:
+        logger.info(f"[NEAR-DUP] Skipping classification and routing for {filename}")
+        if checkpointed and extraction_id is not None:
+            clear_page_checkpoints(file_hash, filename)
+        return result
+
     # Send to Kafka (with retry)
     try:
         retry_with_backoff(
@@ -138,12 +298,16 @@ def process_document(file_path: str, uploaded_by: int = None, source: str = "unk
         logger.info(f"[KAFKA] Sent document {filename} to {Settings.KAFKA_TOPIC_EXTRACTOR}")
     except Exception as e:
         logger.error(f"[KAFKA ERROR] Permanent failure sending {filename}: {str(e)}")
+    else:
+        if checkpointed and extraction_id is not None:
+            clear_page_checkpoints(file_hash, filename)
 
     return result
 
 # ---------------- MAIN LOOP ----------------
 def main():
     logger.info("[EXTRACTOR] Agent starting...")
+    init_agent()
 
     # Initialize Kafka clients with retry
     try:
@@ -172,13 +336,16 @@ def main():
             return
 
         logger.info(f"[EXTRACTOR] Processing new document: {file_path}")
-        process_document(file_path, uploaded_by, source)
+        file_scan = {k: data[k] for k in ("file_hash", "hash_algo", "detected_type") if data.get(k)}
+        process_document(file_path, uploaded_by, source, file_scan=file_scan)
 
     try:
         consumer.consume_messages(handle_message)
     except KeyboardInterrupt:
         logger.info("[EXTRACTOR] Shutting down...")
     finally:
+        if feature_store:
+            feature_store.flush()
         try:
             consumer.close()
         except Exception as e:
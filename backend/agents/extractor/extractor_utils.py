@@ -1,27 +1,137 @@
 import os
+import io
+import math
+import hashlib
+import multiprocessing
+from collections import deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 import docx
 import pdfplumber
 import openpyxl
 from PIL import Image
-import pytesseract
 from pptx import Presentation
 from backend.common.config import setting
+from backend.agents.extractor.ocr_engine import get_ocr_engine
 
-# Configure Tesseract path
-pytesseract.pytesseract.tesseract_cmd = setting.TESSERACT_PATH
+# Process pool shared by every parallel PDF extraction in this worker
+_pdf_pool = None
+_pdf_pool_workers = 0
 
 
-def extract_pdf(file_path: str) -> dict:
-    pages = []
+def _get_pdf_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the bounded process pool used for page-parallel OCR."""
+    global _pdf_pool, _pdf_pool_workers
+    if _pdf_pool is None or _pdf_pool_workers != workers:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=True)
+        # spawn keeps Kafka/Redis client threads of the parent out of the children
+        _pdf_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _pdf_pool_workers = workers
+    return _pdf_pool
+
+
+def _extract_pdf_page(page) -> str:
+    """Text layer of a page, falling back to OCR at 300 DPI when there is none."""
+    page_text = page.extract_text()
+    if page_text:
+        return page_text
+    img = page.to_image(resolution=300).original
+    return get_ocr_engine().image_to_string(img)
+
+
+def _release_page(page):
+    """Drop pdfplumber's per-page object/layout caches once a page is done."""
+    close = getattr(page, "close", None) or getattr(page, "flush_cache", None)
+    if close:
+        close()
+
+
+def _extract_pdf_chunk(file_path: str, page_numbers: list) -> list:
+    """Worker entry point: extract a contiguous run of pages from its own PDF handle."""
+    texts = []
     with pdfplumber.open(file_path) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                pages.append(page_text)
-            else:
-                img = page.to_image(resolution=300).original
-                ocr_text = pytesseract.image_to_string(img, lang=setting.TESSERACT_LANG)
-                pages.append(ocr_text)
+        for i in page_numbers:
+            page = pdf.pages[i]
+            texts.append(_extract_pdf_page(page))
+            _release_page(page)
+    return texts
+
+
+def _report_chunk(on_page, chunk_pages: list, future):
+    """Done-callback of a chunk: hand each page to on_page, whatever order chunks finish in."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    for i, page_text in zip(chunk_pages, future.result()):
+        on_page(i, page_text)
+
+
+def iter_pdf_pages(file_path: str, workers: int = None, done_pages: dict = None, on_page=None):
+    """
+    Yield the text of each PDF page in order, one page at a time.
+    Page caches are released as soon as a page is extracted. Pages found in
+    done_pages ({page_index: text}, e.g. from a checkpoint) are yielded as-is
+    without being re-extracted. With more than one worker, documents with at least
+    EXTRACTOR_PDF_PARALLEL_MIN_PAGES pages left are split into chunks of at most
+    EXTRACTOR_PDF_CHUNK_PAGES pages extracted in a process pool; no more than
+    2 x workers chunks are in flight, so peak memory is bounded by those pages,
+    whatever the document size. Sequential extraction holds one page at a time.
+    on_page(index, text) is called as soon as a page is extracted, which in the
+    parallel case may be before earlier pages, e.g. to checkpoint it.
+    """
+    workers = workers or setting.EXTRACTOR_PDF_WORKERS
+    done_pages = done_pages or {}
+    with pdfplumber.open(file_path) as pdf:
+        page_count = len(pdf.pages)
+        todo = [i for i in range(page_count) if i not in done_pages]
+        if workers <= 1 or len(todo) < setting.EXTRACTOR_PDF_PARALLEL_MIN_PAGES:
+            for i in range(page_count):
+                if i in done_pages:
+                    yield done_pages[i]
+                    continue
+                page = pdf.pages[i]
+                page_text = _extract_pdf_page(page)
+                _release_page(page)
+                if on_page:
+                    on_page(i, page_text)
+                yield page_text
+            return
+
+    # A few chunks per worker so one slow (scanned) region does not idle the rest
+    chunk_size = max(1, min(math.ceil(len(todo) / (workers * 4)), setting.EXTRACTOR_PDF_CHUNK_PAGES))
+    chunks = [todo[start:start + chunk_size] for start in range(0, len(todo), chunk_size)]
+
+    pool = _get_pdf_pool(workers)
+    in_flight = deque()
+    submitted = 0
+    next_page = 0
+    try:
+        while submitted < len(chunks) or in_flight:
+            # Keep the workers busy without letting finished chunks pile up ahead of the consumer
+            while submitted < len(chunks) and len(in_flight) < workers * 2:
+                future = pool.submit(_extract_pdf_chunk, file_path, chunks[submitted])
+                if on_page:
+                    future.add_done_callback(partial(_report_chunk, on_page, chunks[submitted]))
+                in_flight.append((chunks[submitted], future))
+                submitted += 1
+            chunk_pages, future = in_flight.popleft()
+            for i, page_text in zip(chunk_pages, future.result()):
+                while next_page < i:
+                    yield done_pages[next_page]
+                    next_page += 1
+                yield page_text
+                next_page = i + 1
+    finally:
+        # Abandoned iteration (consumer error): do not leave queued chunks running
+        for _, future in in_flight:
+            future.cancel()
+    while next_page < page_count:
+        yield done_pages[next_page]
+        next_page += 1
+
+
+def extract_pdf(file_path: str, workers: int = None) -> dict:
+    pages = list(iter_pdf_pages(file_path, workers))
     return {"pages": pages, "full_text": "\n".join(pages)}
 
 
@@ -30,19 +140,51 @@ def extract_docx(file_path: str) -> dict:
     return {"pages": paras, "full_text": "\n".join(paras)}
 
 
+def iter_xlsx_rows(file_path: str, max_rows: int = None, max_cells: int = None, truncated_sheets: list = None):
+    """
+    Stream non-empty rows as (sheet_name, row_text) from a read-only workbook.
+    Stops reading a sheet after max_rows rows or max_cells cells and records its
+    name in truncated_sheets.
+    """
+    max_rows = max_rows or setting.XLSX_MAX_ROWS_PER_SHEET
+    max_cells = max_cells or setting.XLSX_MAX_CELLS_PER_SHEET
+    wb = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        for ws in wb.worksheets:
+            # Stored dimensions are often wrong in exported files; read until the real end
+            ws.reset_dimensions()
+            rows = cells = 0
+            for row in ws.iter_rows(values_only=True):
+                if rows >= max_rows or cells >= max_cells:
+                    if truncated_sheets is not None:
+                        truncated_sheets.append(ws.title)
+                    break
+                rows += 1
+                cells += len(row)
+                row_text = " ".join([str(cell) for cell in row if cell])
+                if row_text.strip():
+                    yield ws.title, row_text
+    finally:
+        wb.close()
+
+
 def extract_xlsx(file_path: str) -> dict:
-    wb = openpyxl.load_workbook(file_path)
     sheets_content = []
-    for sheet in wb.sheetnames:
-        ws = wb[sheet]
-        sheet_text = []
-        for row in ws.iter_rows(values_only=True):
-            row_text = " ".join([str(cell) for cell in row if cell])
-            if row_text.strip():
-                sheet_text.append(row_text)
-        if sheet_text:
-            sheets_content.append(f"[{sheet}] " + "\n".join(sheet_text))
-    return {"pages": sheets_content, "full_text": "\n".join(sheets_content)}
+    truncated_sheets = []
+    current_sheet, sheet_text = None, []
+    for sheet, row_text in iter_xlsx_rows(file_path, truncated_sheets=truncated_sheets):
+        if sheet != current_sheet:
+            if sheet_text:
+                sheets_content.append(f"[{current_sheet}] " + "\n".join(sheet_text))
+            current_sheet, sheet_text = sheet, []
+        sheet_text.append(row_text)
+    if sheet_text:
+        sheets_content.append(f"[{current_sheet}] " + "\n".join(sheet_text))
+
+    metadata = {"truncated": bool(truncated_sheets)}
+    if truncated_sheets:
+        metadata["truncated_sheets"] = truncated_sheets
+    return {"pages": sheets_content, "full_text": "\n".join(sheets_content), "metadata": metadata}
 
 
 def extract_txt(file_path: str) -> dict:
@@ -53,34 +195,62 @@ def extract_txt(file_path: str) -> dict:
 
 def extract_image(file_path: str) -> dict:
     img = Image.open(file_path)
-    ocr_text = pytesseract.image_to_string(img, lang=setting.TESSERACT_LANG)
+    ocr_text = get_ocr_engine().image_to_string(img)
     return {"pages": [ocr_text], "full_text": ocr_text}
 
 
 def extract_pptx(file_path: str) -> dict:
+    """
+    Extract slide text and OCR embedded pictures.
+    Pictures are decoded in memory and deduplicated by blob hash, so a logo repeated
+    on every slide is OCR'd once; the unique pictures are OCR'd as one batch.
+    """
     prs = Presentation(file_path)
-    slides_content = []
+    slides_items = []   # per slide: ("text", str) | ("image", blob hash)
+    unique_blobs = {}   # blob hash -> blob, in first-seen order
     for slide in prs.slides:
-        slide_text = []
+        items = []
         for shape in slide.shapes:
             if hasattr(shape, "text") and shape.text.strip():
-                slide_text.append(shape.text)
+                items.append(("text", shape.text))
             if hasattr(shape, "image"):
-                img_bytes = shape.image.blob
-                temp_img = "temp_slide.png"
-                with open(temp_img, "wb") as f:
-                    f.write(img_bytes)
-                img = Image.open(temp_img)
-                ocr_text = pytesseract.image_to_string(img, lang=setting.TESSERACT_LANG)
+                blob = shape.image.blob
+                blob_hash = hashlib.sha1(blob).hexdigest()
+                unique_blobs.setdefault(blob_hash, blob)
+                items.append(("image", blob_hash))
+        slides_items.append(items)
+
+    ocr_by_hash = {}
+    if unique_blobs:
+        hashes, images = [], []
+        for blob_hash, blob in unique_blobs.items():
+            try:
+                img = Image.open(io.BytesIO(blob))
+                img.load()
+            except Exception:
+                # Formats PIL cannot decode (e.g. WMF/EMF) carry no OCR-able text for us
+                continue
+            hashes.append(blob_hash)
+            images.append(img)
+        ocr_by_hash = dict(zip(hashes, get_ocr_engine().images_to_strings(images)))
+
+    slides_content = []
+    for items in slides_items:
+        slide_text = []
+        for kind, value in items:
+            if kind == "text":
+                slide_text.append(value)
+            else:
+                ocr_text = ocr_by_hash.get(value, "")
                 if ocr_text.strip():
                     slide_text.append(ocr_text)
-                os.remove(temp_img)
         slides_content.append("\n".join(slide_text))
     return {"pages": slides_content, "full_text": "\n".join(slides_content)}
 
 
-def extract_any(file_path: str) -> dict:
-    ext = os.path.splitext(file_path)[1].lower()
+def extract_any(file_path: str, file_type: str = None) -> dict:
+    """file_type: type sniffed from the content at ingest (e.g. ".pdf"); defaults to the extension."""
+    ext = file_type or os.path.splitext(file_path)[1].lower()
     if ext == ".pdf":
         return extract_pdf(file_path)
     elif ext == ".docx":
@@ -0,0 +1,103 @@
+import re
+import zlib
+import hashlib
+import logging
+import numpy as np
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from backend.common.config import Settings
+from backend.database.models import Document, DocumentSignature, DocumentLSHBucket
+
+logger = logging.getLogger(__name__)
+
+MERSENNE_PRIME = (1 << 31) - 1
+TOKEN_RE = re.compile(r"\w+")
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures of extracted text, with an LSH band index in the database.
+    Two documents land in the same bucket for at least one band with high probability
+    when their shingle sets are similar; candidates are then verified on the full signature.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, shingle_size: int = 5, threshold: float = None, seed: int = 42):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold or Settings.NEAR_DUP_THRESHOLD
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    # ---------------- SIGNATURES ----------------
+    def _shingles(self, text: str) -> np.ndarray:
+        tokens = TOKEN_RE.findall(text.lower())
+        if not tokens:
+            return np.empty(0, dtype=np.uint64)
+        k = min(self.shingle_size, len(tokens))
+        hashes = {zlib.crc32(" ".join(tokens[i:i + k]).encode("utf-8")) for i in range(len(tokens) - k + 1)}
+        return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+    def signature(self, text: str) -> list | None:
+        """MinHash signature of the text's word shingles, or None for empty text."""
+        shingles = self._shingles(text)
+        if shingles.size == 0:
+            return None
+        signature = np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+        # Chunked so the (num_perm x shingles) matrix stays small for long documents
+        for start in range(0, shingles.size, 8192):
+            chunk = shingles[start:start + 8192]
+            permuted = (self._a[:, None] * chunk[None, :] + self._b[:, None]) % MERSENNE_PRIME
+            np.minimum(signature, permuted.min(axis=1), out=signature)
+        return signature.tolist()
+
+    def _buckets(self, signature: list) -> list:
+        buckets = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.md5(np.asarray(rows, dtype=np.uint64).tobytes()).hexdigest()[:16]
+            buckets.append((band, digest))
+        return buckets
+
+    @staticmethod
+    def similarity(sig_a: list, sig_b: list) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return float(np.mean(np.asarray(sig_a) == np.asarray(sig_b)))
+
+    # ---------------- INDEX ----------------
+    def find_duplicate(self, db: Session, signature: list, exclude_document_id: int = None) -> tuple | None:
+        """Return (original_document_id, similarity) of the best match above threshold, else None."""
+        rows = (
+            db.query(DocumentLSHBucket.document_id)
+            .filter(tuple_(DocumentLSHBucket.band, DocumentLSHBucket.bucket).in_(self._buckets(signature)))
+            .distinct()
+            .all()
+        )
+        candidates = {doc_id for (doc_id,) in rows}
+        candidates.discard(exclude_document_id)
+        if not candidates:
+            return None
+
+        best_id, best_score = None, 0.0
+        for doc_sig in db.query(DocumentSignature).filter(DocumentSignature.document_id.in_(candidates)):
+            score = self.similarity(signature, doc_sig.minhash)
+            if score > best_score:
+                best_id, best_score = doc_sig.document_id, score
+        if best_id is None or best_score < self.threshold:
+            return None
+
+        # Link to the root original, not to another duplicate
+        original = db.query(Document.duplicate_of).filter_by(id=best_id).scalar()
+        return (original or best_id), best_score
+
+    def add(self, db: Session, document_id: int, signature: list):
+        """Index a document's signature (no-op if it is already indexed). Caller commits."""
+        if db.query(DocumentSignature.id).filter_by(document_id=document_id).first():
+            return
+        db.add(DocumentSignature(document_id=document_id, minhash=signature))
+        for band, bucket in self._buckets(signature):
+            db.add(DocumentLSHBucket(document_id=document_id, band=band, bucket=bucket))
@@ -0,0 +1,112 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from backend.common.config import setting
+
+logger = logging.getLogger(__name__)
+
+
+class OCREngine:
+    """Common interface for the OCR backends used by extractor_utils."""
+    name = None
+
+    def image_to_string(self, img: Image.Image) -> str:
+        raise NotImplementedError
+
+    def images_to_strings(self, images: list) -> list:
+        """OCR a batch of images, results in input order."""
+        return [self.image_to_string(img) for img in images]
+
+
+class TesserocrEngine(OCREngine):
+    """
+    In-process Tesseract through the C API bindings (tesserocr).
+    Each thread keeps one warm PyTessBaseAPI, so language models are loaded
+    once per worker and no tesseract process or temp file is created per image.
+    """
+    name = "tesserocr"
+
+    def __init__(self, lang: str = None, tessdata_path: str = None):
+        import tesserocr
+
+        self._tesserocr = tesserocr
+        self.lang = lang or setting.TESSERACT_LANG
+        self.tessdata_path = tessdata_path or setting.TESSDATA_PATH
+        self._local = threading.local()
+        # Fail fast (and let get_ocr_engine fall back) if the language data is missing
+        self._api()
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            kwargs = {"lang": self.lang}
+            if self.tessdata_path:
+                kwargs["path"] = self.tessdata_path
+            api = self._tesserocr.PyTessBaseAPI(**kwargs)
+            self._local.api = api
+        return api
+
+    def image_to_string(self, img: Image.Image) -> str:
+        api = self._api()
+        api.SetImage(img)
+        try:
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+
+class PytesseractEngine(OCREngine):
+    """Fallback: one tesseract subprocess per image via pytesseract."""
+    name = "pytesseract"
+
+    def __init__(self, lang: str = None):
+        import pytesseract
+
+        pytesseract.pytesseract.tesseract_cmd = setting.TESSERACT_PATH
+        self._pytesseract = pytesseract
+        self.lang = lang or setting.TESSERACT_LANG
+
+    def image_to_string(self, img: Image.Image) -> str:
+        return self._pytesseract.image_to_string(img, lang=self.lang)
+
+    def images_to_strings(self, images: list) -> list:
+        # Each call waits on its own tesseract subprocess, so threads overlap them
+        if len(images) <= 1:
+            return [self.image_to_string(img) for img in images]
+        with ThreadPoolExecutor(max_workers=min(len(images), os.cpu_count() or 1)) as pool:
+            return list(pool.map(self.image_to_string, images))
+
+
+OCR_ENGINES = {
+    TesserocrEngine.name: TesserocrEngine,
+    PytesseractEngine.name: PytesseractEngine,
+}
+
+# One engine per process (pool workers each build their own)
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_ocr_engine() -> OCREngine:
+    """Return this process's OCR engine, preferring the in-process one when OCR_ENGINE=auto."""
+    global _engine
+    if _engine is not None:
+        return _engine
+
+    with _engine_lock:
+        if _engine is None:
+            choice = setting.OCR_ENGINE
+            if choice == "auto":
+                try:
+                    _engine = TesserocrEngine()
+                except Exception as e:
+                    logger.info(f"[OCR] tesserocr unavailable ({e}), falling back to pytesseract")
+                    _engine = PytesseractEngine()
+            elif choice in OCR_ENGINES:
+                _engine = OCR_ENGINES[choice]()
+            else:
+                raise ValueError(f"Unknown OCR engine: {choice}")
+            logger.info(f"[OCR] Using {_engine.name} engine")
+    return _engine
@@ -3,13 +3,17 @@ import logging
 
 logger=logging.getLogger(__name__)
 
-def calculate_credibility_score(file_path: str)-> float:
+def calculate_credibility_score(file_path: str, features: dict = None)-> float:
     """
     Placeholder for ai function to calculate credibility score.
+    features: file-level features from the ingest scan, so the file is not read again.
     Returns a float between 0.0 and 1.0
     """
 
     score=round(random.uniform(0.5,1.0), 2)
+    # A file whose content does not match its extension is less trustworthy
+    if features and not features.get("extension_matches", True):
+        score=round(score*0.5, 2)
     logger.info(f"Calculated credibility score for {file_path}: {score}")
     return score
 
@@ -5,6 +5,7 @@ from backend.database.models import Document
 from backend.agents.ingestor.s3_handler import upload_to_s3
 from backend.agents.ingestor.ai_utils import calculate_credibility_score
 from backend.agents.ingestor.kafka_producer import send_document_message
+from backend.common.file_scan import scan_file
 
 logger = logging.getLogger(__name__)
 
@@ -30,17 +31,26 @@ class IngestorAgent:
         filename = os.path.basename(file_path)
         s3_key = f"documents/{filename}"
 
+        # One read for hash, type sniffing and file features; downstream agents reuse the result
+        scan = scan_file(file_path)
+
         # Upload to S3
         s3_url = upload_to_s3(file_path, s3_key)
 
-        # Save in DB
+        # Save in DB; the content hash is unique, so a re-ingested copy keeps the original's
+        file_hash = scan["file_hash"]
+        if self.db.query(Document.id).filter_by(file_hash=file_hash).first():
+            logger.info(f"Content of {filename} already ingested; hash kept on the earlier document")
+            file_hash = None
         doc = Document(
             filename=filename,
+            file_hash=file_hash,
             stored_path=s3_url,
             uploaded_by=uploaded_by,
             source=source,
             sender=sender,
-            status="new"
+            status="new",
+            doc_metadata={"file_scan": scan},
         )
         self.db.add(doc)
         self.db.commit()
@@ -48,7 +58,7 @@ class IngestorAgent:
         logger.info(f"Saved document in DB with id: {doc.id}")
 
         # Compute credibility score
-        score = calculate_credibility_score(file_path)
+        score = calculate_credibility_score(file_path, features=scan["features"])
         doc.credibility_score = score
         self.db.commit()
         logger.info(f"Updated document {doc.id} with credibility score: {score}")
@@ -58,7 +68,12 @@ class IngestorAgent:
             "document_id": doc.id,
             "s3_key": doc.stored_path,
             "uploaded_by": uploaded_by,
-            "credibility_score": score
+            "credibility_score": score,
+            "file_hash": scan["file_hash"],
+            "hash_algo": scan["hash_algo"],
+            "size_bytes": scan["size_bytes"],
+            "detected_type": scan["detected_type"],
+            "features": scan["features"],
         }
         send_document_message(message)
         logger.info(f"Sent Kafka message for document {doc.id}")
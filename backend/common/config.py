@@ -17,6 +17,7 @@ class Settings:
     KAFKA_TOPIC_INGESTOR = os.getenv("KAFKA_TOPIC_INGESTOR", "ingestor_topic")
     KAFKA_TOPIC_EXTRACTOR = os.getenv("KAFKA_TOPIC_EXTRACTOR", "extractor_topic")
     KAFKA_TOPIC_CLASSIFIED = os.getenv("KAFKA_TOPIC_CLASSIFIED", "classified")
+    KAFKA_TOPIC_FEEDBACK = os.getenv("KAFKA_TOPIC_FEEDBACK", "classification_feedback")
 
 
     REDIS_HOST = os.getenv("REDIS_HOST")
@@ -33,6 +34,130 @@ class Settings:
 
     TESSERACT_PATH=os.getenv("TESSERACT_PATH", "tesseract")
     TESSERACT_LANG = os.getenv("TESSERACT_LANG", "eng")
+    TESSDATA_PATH = os.getenv("TESSDATA_PATH")             # tessdata dir for the in-process engine
+    OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")           # "auto" | "tesserocr" | "pytesseract"
+
+    # Single-pass ingest scan: "md5" (compatible with existing file_hash values) | "blake2b" | "xxh3"
+    FILE_HASH_ALGO = os.getenv("FILE_HASH_ALGO", "md5")
+    FILE_SCAN_BUFFER_BYTES = int(os.getenv("FILE_SCAN_BUFFER_BYTES", str(1024 * 1024)))
+
+    # Page-parallel PDF extraction (1 worker = sequential)
+    EXTRACTOR_PDF_WORKERS = int(os.getenv("EXTRACTOR_PDF_WORKERS", "1"))
+    EXTRACTOR_PDF_PARALLEL_MIN_PAGES = int(os.getenv("EXTRACTOR_PDF_PARALLEL_MIN_PAGES", "8"))
+    # Pages per parallel extraction task; at most 2 x workers tasks are in flight
+    EXTRACTOR_PDF_CHUNK_PAGES = int(os.getenv("EXTRACTOR_PDF_CHUNK_PAGES", "16"))
+    # Stream PDF pages straight into the configured text store (TEXT_STORE_BACKEND)
+    EXTRACTOR_PDF_STREAMING = os.getenv("EXTRACTOR_PDF_STREAMING", "false").lower() == "true"
+    # Page-level checkpoints in Redis so restarted PDF jobs resume where they stopped;
+    # only documents with at least MIN_PAGES pages are checkpointed
+    EXTRACTOR_CHECKPOINTS = os.getenv("EXTRACTOR_CHECKPOINTS", "false").lower() == "true"
+    EXTRACTOR_CHECKPOINT_MIN_PAGES = int(os.getenv("EXTRACTOR_CHECKPOINT_MIN_PAGES", "50"))
+    EXTRACTOR_CHECKPOINT_TTL = int(os.getenv("EXTRACTOR_CHECKPOINT_TTL", str(7 * 24 * 3600)))
+
+    # Streaming XLSX extraction caps (per sheet)
+    XLSX_MAX_ROWS_PER_SHEET = int(os.getenv("XLSX_MAX_ROWS_PER_SHEET", "100000"))
+    XLSX_MAX_CELLS_PER_SHEET = int(os.getenv("XLSX_MAX_CELLS_PER_SHEET", "2000000"))
+
+    # Near-duplicate detection (MinHash + LSH over extracted text); run create_db.py first
+    # on databases created before it, to add documents.duplicate_of
+    NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "false").lower() == "true"
+    NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+    NEAR_DUP_SKIP_DOWNSTREAM = os.getenv("NEAR_DUP_SKIP_DOWNSTREAM", "false").lower() == "true"
+
+    # Claim-check transport: Kafka carries a text reference instead of the full text
+    EXTRACTOR_CLAIM_CHECK = os.getenv("EXTRACTOR_CLAIM_CHECK", "false").lower() == "true"
+    TEXT_STORE_BACKEND = os.getenv("TEXT_STORE_BACKEND", "db")   # "db" | "fs"
+    TEXT_STORE_PATH = os.getenv("TEXT_STORE_PATH", "text_store")
+    # Streamed pages written to the database text store per commit
+    TEXT_STORE_PAGE_BATCH = int(os.getenv("TEXT_STORE_PAGE_BATCH", "50"))
+    TEXT_PREVIEW_CHARS = int(os.getenv("TEXT_PREVIEW_CHARS", "500"))
+
+    # Persistent extraction cache keyed by file hash (LRU, bounded on disk)
+    EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+    EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", "extraction_cache")
+    EXTRACTION_CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "1024"))
+
+    # Seconds the in-process rule cache is trusted without a change notification
+    RULES_CACHE_MAX_AGE = float(os.getenv("RULES_CACHE_MAX_AGE", "30"))
+
+    # Classification cache (in-process LRU in front of Redis)
+    CLASSIFICATION_CACHE_LOCAL_SIZE = int(os.getenv("CLASSIFICATION_CACHE_LOCAL_SIZE", "10000"))
+    CLASSIFICATION_CACHE_TTL = int(os.getenv("CLASSIFICATION_CACHE_TTL", "3600"))
+
+    # Classification cascade: "stage:exit_threshold" in order; stages are rules, linear, knn, forest, genai.
+    # By default rules only boost the models (as hints) and the paid GenAI API is opt-in:
+    # add "rules:<t>" / "genai:<t>" to let them decide documents on their own
+    CLASSIFIER_CASCADE = os.getenv("CLASSIFIER_CASCADE", "linear:0.85,forest:0.6")
+    # Ask the GenAI API when every model failed on a document (not when it is merely unsure)
+    CASCADE_GENAI_ON_FAILURE = os.getenv("CASCADE_GENAI_ON_FAILURE", "true").lower() == "true"
+    CASCADE_RULE_CONFIDENCE = float(os.getenv("CASCADE_RULE_CONFIDENCE", "0.9"))
+    CASCADE_LINEAR_MODEL_PATH = os.getenv("CASCADE_LINEAR_MODEL_PATH")   # defaults to linear_model.pkl next to ai_model.pkl
+
+    # Model registry: versioned artifacts, polled and hot-swapped by the classifier
+    MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "model_registry")
+    MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "30"))
+
+    # Inference backend for pickled sklearn models: "sklearn" | "onnx" (checked against sklearn, falls back to it)
+    CLASSIFIER_INFERENCE_BACKEND = os.getenv("CLASSIFIER_INFERENCE_BACKEND", "sklearn")
+    CLASSIFIER_INFERENCE_ATOL = float(os.getenv("CLASSIFIER_INFERENCE_ATOL", "1e-4"))
+    CLASSIFIER_INFERENCE_CHECK_DOCS = int(os.getenv("CLASSIFIER_INFERENCE_CHECK_DOCS", "500"))
+    TRAINING_DATA_DIR = os.getenv("TRAINING_DATA_DIR", "training_data")
+
+    # Online trainer: corrected labels from KAFKA_TOPIC_FEEDBACK, checkpointed to ONLINE_CHECKPOINT_DIR
+    # (not the model registry: a checkpoint is served only once promoted)
+    ONLINE_CHECKPOINT_DIR = os.getenv("ONLINE_CHECKPOINT_DIR", "online_checkpoints")
+    ONLINE_BATCH_SIZE = int(os.getenv("ONLINE_BATCH_SIZE", "32"))
+    ONLINE_BATCH_TIMEOUT_MS = int(os.getenv("ONLINE_BATCH_TIMEOUT_MS", "1000"))
+    ONLINE_HASH_FEATURES = int(os.getenv("ONLINE_HASH_FEATURES", str(2 ** 18)))
+    ONLINE_CHECKPOINT_EVERY = int(os.getenv("ONLINE_CHECKPOINT_EVERY", "500"))       # examples
+    ONLINE_CHECKPOINT_SECONDS = float(os.getenv("ONLINE_CHECKPOINT_SECONDS", "300"))
+    ONLINE_KEEP_CHECKPOINTS = int(os.getenv("ONLINE_KEEP_CHECKPOINTS", "5"))
+
+    # Feature store: hashed per-document term counts for bulk re-classification
+    FEATURE_STORE_ENABLED = os.getenv("FEATURE_STORE_ENABLED", "false").lower() == "true"
+    FEATURE_STORE_PATH = os.getenv("FEATURE_STORE_PATH", "feature_store")
+    FEATURE_HASH_BITS = int(os.getenv("FEATURE_HASH_BITS", "20"))
+    FEATURE_STORE_SHARD_SIZE = int(os.getenv("FEATURE_STORE_SHARD_SIZE", "10000"))
+    FEATURE_STORE_FLUSH_SECONDS = float(os.getenv("FEATURE_STORE_FLUSH_SECONDS", "60"))
+    BULK_RECLASSIFY_BATCH_SIZE = int(os.getenv("BULK_RECLASSIFY_BATCH_SIZE", "4096"))
+
+    # Document embeddings (LSA over TF-IDF) and the approximate nearest-neighbour index
+    EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH", "embedding_model")
+    EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "128"))
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "1000"))
+    EMBEDDING_FIT_DOCS = int(os.getenv("EMBEDDING_FIT_DOCS", "50000"))
+    VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", "vector_index")
+    VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))
+    KNN_NEIGHBOURS = int(os.getenv("KNN_NEIGHBOURS", "10"))
+
+    # Text budget: texts over N tokens are classified on a sample (head, tail, evenly spaced windows); 0 disables
+    TEXT_BUDGET_TOKENS = int(os.getenv("TEXT_BUDGET_TOKENS", "2000"))
+    TEXT_BUDGET_WINDOWS = int(os.getenv("TEXT_BUDGET_WINDOWS", "8"))
+    TEXT_BUDGET_HEAD_SHARE = float(os.getenv("TEXT_BUDGET_HEAD_SHARE", "0.3"))
+    TEXT_BUDGET_TAIL_SHARE = float(os.getenv("TEXT_BUDGET_TAIL_SHARE", "0.15"))
+
+    # Shadow evaluation: comma-separated candidate model artifacts scored off the live path
+    SHADOW_MODELS = os.getenv("SHADOW_MODELS", "")
+    SHADOW_OUTPUT = os.getenv("SHADOW_OUTPUT", "shadow_predictions.jsonl")
+    SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "1"))
+    SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "4"))
+    SHADOW_NICE = int(os.getenv("SHADOW_NICE", "10"))
+
+    # Classifier batching: up to N messages or T milliseconds per batch
+    CLASSIFIER_BATCH_SIZE = int(os.getenv("CLASSIFIER_BATCH_SIZE", "64"))
+    CLASSIFIER_BATCH_TIMEOUT_MS = int(os.getenv("CLASSIFIER_BATCH_TIMEOUT_MS", "200"))
 
     GEMINI_API_KEY:str=os.getenv("GEMINI_API_KEY")
+    GEMINI_API_URL = os.getenv("GEMINI_API_URL", "https://api.gemini.ai/v1/classify")
+    GEMINI_API_BATCH_URL = os.getenv("GEMINI_API_BATCH_URL")   # batch endpoint, if the API offers one
+    GEMINI_BATCH_SIZE = int(os.getenv("GEMINI_BATCH_SIZE", "16"))
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+    GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "16"))
+    GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "10"))
+    # Overall seconds a classifier batch waits for the API; past it the models' answers stand
+    GEMINI_BATCH_DEADLINE = float(os.getenv("GEMINI_BATCH_DEADLINE", "15"))
+    # Circuit breaker: open when the error rate over the last N calls reaches the threshold
+    GEMINI_BREAKER_WINDOW = int(os.getenv("GEMINI_BREAKER_WINDOW", "20"))
+    GEMINI_BREAKER_ERROR_RATE = float(os.getenv("GEMINI_BREAKER_ERROR_RATE", "0.5"))
+    GEMINI_BREAKER_COOLDOWN = float(os.getenv("GEMINI_BREAKER_COOLDOWN", "30"))
 setting=Settings()
\ No newline at end of file
@@ -0,0 +1,269 @@
+import os
+import glob
+import json
+import time
+import uuid
+import logging
+import threading
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from backend.common.config import Settings
+
+logger = logging.getLogger(__name__)
+
+SHARD_PATTERN = "shard-*.npz"
+SPEC_FILENAME = "spec.json"
+
+# Token analysis shared by every stored vector; models analyzing text the same way can be scored from the store
+STORE_ANALYZER = {
+    "analyzer": "word",
+    "lowercase": True,
+    "strip_accents": None,
+    "token_pattern": r"(?u)\b\w\w+\b",
+    "stop_words": "english",
+}
+
+
+class FeatureStore:
+    """
+    Per-document hashed term counts in append-only sparse shards.
+    Each row is a document's raw unigram counts in columns [0, N) and bigram counts
+    in [N, 2N) (N = 2**FEATURE_HASH_BITS), so any model using the store's token
+    analysis can derive its own features (TF-IDF, hashed, uni- or bigram) without
+    re-reading text. Shards are npz files of CSR arrays plus the document ids;
+    a re-extracted document is simply written again and the newest row wins.
+    """
+
+    def __init__(self, root: str = None, hash_bits: int = None, shard_size: int = None, flush_seconds: float = None):
+        self.root = root or Settings.FEATURE_STORE_PATH
+        self.n_features = 2 ** (hash_bits or Settings.FEATURE_HASH_BITS)
+        self.shard_size = shard_size or Settings.FEATURE_STORE_SHARD_SIZE
+        self.flush_seconds = flush_seconds or Settings.FEATURE_STORE_FLUSH_SECONDS
+        os.makedirs(self.root, exist_ok=True)
+        self._check_spec()
+
+        params = dict(STORE_ANALYZER, n_features=self.n_features, alternate_sign=False, norm=None, dtype=np.float32)
+        self._unigrams = HashingVectorizer(ngram_range=(1, 1), **params)
+        self._bigrams = HashingVectorizer(ngram_range=(2, 2), **params)
+
+        self._ids = []
+        self._rows = []
+        self._first_buffered = None
+        self._flush_timer = None
+        self._lock = threading.Lock()
+
+    def _check_spec(self):
+        spec = {"n_features": self.n_features, **STORE_ANALYZER}
+        path = os.path.join(self.root, SPEC_FILENAME)
+        if os.path.exists(path):
+            with open(path) as f:
+                existing = json.load(f)
+            if existing != spec:
+                raise ValueError(f"feature store {self.root} was written with {existing}, not {spec}")
+        else:
+            with open(path, "w") as f:
+                json.dump(spec, f, indent=2)
+
+    # ---------------- WRITE ----------------
+    def vectorize(self, texts: list) -> sp.csr_matrix:
+        return sp.hstack([self._unigrams.transform(texts), self._bigrams.transform(texts)], format="csr")
+
+    def add(self, document_id: int, text: str):
+        """
+        Buffer a document's vector; a shard is written once enough are buffered, or by
+        a timer flush_seconds after the first buffered one, so an idle writer loses at
+        most that much if it is killed.
+        """
+        row = self.vectorize([text])
+        with self._lock:
+            self._ids.append(document_id)
+            self._rows.append(row)
+            if self._first_buffered is None:
+                self._first_buffered = time.monotonic()
+                self._flush_timer = threading.Timer(self.flush_seconds, self._timed_flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+            due = len(self._ids) >= self.shard_size
+        if due:
+            self.flush()
+
+    def _timed_flush(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"[FEATURES] Timed flush failed: {e}")
+
+    def add_many(self, document_ids: list, texts: list):
+        rows = self.vectorize(texts)
+        with self._lock:
+            self._ids.extend(document_ids)
+            self._rows.append(rows)
+            due = len(self._ids) >= self.shard_size
+        if due:
+            self.flush()
+
+    def flush(self) -> str | None:
+        with self._lock:
+            if not self._ids:
+                return None
+            ids, rows = self._ids, self._rows
+            self._ids, self._rows, self._first_buffered = [], [], None
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        return self.write_shard(np.asarray(ids, dtype=np.int64), sp.vstack(rows, format="csr"))
+
+    def write_shard(self, ids: np.ndarray, matrix: sp.csr_matrix, created_ns: int = None, generation: int = 0) -> str:
+        # Names sort by creation time (or the given one), then by compaction generation: "g0001"
+        # sorts after any hex suffix of the same time. The random suffix keeps concurrent writers apart
+        prefix = f"g{generation:04d}-" if generation else ""
+        name = f"shard-{created_ns or time.time_ns():020d}-{prefix}{uuid.uuid4().hex[:8]}.npz"
+        path = os.path.join(self.root, name)
+        tmp_path = os.path.join(self.root, f".{name}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                ids=ids,
+                data=matrix.data.astype(np.float32),
+                indices=matrix.indices.astype(np.int32),
+                indptr=matrix.indptr.astype(np.int64),
+                shape=np.asarray(matrix.shape, dtype=np.int64),
+            )
+        os.replace(tmp_path, path)
+        logger.info(f"[FEATURES] Wrote {len(ids)} vectors to {name}")
+        return path
+
+    # ---------------- READ ----------------
+    def shards(self) -> list:
+        return sorted(glob.glob(os.path.join(self.root, SHARD_PATTERN)))
+
+    @staticmethod
+    def shard_generation(path: str) -> int:
+        """Compaction generation of a shard: 0 for shards written by add(), n for the n-th rewrite."""
+        part = os.path.basename(path).split("-")[2]
+        return int(part[1:]) if part.startswith("g") else 0
+
+    @staticmethod
+    def read_shard(path: str) -> tuple:
+        with np.load(path) as data:
+            matrix = sp.csr_matrix((data["data"], data["indices"], data["indptr"]), shape=tuple(data["shape"]))
+            return data["ids"], matrix
+
+    def iter_batches(self, batch_size: int = None, paths: list = None):
+        """
+        Yield (document_ids, counts CSR) over the latest vector of every document,
+        newest shards first, in batches of up to batch_size rows. `paths` restricts
+        the scan to those shards.
+        """
+        batch_size = batch_size or self.shard_size
+        seen = set()
+        for path in reversed(sorted(paths) if paths is not None else self.shards()):
+            ids, matrix = self.read_shard(path)
+            # Within a shard, later rows are newer
+            keep = []
+            for i in range(len(ids) - 1, -1, -1):
+                doc_id = int(ids[i])
+                if doc_id not in seen:
+                    seen.add(doc_id)
+                    keep.append(i)
+            keep.reverse()
+            for start in range(0, len(keep), batch_size):
+                rows = keep[start:start + batch_size]
+                yield ids[rows], matrix[rows]
+
+    def compact(self, shard_rows: int = None) -> int:
+        """
+        Rewrite the current shards as full-size shards holding only each document's
+        latest vector. The new shards take the oldest replaced shard's timestamp, so a
+        vector written while compaction runs still sorts newer and wins, and a higher
+        generation, so they sort right after that shard. Replaced shards are removed
+        oldest first: if compaction stops part way, every document's latest vector is
+        still either in the new shards or in a newer replaced shard holding the same one.
+        """
+        old = self.shards()
+        if not old:
+            return 0
+        oldest_ns = int(os.path.basename(old[0]).split("-")[1])
+        generation = max(self.shard_generation(path) for path in old) + 1
+        shard_rows = shard_rows or self.shard_size * 10
+        written = 0
+        pending_ids, pending_rows = [], []
+        for ids, matrix in self.iter_batches(shard_rows, paths=old):
+            pending_ids.append(ids)
+            pending_rows.append(matrix)
+            if sum(len(i) for i in pending_ids) >= shard_rows:
+                self.write_shard(np.concatenate(pending_ids), sp.vstack(pending_rows, format="csr"), oldest_ns, generation)
+                written += sum(len(i) for i in pending_ids)
+                pending_ids, pending_rows = [], []
+        if pending_ids:
+            self.write_shard(np.concatenate(pending_ids), sp.vstack(pending_rows, format="csr"), oldest_ns, generation)
+            written += sum(len(i) for i in pending_ids)
+        for path in old:
+            os.remove(path)
+        logger.info(f"[FEATURES] Compacted {len(old)} shards into {written} vectors")
+        return written
+
+    # ---------------- COLUMNS ----------------
+    def columns(self, terms: list) -> np.ndarray:
+        """Store column of each analyzed term ("word" or "word word"); -1 for longer n-grams."""
+        columns = np.full(len(terms), -1, dtype=np.int64)
+        unigram_rows = [i for i, term in enumerate(terms) if term.count(" ") == 0]
+        bigram_rows = [i for i, term in enumerate(terms) if term.count(" ") == 1]
+        for rows, offset in ((unigram_rows, 0), (bigram_rows, self.n_features)):
+            if not rows:
+                continue
+            # Hash the terms exactly as the store's vectorizers hashed the documents' n-grams
+            hasher = HashingVectorizer(n_features=self.n_features, analyzer=lambda term: [term], alternate_sign=False, norm=None)
+            columns[rows] = hasher.transform([terms[i] for i in rows]).indices + offset
+        return columns
+
+    def analyze(self, text: str) -> list:
+        """The store's unigrams of a text (stop words removed), e.g. to locate a rule keyword."""
+        return self._unigrams.build_analyzer()(text)
+
+
+_store = None
+
+
+def get_feature_store() -> FeatureStore:
+    global _store
+    if _store is None:
+        _store = FeatureStore()
+    return _store
+
+
+if __name__ == "__main__":
+    # python -m backend.common.feature_store backfill|compact
+    import sys
+    from backend.database.models import SessionLocal, Extraction
+    from backend.common.text_store import get_text_store
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+    command = sys.argv[1] if len(sys.argv) > 1 else "backfill"
+    store = get_feature_store()
+    if command == "compact":
+        store.compact()
+    elif command == "backfill":
+        # Latest extraction of every document, streamed from the database
+        db = SessionLocal()
+        text_store = get_text_store("db")
+        try:
+            latest = {}
+            for extraction_id, document_id in db.query(Extraction.id, Extraction.document_id).order_by(Extraction.id).yield_per(10000):
+                latest[document_id] = extraction_id
+            ids, texts = [], []
+            for document_id, extraction_id in latest.items():
+                ids.append(document_id)
+                texts.append(text_store.get(extraction_id))
+                if len(ids) >= store.shard_size:
+                    store.add_many(ids, texts)
+                    ids, texts = [], []
+            if ids:
+                store.add_many(ids, texts)
+            store.flush()
+        finally:
+            db.close()
+    else:
+        print("usage: feature_store.py backfill|compact")
+        sys.exit(1)
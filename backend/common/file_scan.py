@@ -0,0 +1,137 @@
+import os
+import hashlib
+from backend.common.config import Settings
+
+# OOXML containers are zip files; the part names in their local headers tell them apart
+ZIP_MEMBER_TYPES = [
+    (b"word/document.xml", ".docx"),
+    (b"xl/workbook.xml", ".xlsx"),
+    (b"ppt/presentation.xml", ".pptx"),
+]
+
+MAGIC_TYPES = [
+    (b"%PDF-", ".pdf"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"II*\x00", ".tiff"),
+    (b"MM\x00*", ".tiff"),
+]
+
+EXTENSION_ALIASES = {".jpeg": ".jpg", ".tif": ".tiff"}
+
+# Plain-text formats: UTF-8 content under any of these extensions is what it claims to be
+TEXT_EXTENSIONS = {".txt", ".csv", ".tsv", ".json", ".xml", ".html", ".htm", ".md", ".log", ".yaml", ".yml", ".rtf"}
+
+# Byte patterns counted over the whole file (cheap structural features)
+PDF_PAGE_MARKERS = (b"/Type /Page", b"/Type/Page")
+PDF_PAGES_MARKERS = (b"/Type /Pages", b"/Type/Pages")
+PATTERNS = PDF_PAGE_MARKERS + PDF_PAGES_MARKERS + (b"/Encrypt",) + tuple(p for p, _ in ZIP_MEMBER_TYPES)
+OVERLAP = max(len(p) for p in PATTERNS) - 1
+
+
+def new_hasher(algo: str = None):
+    """hashlib-style hasher for FILE_HASH_ALGO ("md5", "blake2b" or "xxh3" if xxhash is installed)."""
+    algo = algo or Settings.FILE_HASH_ALGO
+    if algo == "md5":
+        return hashlib.md5()
+    if algo == "blake2b":
+        return hashlib.blake2b(digest_size=16)
+    if algo == "xxh3":
+        import xxhash
+        return xxhash.xxh3_128()
+    raise ValueError(f"Unsupported hash algorithm: {algo}")
+
+
+def _sniff_head(head: bytes) -> str | None:
+    for magic, file_type in MAGIC_TYPES:
+        if head.startswith(magic):
+            return file_type
+    return None
+
+
+def _looks_like_text(head: bytes) -> bool:
+    if not head or b"\x00" in head:
+        return False
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut at the end of the buffer is still text
+        if e.start < len(head) - 3:
+            return False
+    return True
+
+
+def scan_file(file_path: str, algo: str = None, buffer_size: int = None) -> dict:
+    """
+    Read a file once and return everything downstream agents need to know about it:
+    content hash, detected type (magic bytes, not extension) and cheap file-level features.
+    """
+    algo = algo or Settings.FILE_HASH_ALGO
+    buffer_size = buffer_size or Settings.FILE_SCAN_BUFFER_BYTES
+    hasher = new_hasher(algo)
+    counts = dict.fromkeys(PATTERNS, 0)
+    size = 0
+    null_bytes = 0
+    newlines = 0
+    head = b""
+    tail = b""
+
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            chunk = f.read(buffer_size)
+            if not chunk:
+                break
+            if not head:
+                head = chunk[:4096]
+            hasher.update(chunk)
+            size += len(chunk)
+            null_bytes += chunk.count(b"\x00")
+            newlines += chunk.count(b"\n")
+            # Carry a tail over so patterns split across reads are found; matches lying
+            # entirely inside the tail were already counted with the previous read
+            window = tail + chunk
+            for pattern in PATTERNS:
+                counts[pattern] += window.count(pattern) - tail.count(pattern)
+            tail = window[-OVERLAP:]
+
+    detected_type = _sniff_head(head)
+    if detected_type is None and head.startswith(b"PK\x03\x04"):
+        for member, file_type in ZIP_MEMBER_TYPES:
+            if counts[member]:
+                detected_type = file_type
+                break
+    extension = os.path.splitext(file_path)[1].lower()
+    extension = EXTENSION_ALIASES.get(extension, extension)
+    if detected_type is None and _looks_like_text(head):
+        # Text cannot be told apart further from its bytes: keep the text extension it has
+        detected_type = extension if extension in TEXT_EXTENSIONS else ".txt"
+    features = {
+        "null_byte_ratio": round(null_bytes / size, 4) if size else 0.0,
+        "newlines": newlines,
+        "extension_matches": detected_type is None or extension == detected_type,
+    }
+    if detected_type == ".pdf":
+        pages = sum(counts[p] for p in PDF_PAGE_MARKERS) - sum(counts[p] for p in PDF_PAGES_MARKERS)
+        features["pdf_page_estimate"] = max(pages, 0)
+        features["pdf_encrypted"] = counts[b"/Encrypt"] > 0
+
+    return {
+        "file_hash": hasher.hexdigest(),
+        "hash_algo": algo,
+        "size_bytes": size,
+        "detected_type": detected_type,
+        "features": features,
+    }
+
+
+def hash_file(file_path: str, algo: str = None, buffer_size: int = None) -> str:
+    """Content hash only, with the same algorithm and buffering as scan_file."""
+    hasher = new_hasher(algo)
+    buffer_size = buffer_size or Settings.FILE_SCAN_BUFFER_BYTES
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            chunk = f.read(buffer_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
@@ -1,4 +1,5 @@
 import json
+import time
 import logging
 from kafka import KafkaConsumer
 from backend.common.config import Settings
@@ -39,6 +40,36 @@ class KafkaConsumerClient:
             logger.error(f"[KAFKA] Consumer loop crashed: {e}")
             raise  # re-raise so your agent knows something went wrong
 
+    def consume_batches(self, process_batch, max_records: int = 100, timeout_ms: int = 500):
+        """
+        Continuously consume messages in batches and pass them to process_batch.
+        A batch is handed over once it holds max_records messages or timeout_ms
+        has passed since its first poll, whichever comes first.
+        process_batch(messages: list[dict]) -> None
+        """
+        logger.info(f"[KAFKA] Starting batch consumption on {self.topic} (max {max_records}, {timeout_ms} ms)")
+        try:
+            while True:
+                batch = []
+                deadline = time.monotonic() + timeout_ms / 1000
+                while len(batch) < max_records:
+                    remaining_ms = int((deadline - time.monotonic()) * 1000)
+                    if remaining_ms <= 0:
+                        break
+                    records = self.consumer.poll(timeout_ms=remaining_ms, max_records=max_records - len(batch))
+                    for partition_records in records.values():
+                        batch.extend(msg.value for msg in partition_records)
+                if not batch:
+                    continue
+                try:
+                    logger.debug(f"[KAFKA] Received batch of {len(batch)} messages")
+                    process_batch(batch)
+                except Exception as e:
+                    logger.error(f"[KAFKA] Error processing batch of {len(batch)} messages: {e}")
+        except Exception as e:
+            logger.error(f"[KAFKA] Consumer loop crashed: {e}")
+            raise  # re-raise so your agent knows something went wrong
+
     def close(self):
         """Close Kafka consumer safely."""
         try:
@@ -0,0 +1,184 @@
+import os
+import uuid
+import hashlib
+import logging
+import tempfile
+from backend.common.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class TextStore:
+    """
+    Claim-check store for extracted text.
+    put() persists the text and returns a reference dict {"store": name, "key": key}
+    that is small enough to travel in a Kafka message; get() resolves it again.
+    """
+    name = None
+
+    def put(self, text: str, key=None) -> dict:
+        raise NotImplementedError
+
+    def get(self, key) -> str:
+        raise NotImplementedError
+
+    def put_pages(self, pages, key=None) -> dict:
+        """Store text arriving page by page (joined with newlines, like full_text)."""
+        return self.put("\n".join(pages), key=key)
+
+
+class FileSystemTextStore(TextStore):
+    """Content-addressed text files under TEXT_STORE_PATH (meant for local testing)."""
+    name = "fs"
+
+    def __init__(self, root: str = None):
+        self.root = root or Settings.TEXT_STORE_PATH
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.txt")
+
+    def put(self, text: str, key=None) -> dict:
+        # Content-addressed: identical texts share one file
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        path = self._path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        return {"store": self.name, "key": key}
+
+    def put_pages(self, pages, key=None) -> dict:
+        # Write each page as it arrives and hash incrementally; nothing is buffered
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for i, page in enumerate(pages):
+                    chunk = page if i == 0 else "\n" + page
+                    f.write(chunk)
+                    digest.update(chunk.encode("utf-8"))
+            key = digest.hexdigest()
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return {"store": self.name, "key": key}
+
+    def get(self, key) -> str:
+        with open(self._path(key), "r", encoding="utf-8") as f:
+            return f.read()
+
+
+class DatabaseTextStore(TextStore):
+    """
+    The Extraction row is the store; the reference is the extraction id.
+    Streamed texts have no row yet while pages arrive: their pages are written to
+    extraction_pages under a "pages:<id>" key instead.
+    """
+    name = "db"
+    PAGES_PREFIX = "pages:"
+
+    def put(self, text: str, key=None) -> dict:
+        # Text was already written with the Extraction row
+        if key is None:
+            raise ValueError("DatabaseTextStore needs the extraction id as key")
+        return {"store": self.name, "key": key}
+
+    def put_pages(self, pages, key=None) -> dict:
+        # Pages are committed in batches of TEXT_STORE_PAGE_BATCH; only one batch is held in memory
+        from backend.database.models import SessionLocal, ExtractionPage
+
+        key = f"{self.PAGES_PREFIX}{uuid.uuid4().hex}"
+        db = SessionLocal()
+        try:
+            batch = []
+            for page_number, page in enumerate(pages):
+                batch.append({"text_key": key, "page_number": page_number, "text": page})
+                if len(batch) >= Settings.TEXT_STORE_PAGE_BATCH:
+                    db.bulk_insert_mappings(ExtractionPage, batch)
+                    db.commit()
+                    batch = []
+            if batch:
+                db.bulk_insert_mappings(ExtractionPage, batch)
+                db.commit()
+        except Exception:
+            db.rollback()
+            db.query(ExtractionPage).filter_by(text_key=key).delete()
+            db.commit()
+            raise
+        finally:
+            db.close()
+        return {"store": self.name, "key": key}
+
+    def _get_pages(self, key: str) -> str:
+        from backend.database.models import SessionLocal, ExtractionPage
+
+        db = SessionLocal()
+        try:
+            pages = (
+                db.query(ExtractionPage.text)
+                .filter_by(text_key=key)
+                .order_by(ExtractionPage.page_number)
+                .yield_per(Settings.TEXT_STORE_PAGE_BATCH)
+            )
+            return "\n".join(text for (text,) in pages)
+        finally:
+            db.close()
+
+    def get(self, key) -> str:
+        if isinstance(key, str) and key.startswith(self.PAGES_PREFIX):
+            return self._get_pages(key)
+
+        from backend.database.models import SessionLocal, Extraction
+
+        db = SessionLocal()
+        try:
+            extraction = db.query(Extraction).filter_by(id=key).first()
+            if not extraction:
+                raise KeyError(f"Extraction {key} not found")
+            if extraction.extracted_text is None:
+                # Streamed extractions keep their text under their own reference
+                text_ref = (extraction.extracted_metadata or {}).get("text_ref")
+                if text_ref and text_ref.get("key") != key:
+                    return get_text_store(text_ref["store"]).get(text_ref["key"])
+            return extraction.extracted_text or ""
+        finally:
+            db.close()
+
+
+TEXT_STORES = {
+    FileSystemTextStore.name: FileSystemTextStore,
+    DatabaseTextStore.name: DatabaseTextStore,
+}
+
+
+def get_text_store(name: str = None) -> TextStore:
+    name = name or Settings.TEXT_STORE_BACKEND
+    if name not in TEXT_STORES:
+        raise ValueError(f"Unknown text store: {name}")
+    return TEXT_STORES[name]()
+
+
+def resolve_text(message: dict) -> str:
+    """
+    Return the full text of an extractor message.
+    Inline text is used as-is; a claim-check reference is fetched from its store.
+    """
+    if message.get("extracted_text"):
+        return message["extracted_text"]
+
+    text_ref = message.get("text_ref")
+    if not text_ref:
+        return ""
+
+    try:
+        return get_text_store(text_ref["store"]).get(text_ref["key"])
+    except Exception as e:
+        logger.error(f"[TEXT STORE] Could not resolve {text_ref}: {e}")
+        return ""
@@ -2,5 +2,7 @@
 from backend.database.models import init_db
 
 print("Attempting to create database tables...")
-init_db()
-print("Database tables created successfully (if they didn't already exist).")
\ No newline at end of file
+changes = init_db()
+print("Database tables created successfully (if they didn't already exist).")
+for change in changes:
+    print(f"Upgraded existing schema: {change}")
\ No newline at end of file
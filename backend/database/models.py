@@ -1,5 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, JSON, ForeignKey, Float, Text, Boolean
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, DateTime, JSON, ForeignKey, Float, Text, Boolean, Index, LargeBinary
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
+from sqlalchemy.schema import CreateColumn
 from datetime import datetime, timezone
 from backend.common.config import Settings
 
@@ -41,6 +42,7 @@ class Document(Base):
     status = Column(String, default="new", index=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     credibility_score = Column(Float, nullable=True)
+    duplicate_of = Column(Integer, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True, index=True)  # near-duplicate original
 
     uploader = relationship("User", back_populates="documents")
     logs = relationship("Logs", back_populates="document", cascade="all, delete-orphan")
@@ -49,6 +51,7 @@ class Document(Base):
     routes = relationship("Route", back_populates="document", cascade="all, delete-orphan")
     embeddings = relationship("DocumentEmbedding", back_populates="document", cascade="all, delete-orphan")
     routing_logs = relationship("RoutingLog", back_populates="document", cascade="all, delete-orphan")
+    signature = relationship("DocumentSignature", back_populates="document", uselist=False, cascade="all, delete-orphan")
 
 
 class Logs(Base):
@@ -77,6 +80,16 @@ class Extraction(Base):
     document = relationship("Document", back_populates="extractions")
 
 
+class ExtractionPage(Base):
+    __tablename__ = "extraction_pages"
+    __table_args__ = (Index("ix_extraction_pages_text_key_page", "text_key", "page_number"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    text_key = Column(String, nullable=False)   # text store reference of a streamed extraction
+    page_number = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+
+
 class Classification(Base):
     __tablename__ = "classifications"
 
@@ -86,6 +99,7 @@ class Classification(Base):
     category = Column(String, nullable=False)          # e.g., "invoice", "resume"
     confidence = Column(Float, nullable=True)
     details = Column(JSON, nullable=True)
+    model_version = Column(String, nullable=True)     # version of the model that decided; None for rules
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     document = relationship("Document", back_populates="classifications")
@@ -118,13 +132,37 @@ class DocumentEmbedding(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
-    embedding = Column(JSON, nullable=False)    # store vector embedding
-    model = Column(String, nullable=False)      # e.g., "openai-ada-002"
+    extraction_id = Column(Integer, ForeignKey("extractions.id", ondelete="CASCADE"), nullable=True, index=True)  # text that was embedded
+    embedding = Column(JSON, nullable=True)     # store vector embedding
+    vector = Column(LargeBinary, nullable=True) # compact float32 embedding (numpy tobytes)
+    dimensions = Column(Integer, nullable=True)
+    model = Column(String, nullable=False, index=True)  # e.g., "openai-ada-002", "lsa-<version>"
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     document = relationship("Document", back_populates="embeddings")
 
 
+class DocumentSignature(Base):
+    __tablename__ = "document_signatures"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
+    minhash = Column(JSON, nullable=False)      # list of MinHash values
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    document = relationship("Document", back_populates="signature")
+
+
+class DocumentLSHBucket(Base):
+    __tablename__ = "document_lsh_buckets"
+    __table_args__ = (Index("ix_document_lsh_buckets_band_bucket", "band", "bucket"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    band = Column(Integer, nullable=False)
+    bucket = Column(String, nullable=False)     # hash of the band's MinHash rows
+
+
 # ------------------- NEW MODELS FOR ROUTER -------------------
 
 class RoutingRule(Base):
@@ -158,7 +196,71 @@ class RoutingLog(Base):
     rule = relationship("RoutingRule")
 
 
+# ------------------- SCHEMA UPGRADES -------------------
+# create_all() only creates missing tables. Columns added to a table that already
+# shipped are listed here and added to existing databases by upgrade_db().
+ADDED_COLUMNS = [
+    ("documents", "duplicate_of"),
+    ("classifications", "model_version"),
+    ("document_embeddings", "extraction_id"),
+    ("document_embeddings", "vector"),
+    ("document_embeddings", "dimensions"),
+]
+# Columns that were NOT NULL when their table shipped and are nullable now
+RELAXED_COLUMNS = [
+    ("document_embeddings", "embedding"),
+]
+
+
+def _add_column_ddl(column) -> str:
+    ddl = f"ALTER TABLE {column.table.name} ADD COLUMN {CreateColumn(column).compile(dialect=engine.dialect)}"
+    for fk in column.foreign_keys:
+        ddl += f" REFERENCES {fk.column.table.name} ({fk.column.name})"
+        if fk.ondelete:
+            ddl += f" ON DELETE {fk.ondelete}"
+    return ddl
+
+
+def upgrade_db() -> list:
+    """Bring tables created by an earlier release up to date; safe to run repeatedly. Returns the changes made."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    changes = []
+    with engine.begin() as conn:
+        for table_name, column_name in ADDED_COLUMNS:
+            if table_name not in existing_tables:
+                continue
+            if column_name in {c["name"] for c in inspector.get_columns(table_name)}:
+                continue
+            conn.execute(text(_add_column_ddl(Base.metadata.tables[table_name].c[column_name])))
+            changes.append(f"added {table_name}.{column_name}")
+        for table_name, column_name in RELAXED_COLUMNS:
+            if table_name not in existing_tables:
+                continue
+            column = next(c for c in inspector.get_columns(table_name) if c["name"] == column_name)
+            if column["nullable"]:
+                continue
+            if engine.dialect.name == "sqlite":
+                # SQLite cannot alter a column in place; such a table has to be recreated
+                changes.append(f"{table_name}.{column_name} is still NOT NULL (recreate the table on SQLite)")
+                continue
+            conn.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN {column_name} DROP NOT NULL"))
+            changes.append(f"made {table_name}.{column_name} nullable")
+        # Indexes declared on added columns, or added to existing tables
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for index in table.indexes:
+                if {c.name for c in index.columns} <= columns and not inspector.has_index(table.name, index.name):
+                    index.create(conn)
+                    changes.append(f"created index {index.name}")
+    return changes
+
+
 # ------------------- INIT -------------------
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    return upgrade_db()
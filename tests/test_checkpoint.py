@@ -0,0 +1,54 @@
+import fakeredis
+import pytest
+
+from backend.agents.extractor.checkpoint import PageCheckpointStore
+
+
+@pytest.fixture
+def store():
+    return PageCheckpointStore(fakeredis.FakeRedis(decode_responses=True), ttl=60)
+
+
+def _pages(texts: dict):
+    """A page factory yielding texts in order and reporting each newly extracted page."""
+    extracted = []
+
+    def factory(done_pages, on_page):
+        for index in sorted(texts):
+            if index in done_pages:
+                yield done_pages[index]
+                continue
+            extracted.append(index)
+            on_page(index, texts[index])
+            yield texts[index]
+
+    return factory, extracted
+
+
+def test_short_documents_are_never_written(store):
+    factory, _ = _pages({i: f"page {i}" for i in range(3)})
+    assert list(store.iter_pages("h", factory, min_pages=5)) == ["page 0", "page 1", "page 2"]
+    assert store.load("h") == {}
+
+
+def test_pages_are_kept_after_the_last_page_until_cleared(store):
+    texts = {i: f"page {i}" for i in range(6)}
+    factory, _ = _pages(texts)
+    assert list(store.iter_pages("h", factory, min_pages=2)) == list(texts.values())
+    # The caller clears them once the extraction is saved and sent
+    assert store.load("h") == texts
+    store.clear("h")
+    assert store.load("h") == {}
+
+
+def test_restart_resumes_from_saved_pages(store):
+    texts = {i: f"page {i}" for i in range(6)}
+    factory, _ = _pages(texts)
+    pages = store.iter_pages("h", factory, min_pages=2)
+    for _ in range(4):
+        next(pages)                          # crash after four pages
+    pages.close()
+
+    factory, extracted = _pages(texts)
+    assert list(store.iter_pages("h", factory, min_pages=2)) == list(texts.values())
+    assert extracted == [4, 5]
@@ -0,0 +1,68 @@
+import pytest
+
+from backend.agents.classifier import genai_utils
+from backend.agents.classifier.genai_utils import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(genai_utils.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _fill(breaker, outcomes):
+    for success in outcomes:
+        assert breaker.allow()
+        breaker.record(success)
+
+
+def test_stays_closed_until_the_window_is_full(clock):
+    breaker = CircuitBreaker(window=4, error_rate=0.5, cooldown=10)
+    _fill(breaker, [False, False, False])
+    assert breaker.state == "closed"
+
+
+def test_opens_at_the_error_rate_and_rejects_calls(clock):
+    breaker = CircuitBreaker(window=4, error_rate=0.5, cooldown=10)
+    _fill(breaker, [True, False, True, False])
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_rolling_window_forgets_old_failures(clock):
+    breaker = CircuitBreaker(window=4, error_rate=0.5, cooldown=10)
+    _fill(breaker, [False, True, True, True, True, False])
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through_and_success_closes(clock):
+    breaker = CircuitBreaker(window=2, error_rate=0.5, cooldown=10)
+    _fill(breaker, [False, False])
+    clock[0] += 10
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()               # only one trial at a time
+    breaker.record(True)
+    assert breaker.state == "closed"
+    # The window starts afresh after closing
+    _fill(breaker, [False])
+    assert breaker.state == "closed"
+
+
+def test_failed_trial_reopens_for_another_cooldown(clock):
+    breaker = CircuitBreaker(window=2, error_rate=0.5, cooldown=10)
+    _fill(breaker, [False, False])
+    clock[0] += 10
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open"
+    clock[0] += 9
+    assert not breaker.allow()
+
+
+def test_late_outcomes_of_calls_started_before_opening_are_ignored(clock):
+    breaker = CircuitBreaker(window=2, error_rate=0.5, cooldown=10)
+    _fill(breaker, [False, False])
+    breaker.record(True)                     # no trial in flight: ignored
+    assert breaker.state == "open"
@@ -0,0 +1,91 @@
+import threading
+
+import fakeredis
+import pytest
+
+from backend.agents.classifier.classification_cache import ClassificationCache, SingleFlight, cache_key, text_hash
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def test_key_changes_with_content_model_and_rules():
+    key = cache_key(text_hash("text"), "m1", "r1")
+    assert key == cache_key(text_hash("text"), "m1", "r1")
+    assert len({key, cache_key(text_hash("other"), "m1", "r1"),
+                cache_key(text_hash("text"), "m2", "r1"), cache_key(text_hash("text"), "m1", "r2")}) == 4
+
+
+def test_set_writes_both_tiers_with_ttl(client):
+    cache = ClassificationCache(client, max_entries=10, ttl=60)
+    cache.set("k", {"classification": "Invoice"})
+    assert cache.get("k") == {"classification": "Invoice"}
+    assert 0 < client.ttl("k") <= 60
+
+
+def test_local_lru_evicts_oldest_and_falls_back_to_redis(client):
+    cache = ClassificationCache(client, max_entries=2, ttl=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, {"v": key})
+    assert cache._get_local("a") is None
+    assert cache.get("a") == {"v": "a"}      # from Redis, now local again
+    assert cache._get_local("a") == {"v": "a"}
+    assert len(cache._local) == 2
+
+
+def test_expired_local_entry_is_dropped(client):
+    cache = ClassificationCache(client, max_entries=10, ttl=60)
+    cache._set_local("k", {"v": 1}, ttl=-1)
+    assert cache._get_local("k") is None
+    assert "k" not in cache._local
+
+
+def test_redis_failure_is_a_miss():
+    class Broken:
+        def pipeline(self):
+            raise ConnectionError("down")
+
+        def setex(self, *args):
+            raise ConnectionError("down")
+
+    cache = ClassificationCache(Broken(), max_entries=10, ttl=60)
+    assert cache.get("k") is None
+    cache.set("k", {"v": 1})                 # logged, still cached locally
+    assert cache.get("k") == {"v": 1}
+
+
+def test_single_flight_has_one_leader_per_key():
+    flight = SingleFlight()
+    is_leader, call = flight.begin("k")
+    assert is_leader
+    follower, same_call = flight.begin("k")
+    assert not follower and same_call is call
+    assert flight.begin("other")[0]
+
+    flight.end("k", {"v": 1})
+    assert SingleFlight.wait(call, 0) == {"v": 1}
+    # Once ended, the next caller leads a new flight
+    assert flight.begin("k")[0]
+
+
+def test_single_flight_followers_wait_for_the_leader():
+    flight = SingleFlight()
+    _, call = flight.begin("k")
+    results = []
+    waiters = [threading.Thread(target=lambda: results.append(SingleFlight.wait(flight.begin("k")[1], 5))) for _ in range(4)]
+    for waiter in waiters:
+        waiter.start()
+    flight.end("k", {"v": 2})
+    for waiter in waiters:
+        waiter.join()
+    assert results == [{"v": 2}] * 4
+
+
+def test_single_flight_wait_times_out_with_none():
+    flight = SingleFlight()
+    _, call = flight.begin("k")
+    assert SingleFlight.wait(call, 0.01) is None
+    flight.end("k", None)                     # a failed leader also releases followers
+    assert SingleFlight.wait(call, 0) is None
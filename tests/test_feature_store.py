@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from backend.common.feature_store import FeatureStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore(str(tmp_path / "features"), hash_bits=8, shard_size=100, flush_seconds=3600)
+
+
+def _latest(store) -> dict:
+    """document id -> that document's row as a {column: count} dict."""
+    latest = {}
+    for ids, matrix in store.iter_batches():
+        for doc_id, row in zip(ids, matrix):
+            latest[int(doc_id)] = dict(zip(row.indices.tolist(), row.data.tolist()))
+    return latest
+
+
+def _latest_of(store, text: str) -> dict:
+    row = store.vectorize([text])
+    return dict(zip(row.indices.tolist(), row.data.tolist()))
+
+
+def test_newest_row_wins_across_and_within_shards(store):
+    store.add_many([1, 2, 1], ["alpha", "beta", "gamma"])
+    store.flush()
+    store.add(2, "delta")
+    store.flush()
+    latest = _latest(store)
+    assert latest[1] == _latest_of(store, "gamma")
+    assert latest[2] == _latest_of(store, "delta")
+
+
+def test_compaction_keeps_latest_rows_in_one_shard(store):
+    for doc_id, text in enumerate(["a1 word", "b1 word", "a2 term", "c1 term", "b2 word"]):
+        store.add(doc_id % 3, text)
+        store.flush()
+    before = _latest(store)
+    assert store.compact() == 3
+    assert len(store.shards()) == 1
+    assert store.shard_generation(store.shards()[0]) == 1
+    assert _latest(store) == before
+
+
+def test_interrupted_compaction_still_reads_latest_rows(store):
+    store.add(1, "stale text")
+    store.flush()
+    store.add(1, "fresh text")
+    store.add(2, "other text")
+    store.flush()
+    before = _latest(store)
+
+    # Compacted output written, replaced shards not yet removed
+    old = store.shards()
+    oldest_ns = int(os.path.basename(old[0]).split("-")[1])
+    for ids, matrix in store.iter_batches(paths=old):
+        store.write_shard(ids, matrix, created_ns=oldest_ns, generation=1)
+    assert _latest(store) == before
+
+    # ... or removed only in part, oldest first
+    os.remove(old[0])
+    assert _latest(store) == before
+
+
+def test_vectors_written_during_compaction_stay_newest(store):
+    store.add(1, "old text")
+    store.flush()
+    store.add(1, "newer text")
+    store.flush()
+    old = store.shards()
+    store.add(1, "newest text")
+    store.flush()
+    # Compacting only the snapshot taken before the last write
+    oldest_ns = int(os.path.basename(old[0]).split("-")[1])
+    for ids, matrix in store.iter_batches(paths=old):
+        store.write_shard(ids, matrix, created_ns=oldest_ns, generation=1)
+    for path in old:
+        os.remove(path)
+    assert _latest(store)[1] == _latest_of(store, "newest text")
+
+
+def test_store_rejects_a_different_spec(tmp_path):
+    FeatureStore(str(tmp_path / "features"), hash_bits=8)
+    with pytest.raises(ValueError):
+        FeatureStore(str(tmp_path / "features"), hash_bits=9)
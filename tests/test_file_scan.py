@@ -0,0 +1,81 @@
+import hashlib
+import zipfile
+
+import pytest
+
+from backend.common.file_scan import hash_file, scan_file
+
+
+def _write(path, data: bytes):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_pdf_is_detected_and_pages_are_counted_across_read_boundaries(tmp_path):
+    body = b"%PDF-1.7\n" + b"<< /Type /Pages /Count 3 >>\n" + b"".join(
+        b"x" * 37 + b"<< /Type /Page >>\n" for _ in range(3)
+    )
+    path = _write(tmp_path / "report.pdf", body)
+    # A tiny buffer splits the markers between reads
+    scan = scan_file(path, buffer_size=7)
+    assert scan["detected_type"] == ".pdf"
+    assert scan["features"]["pdf_page_estimate"] == 3
+    assert scan["features"]["pdf_encrypted"] is False
+    assert scan["features"]["extension_matches"] is True
+    assert scan["size_bytes"] == len(body)
+
+
+def test_hash_matches_hashlib_and_hash_file(tmp_path):
+    data = b"some content\n" * 1000
+    path = _write(tmp_path / "notes.txt", data)
+    scan = scan_file(path, algo="md5", buffer_size=100)
+    assert scan["file_hash"] == hashlib.md5(data).hexdigest()
+    assert hash_file(path, algo="md5", buffer_size=64) == scan["file_hash"]
+    assert scan_file(path, algo="blake2b")["file_hash"] == hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+@pytest.mark.parametrize("member, extension", [
+    ("word/document.xml", ".docx"),
+    ("xl/workbook.xml", ".xlsx"),
+    ("ppt/presentation.xml", ".pptx"),
+])
+def test_office_files_are_told_apart_by_zip_members(tmp_path, member, extension):
+    path = tmp_path / f"file{extension}"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr(member, "<xml/>")
+    scan = scan_file(str(path))
+    assert scan["detected_type"] == extension
+    assert scan["features"]["extension_matches"] is True
+
+
+def test_image_magic_with_alias_extension(tmp_path):
+    path = _write(tmp_path / "scan.jpeg", b"\xff\xd8\xff\xe0" + b"\x00" * 100)
+    scan = scan_file(path)
+    assert scan["detected_type"] == ".jpg"
+    assert scan["features"]["extension_matches"] is True
+
+
+@pytest.mark.parametrize("name, data", [
+    ("table.csv", b"a,b\n1,2\n"),
+    ("data.json", b'{"a": 1}'),
+    ("page.html", b"<html></html>"),
+    ("readme.md", "# Têtes\n".encode("utf-8")),
+])
+def test_text_formats_keep_their_extension(tmp_path, name, data):
+    scan = scan_file(_write(tmp_path / name, data))
+    assert scan["detected_type"] == "." + name.rsplit(".", 1)[1]
+    assert scan["features"]["extension_matches"] is True
+
+
+def test_text_under_a_binary_extension_is_a_mismatch(tmp_path):
+    scan = scan_file(_write(tmp_path / "invoice.pdf", b"plain text pretending to be a pdf"))
+    assert scan["detected_type"] == ".txt"
+    assert scan["features"]["extension_matches"] is False
+
+
+def test_unknown_binary_is_left_undetected(tmp_path):
+    scan = scan_file(_write(tmp_path / "blob.bin", b"\x01\x00\x02\x00" * 50))
+    assert scan["detected_type"] is None
+    assert scan["features"]["extension_matches"] is True
+    assert scan["features"]["null_byte_ratio"] == 0.5
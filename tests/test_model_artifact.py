@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
+
+from backend.agents.classifier.model_artifact import MmapPipeline, export_artifact, is_mmap_artifact
+
+TOPICS = {
+    "Invoice": "invoice total amount due payment tax vat remit bank",
+    "Resume": "resume experience skills education python engineer references",
+    "Contract": "agreement parties clause term termination liability governing law",
+}
+
+
+def _corpus(n_per_class: int, seed: int):
+    rng = np.random.default_rng(seed)
+    texts, labels = [], []
+    for label, vocabulary in TOPICS.items():
+        words = vocabulary.split() + "the of and to in for with on".split()
+        for _ in range(n_per_class):
+            texts.append(" ".join(rng.choice(words, size=30)))
+            labels.append(label)
+    return texts, labels
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    texts, labels = _corpus(30, seed=0)
+    encoder = LabelEncoder()
+    y = encoder.fit_transform(labels)
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, stop_words="english")),
+        ("rf", RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0)),
+    ]).fit(texts, y)
+    return pipeline, encoder
+
+
+def test_export_writes_a_complete_artifact(tmp_path, fitted):
+    pipeline, encoder = fitted
+    out = export_artifact(pipeline, encoder, str(tmp_path / "model"), version="v1")
+    assert is_mmap_artifact(out)
+    assert not is_mmap_artifact(str(tmp_path))
+    artifact = MmapPipeline(out)
+    assert artifact.manifest["version"] == "v1"
+    assert artifact.classes_ == list(encoder.inverse_transform(pipeline.steps[-1][1].classes_))
+
+
+def test_mmap_inference_matches_sklearn(tmp_path, fitted):
+    pipeline, encoder = fitted
+    artifact = MmapPipeline(export_artifact(pipeline, encoder, str(tmp_path / "model")))
+    texts, _ = _corpus(10, seed=1)
+    texts += ["", "completely unseen vocabulary only", "Invoice INVOICE résumé"]
+
+    expected_features = pipeline.named_steps["tfidf"].transform(texts).toarray().astype(np.float32)
+    np.testing.assert_allclose(artifact.transform(texts), expected_features, atol=1e-6)
+    np.testing.assert_allclose(artifact.predict_proba(texts), pipeline.predict_proba(texts), atol=1e-6)
+
+
+def test_export_replaces_an_existing_artifact(tmp_path, fitted):
+    pipeline, encoder = fitted
+    out = str(tmp_path / "model")
+    export_artifact(pipeline, encoder, out, version="v1")
+    export_artifact(pipeline, encoder, out, version="v2")
+    assert MmapPipeline(out).manifest["version"] == "v2"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model"]
+
+
+def test_custom_analyzers_cannot_be_exported(tmp_path, fitted):
+    _, encoder = fitted
+    texts, labels = _corpus(5, seed=2)
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer(analyzer=str.split)),
+        ("rf", RandomForestClassifier(n_estimators=2, random_state=0)),
+    ]).fit(texts, encoder.transform(labels))
+    with pytest.raises(ValueError):
+        export_artifact(pipeline, encoder, str(tmp_path / "model"))
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.agents.extractor.near_duplicate import NearDuplicateIndex
+from backend.database.models import Base, Document
+
+BASE_TEXT = " ".join(f"clause {i} of the supply agreement between the parties" for i in range(200))
+
+
+@pytest.fixture
+def index():
+    return NearDuplicateIndex(threshold=0.8)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=100, bands=16)
+
+
+def test_empty_text_has_no_signature(index):
+    assert index.signature("  ... ") is None
+
+
+def test_signature_is_deterministic_and_case_insensitive(index):
+    assert index.signature(BASE_TEXT) == NearDuplicateIndex(threshold=0.8).signature(BASE_TEXT.upper())
+    assert len(index.signature(BASE_TEXT)) == index.num_perm
+
+
+def test_similarity_tracks_shingle_overlap(index):
+    edited = BASE_TEXT.replace("clause 7 ", "section 7 ", 1)
+    unrelated = " ".join(f"candidate {i} has experience in python and sql" for i in range(200))
+    base = index.signature(BASE_TEXT)
+    assert index.similarity(base, base) == 1.0
+    assert index.similarity(base, index.signature(edited)) > 0.9
+    assert index.similarity(base, index.signature(unrelated)) < 0.1
+
+
+def test_similar_signatures_share_an_lsh_bucket(index):
+    base = index._buckets(index.signature(BASE_TEXT))
+    edited = index._buckets(index.signature(BASE_TEXT.replace("clause 7 ", "section 7 ", 1)))
+    assert len(base) == index.bands
+    assert set(base) & set(edited)
+
+
+def test_find_duplicate_links_to_the_root_original(index, db):
+    for name in ("original.pdf", "copy.pdf", "copy2.pdf"):
+        db.add(Document(filename=name, source="test", stored_path=name))
+    db.commit()
+    original, copy, copy2 = db.query(Document).order_by(Document.id).all()
+
+    index.add(db, original.id, index.signature(BASE_TEXT))
+    db.commit()
+    edited = index.signature(BASE_TEXT.replace("clause 7 ", "section 7 ", 1))
+    match = index.find_duplicate(db, edited, exclude_document_id=copy.id)
+    assert match[0] == original.id and match[1] >= 0.8
+
+    copy.duplicate_of = original.id
+    index.add(db, copy.id, edited)
+    db.commit()
+    # Matching the copy best still reports the original it duplicates
+    assert index.find_duplicate(db, edited, exclude_document_id=copy2.id)[0] == original.id
+    assert index.find_duplicate(db, index.signature("an unrelated short memo about lunch")) is None
@@ -0,0 +1,69 @@
+import numpy as np
+
+from backend.agents.classifier.online_trainer import OnlineModel
+
+TEXTS = {
+    "Invoice": ["invoice total amount due", "payment due invoice number", "invoice tax total"],
+    "Resume": ["resume python experience", "skills education resume", "engineer resume references"],
+    "Contract": ["agreement between parties", "contract termination clause", "liability clause agreement"],
+    "Memo": ["memo to all staff", "internal memo meeting", "staff memo reminder"],
+}
+
+
+def _learn(model, label, repeats=5):
+    for _ in range(repeats):
+        model.partial_fit(TEXTS[label], [label] * len(TEXTS[label]))
+
+
+def _predicted(model, label):
+    return [model.labels[i] for i in model.predict_proba(TEXTS[label]).argmax(axis=1)]
+
+
+def test_single_category_batches_are_held_until_a_second_one():
+    model = OnlineModel(n_features=2 ** 12)
+    model.partial_fit(TEXTS["Invoice"], ["Invoice"] * 3)
+    assert not model.fitted
+    assert model.updates == 0
+
+    model.partial_fit(TEXTS["Resume"][:1], ["Resume"])
+    assert model.fitted
+    assert model.updates == 4                # held examples are learned too
+    assert model.labels == ["Invoice", "Resume"]
+    assert model._held == ([], [])
+
+
+def test_new_category_expands_a_binary_model():
+    model = OnlineModel(n_features=2 ** 12)
+    for _ in range(5):
+        model.partial_fit(TEXTS["Invoice"] + TEXTS["Resume"], ["Invoice"] * 3 + ["Resume"] * 3)
+    assert model.clf.coef_.shape[0] == 1
+    assert _predicted(model, "Invoice") == ["Invoice"] * 3
+
+    _learn(model, "Contract")
+    assert model.labels == ["Invoice", "Resume", "Contract"]
+    assert model.clf.coef_.shape[0] == 3
+    assert model.predict_proba(["anything"]).shape == (1, 3)
+    # What was learned before the new category is kept
+    assert _predicted(model, "Invoice") == ["Invoice"] * 3
+    assert _predicted(model, "Contract") == ["Contract"] * 3
+
+
+def test_new_category_expands_a_multiclass_model():
+    model = OnlineModel(n_features=2 ** 12)
+    for label in ("Invoice", "Resume", "Contract"):
+        _learn(model, label, repeats=1)
+    before = model.clf.coef_.copy()
+    _learn(model, "Memo", repeats=1)
+    assert model.clf.coef_.shape[0] == 4
+    assert np.array_equal(model.clf.classes_, np.arange(4))
+    assert model.clf.coef_[:3].shape == before.shape
+
+
+def test_artifact_round_trip_keeps_label_order():
+    model = OnlineModel(labels=["Resume"], n_features=2 ** 12)
+    model.partial_fit(TEXTS["Invoice"] + TEXTS["Resume"], ["Invoice"] * 3 + ["Resume"] * 3)
+    artifact = model.artifact("online-test")
+    assert list(artifact["label_encoder"].classes_) == ["Resume", "Invoice"]
+    restored = OnlineModel.from_artifact(artifact)
+    assert restored.updates == model.updates
+    np.testing.assert_allclose(restored.predict_proba(TEXTS["Memo"]), model.predict_proba(TEXTS["Memo"]))
@@ -0,0 +1,40 @@
+from backend.agents.classifier.rule_matcher import CompiledRuleSet
+
+
+def test_no_rules_match_nothing():
+    assert CompiledRuleSet({}).match("any invoice text") == (None, [])
+
+
+def test_first_keyword_follows_rule_priority_not_text_order():
+    rules = CompiledRuleSet({"invoice": "Finance", "resume": "HR"})
+    assert rules.match("resume attached, invoice below") == ("invoice", ["Finance", "HR"])
+
+
+def test_categories_are_deduplicated_in_priority_order():
+    rules = CompiledRuleSet({"salary": "HR", "invoice": "Finance", "resume": "HR"})
+    assert rules.match("resume and invoice") == ("invoice", ["Finance", "HR"])
+
+
+def test_keywords_match_whole_words_only():
+    rules = CompiledRuleSet({"tax": "Finance"})
+    assert rules.match("taxes and syntax") == (None, [])
+    assert rules.match("tax, due") == ("tax", ["Finance"])
+
+
+def test_shorter_keyword_sharing_a_prefix_is_found():
+    # The greedy match finds "tax invoice" first; "tax" at the same position must still count
+    rules = CompiledRuleSet({"tax": "Tax", "tax invoice": "Finance"})
+    assert rules.match("tax invoice 42") == ("tax", ["Tax", "Finance"])
+
+
+def test_overlapping_keywords_at_different_positions_are_all_found():
+    rules = CompiledRuleSet({"order": "Operations", "purchase order": "Finance", "order form": "Sales"})
+    keyword, categories = rules.match("purchase order form")
+    assert keyword == "order"
+    assert categories == ["Operations", "Finance", "Sales"]
+
+
+def test_regex_characters_in_keywords_are_literal():
+    rules = CompiledRuleSet({"c++": "Engineering", "a.b": "Other"})
+    assert rules.match("a+b axb") == (None, [])
+    assert rules.match("needs a.b") == ("a.b", ["Other"])
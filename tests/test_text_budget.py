@@ -0,0 +1,45 @@
+from backend.agents.classifier.text_budget import CHARS_PER_TOKEN, SEPARATOR, sample_text
+
+
+def _long_text(words: int) -> str:
+    return " ".join(f"word{i}" for i in range(words))
+
+
+def test_text_within_budget_is_returned_unchanged():
+    text = _long_text(50)
+    sample, strategy = sample_text(text, max_tokens=1000, windows=4)
+    assert sample == text
+    assert strategy == {"strategy": "full", "chars": len(text)}
+
+
+def test_zero_budget_disables_sampling():
+    text = _long_text(5000)
+    assert sample_text(text, max_tokens=0, windows=4)[0] == text
+
+
+def test_long_text_keeps_head_tail_and_windows_within_budget():
+    text = _long_text(20000)
+    sample, strategy = sample_text(text, max_tokens=500, windows=4)
+    assert strategy["strategy"] == "head_tail_windows"
+    assert strategy["windows"] == 4
+    assert strategy["sampled_chars"] <= 500 * CHARS_PER_TOKEN
+    parts = sample.split(SEPARATOR)
+    assert len(parts) == 6
+    assert text.startswith(parts[0])
+    assert text.endswith(parts[-1])
+
+
+def test_spans_are_ordered_and_do_not_cut_words():
+    text = _long_text(20000)
+    sample, strategy = sample_text(text, max_tokens=500, windows=4)
+    spans = strategy["spans"]
+    assert spans == sorted(spans)
+    assert all(end <= next_start for (_, end), (next_start, _) in zip(spans, spans[1:]))
+    words = set(text.split())
+    for part in sample.split(SEPARATOR):
+        assert set(part.split()) <= words
+
+
+def test_sampling_is_deterministic():
+    text = _long_text(20000)
+    assert sample_text(text, max_tokens=500, windows=4) == sample_text(text, max_tokens=500, windows=4)